@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-18 05:25
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_merge_20251202_2235'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='company',
+            name='data_changed_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='company',
+            name='data_version',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
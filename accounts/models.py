@@ -10,6 +10,10 @@ class Company(models.Model):
     contact_info = models.CharField(max_length=100, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Bumped whenever the company's products, staff or issues change; used
+    # as the ETag / Last-Modified source of its pages (accounts/versioning.py)
+    data_version = models.PositiveBigIntegerField(default=0)
+    data_changed_at = models.DateTimeField(default=timezone.now)
 
     def __str__(self):
         return self.name
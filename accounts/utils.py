@@ -3,7 +3,7 @@ from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
-def send_infobip_email(to_email, subject, html_content, text_content=None):
+def send_infobip_email(to_email, subject, html_content, text_content=None, connection=None):
     """
     Send email using Infobip API
     
@@ -12,6 +12,8 @@ def send_infobip_email(to_email, subject, html_content, text_content=None):
         subject: Email subject
         html_content: HTML content of the email
         text_content: Plain text content (optional)
+        connection: Django mail connection to send through, so that
+            several emails can share one SMTP connection (optional)
     
     Returns:
         bool: True if successful, False otherwise
@@ -28,6 +30,7 @@ def send_infobip_email(to_email, subject, html_content, text_content=None):
                 from_email=settings.DEFAULT_FROM_EMAIL,
                 recipient_list=[to_email],
                 html_message=html_content,
+                connection=connection,
                 fail_silently=False,
             )
             return True
@@ -76,6 +79,7 @@ def send_infobip_email(to_email, subject, html_content, text_content=None):
                 from_email=settings.DEFAULT_FROM_EMAIL,
                 recipient_list=[to_email],
                 html_message=html_content,
+                connection=connection,
                 fail_silently=True,
             )
             logger.info(f"Fallback SMTP email sent to {to_email}")
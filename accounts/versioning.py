@@ -0,0 +1,97 @@
+# accounts/versioning.py
+"""
+Per-company data version for conditional GET.
+
+Company.data_version is bumped whenever products, staff or issue reports of
+the company change (see the signals modules of those apps). Pages that
+only show company data use company_etag / company_last_modified with
+django.views.decorators.http.condition, which answers a refresh with
+304 Not Modified before the view runs any of its queries.
+"""
+import hashlib
+from functools import partial
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import Company, UserProfile
+
+
+def _bump(company_ids):
+    Company.objects.filter(pk__in=company_ids).update(
+        data_version=F('data_version') + 1,
+        data_changed_at=timezone.now(),
+    )
+
+
+def bump_data_version(*company_ids):
+    """
+    Mark the data of one or more companies as changed.
+
+    The bump runs after the current transaction commits (right away in
+    autocommit mode), so rolled-back changes never invalidate caches and
+    the company row is not kept locked by long transactions.
+    """
+    company_ids = {company_id for company_id in company_ids if company_id}
+    if company_ids:
+        transaction.on_commit(partial(_bump, company_ids))
+
+
+def _company_state(request):
+    """(data_version, data_changed_at, profile) for the user, cached on the request."""
+    if not hasattr(request, '_company_state'):
+        state = None
+        if request.user.is_authenticated:
+            try:
+                profile = request.user.userprofile
+            except UserProfile.DoesNotExist:
+                profile = None
+            if profile is not None:
+                row = Company.objects.filter(pk=profile.company_id).values_list(
+                    'data_version', 'data_changed_at'
+                ).first()
+                if row:
+                    state = (row[0], row[1], profile)
+        request._company_state = state
+    return request._company_state
+
+
+def company_etag(request, *args, **kwargs):
+    """
+    ETag for a page rendered from the user's company data.
+
+    Besides the company version it covers everything else the page
+    depends on: the user and their profile, the URL (search, sort, page) and
+    the CSRF cookie embedded in forms. Stock clicks on hot products do not
+    bump the company version (so they do not all wait on the company row);
+    the update count of their counter shards stands in for them. Flash
+    messages are left out on purpose: these pages do not display them, so
+    they are not part of the response and stay queued for the next page
+    that does.
+    """
+    # inventory imports this module
+    from inventory.counters import counter_updates
+
+    state = _company_state(request)
+    if state is None:
+        return None
+    version, _, profile = state
+    key = ':'.join([
+        str(version),
+        str(counter_updates(profile.company_id)),
+        str(request.user.pk),
+        str(profile.updated_at.timestamp()),
+        # "Updated today" counts roll over at midnight without any change
+        str(timezone.localdate()),
+        request.get_full_path(),
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+    ])
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+
+
+def company_last_modified(request, *args, **kwargs):
+    state = _company_state(request)
+    if state is None:
+        return None
+    _, changed_at, profile = state
+    return max(changed_at, profile.updated_at)
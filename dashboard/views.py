@@ -1,11 +1,18 @@
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
 from accounts.models import UserProfile, Company
-from inventory.models import Product
+from accounts.versioning import company_etag, company_last_modified
+from inventory.counters import apply_pending, pending_deltas
+from inventory.models import Product, StockMovement
+from inventory.utils import get_inventory_stats
 from django.utils import timezone
 from datetime import timedelta
 
 @login_required
+@condition(etag_func=company_etag, last_modified_func=company_last_modified)
+@cache_control(private=True, no_cache=True)
 def dashboard_view(request):
     # Ensure user has a profile
     try:
@@ -20,24 +27,26 @@ def dashboard_view(request):
     # Calculate dashboard statistics
     if profile.role == 'business_owner':
         # Get products for this company
-        products = Product.objects.filter(company=profile.company)
+        products = Product.objects.filter(company=profile.company).defer('image')
         
-        # Calculate statistics
-        total_products = products.count()
-        low_stock = products.filter(quantity__gt=0, quantity__lte=10).count()  # 10 or less is low stock
-        out_of_stock = products.filter(quantity=0).count()
+        # Calculate statistics in a single aggregate query
+        stats = get_inventory_stats(profile.company)
+        total_products = stats['total_products']
+        low_stock = stats['low_stock_count']  # 10 or less is low stock
+        out_of_stock = stats['out_of_stock_count']
         
         # Get total staff count (users in the same company with staff role)
         total_staff = UserProfile.objects.filter(company=profile.company, role='staff').count()
         
-        # Get recent products (last 5 added)
-        recent_products = products.order_by('-created_at')[:5]
+        # Get recent products (last 5 added), hot ones with their effective quantity
+        recent_products = apply_pending(list(products.order_by('-created_at')[:5]), pending_deltas(profile.company))
         
-        # Calculate total inventory value
-        total_inventory_value = sum(product.total_value for product in products)
+        total_inventory_value = stats['total_inventory_value']
         
-        # Get recently updated products for activity feed
-        recent_activity = products.order_by('-updated_at')[:10]
+        # Latest stock movements from the ledger for the activity feed
+        recent_activity = StockMovement.objects.filter(company=profile.company).select_related(
+            'product', 'actor'
+        ).defer('product__image').order_by('-created_at')[:10]
         
         context = {
             'profile': profile,
@@ -52,22 +61,29 @@ def dashboard_view(request):
         template = 'dashboard/business_owner_dashboard.html'
     else:
         # Staff dashboard - calculate similar statistics but for staff view
-        products = Product.objects.filter(company=profile.company)
+        products = Product.objects.filter(company=profile.company).defer('image')
         
         # Calculate statistics for staff
-        total_products = products.count()
-        low_stock = products.filter(quantity__gt=0, quantity__lte=10).count()
-        out_of_stock = products.filter(quantity=0).count()
+        stats = get_inventory_stats(profile.company)
+        total_products = stats['total_products']
+        low_stock = stats['low_stock_count']
+        out_of_stock = stats['out_of_stock_count']
         
-        # Get recent products (last 5 added)
-        recent_products = products.order_by('-created_at')[:5]
+        # Get recent products (last 5 added), hot ones with their effective quantity
+        recent_products = apply_pending(list(products.order_by('-created_at')[:5]), pending_deltas(profile.company))
         
-        # Get recently updated products for activity feed
-        recent_activity = products.order_by('-updated_at')[:10]
+        # Latest stock movements from the ledger for the activity feed
+        recent_activity = StockMovement.objects.filter(company=profile.company).select_related(
+            'product', 'actor'
+        ).defer('product__image').order_by('-created_at')[:10]
         
-        # Count today's updates (products updated today)
-        today = timezone.now().date()
-        recent_updates = products.filter(updated_at__date=today).count()
+        # Count today's updates (products updated today). A half-open range on
+        # the raw column can use the (company, updated_at) index; __date cannot.
+        start_of_day = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+        recent_updates = products.filter(
+            updated_at__gte=start_of_day,
+            updated_at__lt=start_of_day + timedelta(days=1),
+        ).count()
         
         context = {
             'profile': profile,
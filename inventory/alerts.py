@@ -0,0 +1,136 @@
+# inventory/alerts.py
+"""
+Low-stock alerts at each product's reorder level.
+
+Alerts are kept up to date incrementally. Every quantity change already
+passes through the stock movement ledger with its before and after
+quantity, so MovementBuffer hands its batch to record_changes when it
+flushes. Only changes that cross the reorder level cost a write:
+
+- a change from above the level to at or below it opens an alert
+- a change from at or below the level to above it resolves the open one
+
+Nothing ever rescans the catalog. The open alerts, i.e. the products to
+reorder, are read from a partial index on the unresolved rows.
+
+A change to the level itself (a new reorder point) or to
+whether a product is live (archiving) has no before/after quantity. Those
+go through reconcile, which checks just the given products against their
+current state. The rebuild_stock_alerts command runs it over whole
+companies to repair any drift.
+
+Changes into low or out of stock are also queued for the owners' digest
+email (inventory/notifications.py).
+"""
+from django.utils import timezone
+from .counters import pending_deltas
+from .models import Product, StockAlert, StockNotification, stock_status
+from .notifications import crossing
+
+
+def open_alerts(company):
+    """The company's open alerts with their products, newest first."""
+    return (
+        StockAlert.objects.filter(company=company, resolved_at__isnull=True)
+        .select_related('product')
+        .defer('product__image')
+        .order_by('-created_at')
+    )
+
+
+def _write(opened, resolved, notices=()):
+    """Insert the opened alerts and notifications, and resolve the open alerts of the resolved product ids."""
+    if notices:
+        StockNotification.objects.bulk_create(notices)
+    if opened:
+        # The unique open alert per product makes a repeated opening a no-op
+        StockAlert.objects.bulk_create(opened, ignore_conflicts=True)
+    if resolved:
+        StockAlert.objects.filter(product_id__in=resolved, resolved_at__isnull=True).update(
+            resolved_at=timezone.now()
+        )
+
+
+def record_changes(changes, levels=None):
+    """
+    Open and resolve alerts for a batch of quantity changes.
+
+    Called by MovementBuffer in the transaction that made the changes.
+
+    Args:
+        changes: list of (company_id, product_id, before, after); before is
+            None for a product that was just created
+        levels: reorder level by product id, where the caller already has
+            it; the others are read in one query
+    """
+    levels = dict(levels or {})
+    missing = {product_id for _, product_id, _, _ in changes if product_id not in levels}
+    if missing:
+        levels.update(Product.objects.filter(pk__in=missing).values_list('pk', 'reorder_level'))
+
+    opened, resolved, notices = {}, set(), {}
+    for company_id, product_id, before, after in changes:
+        level = levels.get(product_id)
+        if level is None:
+            # Archived; reconcile has resolved its alert
+            continue
+        status = crossing(before, after, level)
+        if status:
+            notices[product_id] = StockNotification(
+                company_id=company_id, product_id=product_id, status=status, quantity=after, reorder_level=level
+            )
+        # Of several crossings of one product in the batch, the last one wins
+        if after <= level and (before is None or before > level):
+            resolved.discard(product_id)
+            opened[product_id] = StockAlert(
+                company_id=company_id, product_id=product_id, quantity=after, reorder_level=level
+            )
+        elif after > level and before is not None and before <= level:
+            opened.pop(product_id, None)
+            resolved.add(product_id)
+    _write(list(opened.values()), resolved, list(notices.values()))
+
+
+def reconcile(company, product_ids=None):
+    """
+    Make the open alerts of products match their current quantity and level.
+
+    Args:
+        product_ids: the products to check; None checks the whole company
+
+    Returns:
+        (opened, resolved) counts
+    """
+    products = Product.all_objects.filter(company=company)
+    alerts = StockAlert.objects.filter(company=company, resolved_at__isnull=True)
+    if product_ids is not None:
+        products = products.filter(pk__in=product_ids)
+        alerts = alerts.filter(product_id__in=product_ids)
+
+    # Hot products are judged on their effective quantity
+    pending = pending_deltas(company, product_ids)
+    below = {}
+    for pk, quantity, level in (
+        products.filter(archived_at__isnull=True).values_list('pk', 'quantity', 'reorder_level').iterator()
+    ):
+        quantity += pending.get(pk, 0)
+        if quantity <= level:
+            below[pk] = (quantity, level)
+    current = set(alerts.values_list('product_id', flat=True))
+
+    company_id = getattr(company, 'pk', company)
+    opened = [
+        StockAlert(company_id=company_id, product_id=pk, quantity=quantity, reorder_level=level)
+        for pk, (quantity, level) in below.items()
+        if pk not in current
+    ]
+    resolved = current - below.keys()
+    notices = [
+        StockNotification(
+            company_id=company_id, product_id=alert.product_id, status=stock_status(alert.quantity, alert.reorder_level),
+            quantity=alert.quantity, reorder_level=alert.reorder_level,
+        )
+        for alert in opened
+    ]
+    _write(opened, resolved, notices)
+    return len(opened), len(resolved)
@@ -0,0 +1,67 @@
+# inventory/archive.py
+"""
+Archiving (soft deletion) of products.
+
+An archived product has archived_at set. Product.objects leaves it out, so
+it disappears from the inventory list, the dashboard, searches, counts and
+the current inventory report, and the partial indexes on Product only
+cover live rows. Its stock movements, snapshots and past reports stay
+intact, and Product.all_objects still returns it.
+
+Archiving and restoring are one UPDATE however many products are
+selected. Hot products are switched back to plain counters first, so no
+stock clicks are left pending on an archived product. Archived products
+have no open low-stock alerts; restored ones get theirs back.
+"""
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from accounts.versioning import bump_data_version
+from .alerts import reconcile
+from .autocomplete import autocomplete_cache
+from .counters import disable_hot_mode
+from .models import Product, StockAlert
+
+
+def archive_products(company, products):
+    """
+    Archive the products of a queryset of live products.
+
+    Returns the number of products archived.
+    """
+    now = timezone.now()
+    products = products.filter(company=company)
+    with transaction.atomic():
+        disable_hot_mode(products.filter(is_hot=True).values_list('pk', flat=True))
+        StockAlert.objects.filter(product__in=products, resolved_at__isnull=True).update(resolved_at=now)
+        count = products.update(archived_at=now, version=F('version') + 1, updated_at=now)
+        if count:
+            # update() skips the save signals
+            bump_data_version(company.pk)
+    if count:
+        autocomplete_cache.invalidate(company.pk)
+    return count
+
+
+def unarchive_products(company, product_ids):
+    """
+    Restore archived products of a company to the live catalog.
+
+    Returns the number of products restored.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        count = Product.all_objects.filter(
+            company=company, pk__in=product_ids, archived_at__isnull=False
+        ).update(archived_at=None, version=F('version') + 1, updated_at=now)
+        if count:
+            reconcile(company, product_ids)
+            bump_data_version(company.pk)
+    if count:
+        autocomplete_cache.invalidate(company.pk)
+    return count
+
+
+def archived_products(company):
+    """A company's archived products, served by the product_archived_idx index."""
+    return Product.all_objects.filter(company=company, archived_at__isnull=False)
@@ -0,0 +1,210 @@
+# inventory/autocomplete.py
+"""
+In-memory typeahead index for the inventory search box.
+
+Each company gets a sorted list of normalized keys (every word-suffix of
+each item name, plus category names) searched with bisect. Indexes are
+built on first use and kept in a bounded LRU.
+
+Every worker process has its own indexes, so changes to a company's names,
+categories or product list bump a version kept in the shared cache
+(AUTOCOMPLETE_CACHE_ALIAS) once they commit. An index built at an older
+version is rebuilt on its next lookup, so a lookup costs one cache read
+and no database query. The process that made a change patches its own
+index instead of rebuilding it. Indexes are also rebuilt after
+AUTOCOMPLETE_INDEX_TTL seconds, in case the cache lost a version.
+"""
+import bisect
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from .models import Product
+
+MAX_COMPANIES = getattr(settings, 'AUTOCOMPLETE_MAX_COMPANIES', 100)
+INDEX_TTL = getattr(settings, 'AUTOCOMPLETE_INDEX_TTL', 300)
+# Must be shared by all worker processes (e.g. Redis or Memcached)
+CACHE_ALIAS = getattr(settings, 'AUTOCOMPLETE_CACHE_ALIAS', 'default')
+DEFAULT_LIMIT = 10
+
+CATEGORY_LABELS = dict(Product.CATEGORY_CHOICES)
+
+
+def normalize(text):
+    """Lowercase, strip accents and collapse whitespace."""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return ' '.join(text.lower().split())
+
+
+class PrefixIndex:
+    """Sorted (key, product id) entries for one company."""
+
+    def __init__(self, products=(), version=0):
+        self.built_at = time.monotonic()
+        # The company's shared version when the products were read
+        self.version = version
+        self.entries = []
+        self.products = {}
+        self.categories = {}
+        for product_id, item_name, category in products:
+            self.products[product_id] = (item_name, category)
+            for key in self._keys(item_name):
+                self.entries.append((key, product_id))
+            self.categories[category] = self.categories.get(category, 0) + 1
+        self.entries.sort()
+
+    @staticmethod
+    def _keys(item_name):
+        words = normalize(item_name).split()
+        return {' '.join(words[i:]) for i in range(len(words))}
+
+    def add(self, product_id, item_name, category):
+        self.remove(product_id)
+        self.products[product_id] = (item_name, category)
+        for key in self._keys(item_name):
+            bisect.insort(self.entries, (key, product_id))
+        self.categories[category] = self.categories.get(category, 0) + 1
+
+    def remove(self, product_id):
+        if product_id not in self.products:
+            return
+        item_name, category = self.products.pop(product_id)
+        for key in self._keys(item_name):
+            position = bisect.bisect_left(self.entries, (key, product_id))
+            if position < len(self.entries) and self.entries[position] == (key, product_id):
+                del self.entries[position]
+        self.categories[category] -= 1
+        if not self.categories[category]:
+            del self.categories[category]
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """Return (product matches, category matches) for a prefix query."""
+        prefix = normalize(query)
+        if not prefix:
+            return [], []
+
+        matches = []
+        seen = set()
+        position = bisect.bisect_left(self.entries, (prefix,))
+        while position < len(self.entries) and len(matches) < limit:
+            key, product_id = self.entries[position]
+            if not key.startswith(prefix):
+                break
+            if product_id not in seen:
+                seen.add(product_id)
+                matches.append((product_id, self.products[product_id][0]))
+            position += 1
+
+        # A company only has a handful of categories, a linear scan is enough
+        categories = [
+            code for code in self.categories
+            if normalize(code).startswith(prefix) or normalize(CATEGORY_LABELS.get(code, '')).startswith(prefix)
+        ]
+        return matches, categories
+
+
+class IndexCache:
+    """Thread-safe LRU of PrefixIndex objects keyed by company id."""
+
+    def __init__(self, max_companies=MAX_COMPANIES, ttl=INDEX_TTL, cache_alias=CACHE_ALIAS):
+        self.max_companies = max_companies
+        self.ttl = ttl
+        self.cache_alias = cache_alias
+        self.indexes = OrderedDict()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _version_key(company_id):
+        return f'autocomplete-version:{company_id}'
+
+    def current_version(self, company_id):
+        """The company's shared index version; 0 if the cache has none."""
+        try:
+            return caches[self.cache_alias].get(self._version_key(company_id), 0)
+        except Exception as e:
+            print(f"Autocomplete version unavailable: {e}")
+            return 0
+
+    def _bump_version(self, company_id):
+        """Increment the company's shared version and return the new one (None if the cache failed)."""
+        key = self._version_key(company_id)
+        try:
+            cache = caches[self.cache_alias]
+            cache.add(key, 0, timeout=None)
+            return cache.incr(key)
+        except Exception as e:
+            print(f"Autocomplete version not bumped: {e}")
+            return None
+
+    def get(self, company_id):
+        version = self.current_version(company_id)
+        with self.lock:
+            index = self.indexes.get(company_id)
+            if (
+                index is not None
+                and index.version == version
+                and time.monotonic() - index.built_at < self.ttl
+            ):
+                self.indexes.move_to_end(company_id)
+                return index
+
+        # Build outside the lock so one slow company does not block the
+        # others. The version was read first: a change committed while the
+        # products load leaves the index behind and it is rebuilt next time.
+        index = PrefixIndex(
+            Product.objects.filter(company_id=company_id).values_list('pk', 'item_name', 'category').iterator(),
+            version,
+        )
+        with self.lock:
+            self.indexes[company_id] = index
+            self.indexes.move_to_end(company_id)
+            while len(self.indexes) > self.max_companies:
+                self.indexes.popitem(last=False)
+        return index
+
+    def search(self, company_id, query, limit=DEFAULT_LIMIT):
+        index = self.get(company_id)
+        # Searching under the lock keeps readers off a list being patched
+        with self.lock:
+            return index.search(query, limit)
+
+    def _changed(self, company_id, patch=None):
+        """
+        Bump the company's version after a committed change and patch this
+        process's index with patch(index), or drop it when patch is None.
+        """
+        version = self._bump_version(company_id)
+        with self.lock:
+            index = self.indexes.get(company_id)
+            if index is None:
+                return
+            # Patching only keeps an index current if it was current before
+            if patch is not None and version is not None and index.version == version - 1:
+                patch(index)
+                index.version = version
+            else:
+                del self.indexes[company_id]
+
+    def product_saved(self, product):
+        """Index a saved product once the transaction commits."""
+        company_id, product_id = product.company_id, product.pk
+        item_name, category = product.item_name, product.category
+        transaction.on_commit(
+            lambda: self._changed(company_id, lambda index: index.add(product_id, item_name, category))
+        )
+
+    def product_deleted(self, product):
+        """Drop a deleted product once the transaction commits."""
+        company_id, product_id = product.company_id, product.pk
+        transaction.on_commit(lambda: self._changed(company_id, lambda index: index.remove(product_id)))
+
+    def invalidate(self, company_id):
+        """Rebuild a company's index in every process after bulk changes."""
+        transaction.on_commit(lambda: self._changed(company_id))
+
+
+autocomplete_cache = IndexCache()
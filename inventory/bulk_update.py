@@ -0,0 +1,187 @@
+# inventory/bulk_update.py
+"""
+Set-based bulk updates of cost prices and quantities.
+
+The owner filters the catalog (category, unit, search, quantity range) and
+picks an operation: set the field to a value, add to it, or multiply it.
+The change is a single UPDATE ... SET field = <expression over the
+column>, version = version + 1 WHERE <filter>, whatever the number of
+products; nothing is loaded and saved row by row.
+
+The same expression is used for the preview, so the count, the totals and
+the sample rows shown before confirming are what the UPDATE will write.
+New values are rounded to the precision of the column (cents, whole units)
+and never go below zero.
+
+Quantity changes are written to the stock movement ledger, one entry per
+product. The before and after values are read with the rows locked, in the
+same transaction as the UPDATE.
+"""
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import BigIntegerField, Count, DecimalField, ExpressionWrapper, F, Max, Sum, Value
+from django.db.models.functions import Cast, Greatest, Round
+from django.utils import timezone
+from accounts.versioning import bump_data_version
+from .counters import fold
+from .ledger import MovementBuffer
+from .models import Product, ProductBulkUpdate
+from .search import search_products
+
+FILTER_FIELDS = ['category', 'unit_of_measure', 'search', 'min_quantity', 'max_quantity']
+# Rows listed in the preview
+PREVIEW_SIZE = 10
+# Largest values the columns hold: DecimalField(max_digits=10, decimal_places=2)
+# and a 32 bit IntegerField
+MAX_VALUES = {'cost_price': Decimal('99999999.99'), 'quantity': 2147483647}
+
+MONEY = DecimalField(max_digits=14, decimal_places=2)
+
+
+def filter_products(company, filters):
+    """The company's products matching filters, the cleaned data of BulkUpdateForm."""
+    products = Product.objects.filter(company=company)
+    if filters.get('category'):
+        products = products.filter(category=filters['category'])
+    if filters.get('unit_of_measure'):
+        products = products.filter(unit_of_measure=filters['unit_of_measure'])
+    if filters.get('min_quantity') is not None:
+        products = products.filter(quantity__gte=filters['min_quantity'])
+    if filters.get('max_quantity') is not None:
+        products = products.filter(quantity__lte=filters['max_quantity'])
+    if filters.get('search'):
+        products = search_products(company, products, filters['search'])
+    return products
+
+
+def new_value(field, operation, value):
+    """SQL expression for the new value of field ('cost_price' or 'quantity')."""
+    if field == 'quantity':
+        # Computed as bigint, so results too large for the column reach
+        # check_limits instead of failing with an overflow error
+        quantity = Cast('quantity', BigIntegerField())
+        if operation == 'multiply':
+            # Fractional results are rounded to whole units
+            expression = Cast(
+                Round(ExpressionWrapper(quantity * Value(value), output_field=MONEY)), BigIntegerField()
+            )
+        elif operation == 'add':
+            expression = quantity + Value(int(value))
+        else:
+            expression = Value(int(value))
+        return Greatest(expression, Value(0), output_field=BigIntegerField())
+
+    if operation == 'multiply':
+        expression = Round(ExpressionWrapper(F('cost_price') * Value(value), output_field=MONEY), 2)
+    elif operation == 'add':
+        expression = F('cost_price') + Value(value)
+    else:
+        expression = Value(value)
+    return Greatest(expression, Value(Decimal('0.00')), output_field=MONEY)
+
+
+def new_total_value(field, expression):
+    """Stock value of a product after the update."""
+    other = 'cost_price' if field == 'quantity' else 'quantity'
+    return ExpressionWrapper(expression * F(other), output_field=MONEY)
+
+
+def check_limits(highest, field):
+    """
+    Raises:
+        ValueError if highest, the largest new value, does not fit the column
+    """
+    if highest is not None and highest > MAX_VALUES[field]:
+        label = Product._meta.get_field(field).verbose_name
+        raise ValueError(f'The new {label} would exceed {MAX_VALUES[field]:,} for some products; use a smaller value.')
+
+
+def preview_bulk_update(company, filters, field, operation, value):
+    """
+    What a bulk update would do, without writing anything.
+
+    Hot products show their folded quantity; clicks not yet compacted are
+    added to it when the update is applied.
+
+    Returns:
+        dict with count, value_before and value_after (total stock value)
+        sample, a list of (product, new value) for the first rows by name,
+        and more, the number of products not in the sample
+
+    Raises:
+        ValueError if new values would not fit the column
+    """
+    products = filter_products(company, filters)
+    expression = new_value(field, operation, value)
+    totals = products.aggregate(
+        count=Count('pk'),
+        value_before=Sum('total_value'),
+        value_after=Sum(new_total_value(field, expression)),
+        highest=Max(expression),
+    )
+    check_limits(totals['highest'], field)
+    sample = [
+        (product, product.new_value)
+        for product in products.annotate(new_value=expression).order_by('item_name', 'pk')[:PREVIEW_SIZE]
+    ]
+    return {
+        'count': totals['count'],
+        'value_before': totals['value_before'] or Decimal('0.00'),
+        'value_after': totals['value_after'] or Decimal('0.00'),
+        'sample': sample,
+        'more': totals['count'] - len(sample),
+    }
+
+
+def apply_bulk_update(company, filters, field, operation, value, actor=None):
+    """
+    Apply a bulk update to the products matching filters, in one transaction.
+
+    Args:
+        filters: the cleaned data of BulkUpdateForm (see filter_products)
+
+    Returns:
+        the ProductBulkUpdate recording it
+
+    Raises:
+        ValueError if new values would not fit the column; nothing is written
+    """
+    filters = {name: filters[name] for name in FILTER_FIELDS if filters.get(name) not in (None, '')}
+    products = filter_products(company, filters)
+    expression = new_value(field, operation, value)
+    with transaction.atomic(), MovementBuffer(actor) as ledger:
+        changes, hot = [], []
+        if field == 'quantity':
+            # Pending counter deltas of hot products are part of the quantity
+            # being changed; fold them first, which also keeps their shards
+            # locked until the new quantity is spread over them
+            hot = list(products.filter(is_hot=True).values_list('pk', flat=True))
+            for pk in hot:
+                fold(pk)
+            changes = list(
+                products.select_for_update().annotate(new_quantity=expression).values_list('pk', 'quantity', 'new_quantity')
+            )
+            check_limits(max((new for _, _, new in changes), default=None), field)
+        else:
+            check_limits(products.aggregate(highest=Max(expression))['highest'], field)
+
+        count = products.update(**{field: expression}, version=F('version') + 1, updated_at=timezone.now())
+
+        for pk, quantity, new_quantity in changes:
+            if new_quantity != quantity:
+                ledger.add(company.pk, pk, new_quantity - quantity, new_quantity, reason='edited')
+        for pk in hot:
+            fold(pk)
+
+        bulk_update = ProductBulkUpdate.objects.create(
+            company=company,
+            actor=actor,
+            field=field,
+            operation=operation,
+            value=value,
+            filters=filters,
+            product_count=count,
+        )
+        # update() skips the save signals
+        bump_data_version(company.pk)
+    return bulk_update
@@ -0,0 +1,178 @@
+# inventory/concurrency.py
+"""
+Optimistic concurrency for product edits.
+
+The edit form carries the version of the product it was loaded at and the
+field values it showed (its base). Saving is a single conditional
+UPDATE ... SET <fields the user changed>, version = version + 1
+WHERE id = ... AND version = <form version>, so no row is locked while the
+owner is typing.
+
+When the version no longer matches, someone else (for example a staff
+member clicking +/- in the list) changed the product in between. The edit
+is then merged field by field against the current row: fields the user did
+not touch keep the current value, and fields changed on both sides to
+different values are reported as conflicts for the merge view.
+"""
+import json
+from django.db import router
+from django.db.models import F
+from django.db.models.signals import post_save
+from django.utils import timezone
+from .alerts import reconcile
+from .counters import fold
+from .models import CategoryReorderPoint, Product
+
+# Fields of ProductForm, the ones an edit can change and conflict on
+EDITABLE_FIELDS = ['item_name', 'category', 'quantity', 'unit_of_measure', 'cost_price', 'reorder_point']
+# Fields the reorder level depends on
+REORDER_FIELDS = {'category', 'reorder_point'}
+# Written together when a new image is uploaded; never conflicts
+IMAGE_FIELDS = ['image', 'image_hash', 'image_content_type', 'image_name']
+# Automatic merges tried before giving up when the row keeps changing
+MAX_MERGE_ATTEMPTS = 3
+
+
+def field_values(product):
+    """The editable field values of product."""
+    return {name: getattr(product, name) for name in EDITABLE_FIELDS}
+
+
+def encode_base(values):
+    """Serialize editable field values for the form's base_values field."""
+    return json.dumps({name: None if value is None else str(value) for name, value in values.items()})
+
+
+def decode_base(raw):
+    """Parse base_values back into python values, or None if it is missing or malformed."""
+    try:
+        data = json.loads(raw)
+        return {name: Product._meta.get_field(name).to_python(data[name]) for name in EDITABLE_FIELDS}
+    except Exception:
+        return None
+
+
+def save_if_unchanged(product, version, fields):
+    """
+    Write fields of product in one UPDATE, only if the row is still at version.
+
+    Returns True and advances product.version when the row was written.
+    """
+    now = timezone.now()
+    values = {name: getattr(product, name) for name in fields}
+    if 'category' in fields:
+        # The new category's default, copied for the generated reorder_level
+        values['category_reorder_point'] = CategoryReorderPoint.point_for(product.company_id, product.category)
+    updated = Product.objects.filter(pk=product.pk, version=version).update(
+        **values,
+        version=F('version') + 1,
+        updated_at=now,
+    )
+    if updated:
+        product.version = version + 1
+        product.updated_at = now
+    return bool(updated)
+
+
+def display_value(product, name):
+    """Human readable value of one field, using choice labels where there are any."""
+    value = getattr(product, name)
+    return dict(Product._meta.get_field(name).flatchoices).get(value, value)
+
+
+def conflict(product, current, name):
+    """Describe a field changed both in the form (product) and in the database (current)."""
+    return {
+        'field': name,
+        'label': Product._meta.get_field(name).verbose_name.capitalize(),
+        'mine': display_value(product, name),
+        'current': display_value(current, name),
+        'current_raw': getattr(current, name),
+    }
+
+
+def save_product_edit(product, version, base, image_changed=False, ledger=None):
+    """
+    Save an edit made in the product form. Must run inside a transaction.
+
+    Args:
+        product: Product holding the submitted values
+        version: Product.version the form was loaded at
+        base: field values the form was loaded with (see decode_base)
+        image_changed: whether product holds a newly uploaded image
+        ledger: MovementBuffer that records a quantity change
+
+    Returns:
+        list of conflicts (see conflict()), empty when the edit was saved.
+        On conflict nothing is written; product then holds the merged values
+        (the user's for the conflicting fields), and product.version and
+        base are updated to the current row, ready for the merge form.
+    """
+    mine = field_values(product)
+    fields = [name for name in EDITABLE_FIELDS if mine[name] != base[name]]
+    if image_changed:
+        fields += IMAGE_FIELDS
+    if not fields:
+        return []
+
+    if product.is_hot:
+        # Lock the counter shards for the rest of the transaction and fold
+        # their deltas, so the edit merges with the effective quantity
+        fold(product.pk)
+
+    for _ in range(MAX_MERGE_ATTEMPTS):
+        if save_if_unchanged(product, version, fields):
+            # Pick up the fields changed by others since the form was loaded
+            product.refresh_from_db(
+                fields=[name for name in EDITABLE_FIELDS if name not in fields] + ['category_reorder_point', 'total_value', 'reorder_level', 'stock_status']
+            )
+            if REORDER_FIELDS & set(fields):
+                # The level moved without the quantity changing
+                reconcile(product.company_id, [product.pk])
+            if product.is_hot and 'quantity' in fields:
+                # Spread the new quantity over the counter shards
+                fold(product.pk)
+            if ledger is not None and 'quantity' in fields:
+                ledger.add(product.company_id, product.pk, product.quantity - base['quantity'], product.quantity, reason='edited')
+            post_save.send(
+                sender=Product,
+                instance=product,
+                created=False,
+                update_fields=frozenset(fields + ['version', 'updated_at']),
+                raw=False,
+                using=router.db_for_write(Product),
+            )
+            return []
+
+        current = Product.objects.only(*EDITABLE_FIELDS, 'version', 'company').get(pk=product.pk)
+        theirs = field_values(current)
+        # The merge is now against the current row
+        version = product.version = current.version
+        for name in EDITABLE_FIELDS:
+            if name not in fields:
+                setattr(product, name, theirs[name])
+        conflicts = [
+            name for name in fields
+            if name in theirs and theirs[name] != base[name] and theirs[name] != mine[name]
+        ]
+        base.update(theirs)
+        if conflicts:
+            break
+        # Only the user's own changes are written, so the others' stay
+        fields = [name for name in fields if name in IMAGE_FIELDS or mine[name] != theirs[name]]
+        if not fields:
+            return []
+    else:
+        # Still losing the race after several merges; let the user look again
+        conflicts = [name for name in fields if name in theirs]
+
+    if image_changed:
+        # The upload is not kept; show the stored image again
+        product.refresh_from_db(fields=IMAGE_FIELDS)
+    return [conflict(product, current, name) for name in conflicts] or [{
+        'field': 'image',
+        'label': 'Image',
+        'mine': 'New upload',
+        'current': 'Current image',
+        'current_raw': '',
+    }]
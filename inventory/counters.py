@@ -0,0 +1,198 @@
+# inventory/counters.py
+"""
+Sharded stock counters for hot products.
+
+A normal stock click is one UPDATE of the product row, so hundreds of
+concurrent clicks on the same product queue up behind its row lock. A
+product switched to hot mode instead owns SHARD_COUNT StockCounterShard
+rows, and each click updates one of them picked at random:
+
+- The effective quantity is Product.quantity plus the deltas of all
+  shards.
+- Each shard holds an allowance, its share of Product.quantity. A decrement
+  only succeeds on a shard where allowance + delta stays at or above zero,
+  so the effective quantity never goes negative, without any statement
+  reading the other shards.
+- The compactor (compact_stock_counters) folds the deltas back into
+  Product.quantity and spreads the result over the allowances again, in
+  one short transaction per product. Clicks never write the product row.
+
+Pages patch the effective quantity onto loaded products (apply_pending) and
+the KPIs (get_inventory_stats). Sorting and filtering in SQL still use
+Product.quantity, which trails the effective quantity until the next
+compaction.
+"""
+import random
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+from accounts.versioning import bump_data_version
+from .models import Product, StockCounterShard, stock_status
+
+# Counter rows per hot product; switch hot products off and on again after changing it
+SHARD_COUNT = getattr(settings, 'HOT_PRODUCT_SHARDS', 16)
+
+
+def spread(quantity, shards):
+    """Split quantity into shards allowances that differ by at most one."""
+    share, extra = divmod(max(quantity, 0), shards)
+    return [share + (1 if i < extra else 0) for i in range(shards)]
+
+
+def enable_hot_mode(product_ids):
+    """Switch products to sharded counters. Returns the number of products switched."""
+    with transaction.atomic():
+        products = list(
+            Product.objects.select_for_update().filter(pk__in=product_ids, is_hot=False).only('quantity', 'company')
+        )
+        StockCounterShard.objects.bulk_create(
+            StockCounterShard(company_id=product.company_id, product_id=product.pk, shard=shard, allowance=allowance)
+            for product in products
+            for shard, allowance in enumerate(spread(product.quantity, SHARD_COUNT))
+        )
+        Product.objects.filter(pk__in=[product.pk for product in products]).update(is_hot=True)
+    return len(products)
+
+
+def disable_hot_mode(product_ids):
+    """Fold the pending deltas and switch products back to plain row updates."""
+    with transaction.atomic():
+        product_ids = list(
+            Product.objects.select_for_update().filter(pk__in=product_ids, is_hot=True).values_list('pk', flat=True)
+        )
+        for product_id in product_ids:
+            fold(product_id)
+        StockCounterShard.objects.filter(product_id__in=product_ids).delete()
+        Product.objects.filter(pk__in=product_ids).update(is_hot=False)
+    return len(product_ids)
+
+
+def fold(product_id, delta=0):
+    """
+    Fold a hot product's shard deltas (plus delta) into Product.quantity.
+
+    Also spreads the quantity over the shards again, so call it after
+    writing Product.quantity directly. Must run inside a transaction; locks
+    the product row and its shards until it ends.
+
+    Returns:
+        the new quantity, or None (and nothing changed) when delta would
+        take it below zero
+    """
+    product = Product.objects.select_for_update().only('quantity', 'company').get(pk=product_id)
+    shards = list(StockCounterShard.objects.select_for_update().filter(product_id=product_id).order_by('shard'))
+    quantity = product.quantity + sum(shard.delta for shard in shards) + delta
+    if quantity < 0:
+        return None
+    if quantity == product.quantity and sum(shard.allowance for shard in shards) == quantity:
+        return quantity
+
+    for shard, allowance in zip(shards, spread(quantity, len(shards))):
+        shard.allowance = allowance
+        shard.delta = 0
+    StockCounterShard.objects.bulk_update(shards, ['allowance', 'delta'])
+    Product.objects.filter(pk=product_id).update(
+        quantity=quantity, version=F('version') + 1, updated_at=timezone.now()
+    )
+    bump_data_version(product.company_id)
+    return quantity
+
+
+def compact(product_ids=None, company=None):
+    """
+    Fold the pending deltas of hot products, one short transaction each.
+
+    Returns the number of products folded.
+    """
+    shards = StockCounterShard.objects.exclude(delta=0)
+    if product_ids is not None:
+        shards = shards.filter(product_id__in=product_ids)
+    if company is not None:
+        shards = shards.filter(company=company)
+    pending = list(shards.values_list('product_id', flat=True).distinct())
+    for product_id in pending:
+        with transaction.atomic():
+            fold(product_id)
+    return len(pending)
+
+
+def pending_deltas(company, product_ids=None):
+    """Net change not yet folded into Product.quantity, by product id (non-zero only)."""
+    shards = StockCounterShard.objects.filter(company=company)
+    if product_ids is not None:
+        shards = shards.filter(product_id__in=product_ids)
+    rows = shards.values('product_id').annotate(pending=Sum('delta')).values_list('product_id', 'pending')
+    return {product_id: pending for product_id, pending in rows if pending}
+
+
+def counter_updates(company):
+    """Number of hot product adjustments ever made in the company; changes with every click."""
+    return StockCounterShard.objects.filter(company=company).aggregate(total=Sum('updates'))['total'] or 0
+
+
+def apply_pending(products, pending):
+    """Show the effective quantity (and what derives from it) on loaded products."""
+    for product in products:
+        change = pending.get(product.pk)
+        if change:
+            product.quantity += change
+            product.total_value = product.quantity * product.cost_price
+            product.stock_status = stock_status(product.quantity, product.reorder_level)
+    return products
+
+
+def apply_to_shard(product_id, delta):
+    """
+    Add delta to one shard of a hot product. True if a shard took it.
+
+    The shards are tried in turn, starting at a random one, until one takes
+    it: an increment always fits, a decrement needs enough allowance left.
+    """
+    start = random.randrange(SHARD_COUNT)
+    for shard in ((start + i) % SHARD_COUNT for i in range(SHARD_COUNT)):
+        shards = StockCounterShard.objects.filter(product_id=product_id, shard=shard)
+        if delta < 0:
+            shards = shards.filter(allowance__gte=-delta - F('delta'))
+        if shards.update(delta=F('delta') + delta, updates=F('updates') + 1):
+            return True
+    return False
+
+
+def adjust_hot_stock(product, delta, ledger, clamp=False):
+    """
+    Apply a stock click to a hot product through its counter shards.
+
+    Called by inventory.utils.adjust_stock / adjust_stock_bulk inside their
+    transaction. product must have quantity, cost_price, company and
+    reorder_level loaded.
+
+    Args:
+        clamp: reduce a decrement to the available stock instead of
+            refusing it (the bulk adjustment semantics)
+
+    Returns:
+        (product, applied_delta) with product showing the effective quantity
+    """
+    available = product.quantity + pending_deltas(product.company_id, [product.pk]).get(product.pk, 0)
+    if clamp:
+        delta = max(delta, -available)
+    applied = 0
+    if delta and available + delta >= 0:
+        if apply_to_shard(product.pk, delta):
+            applied = delta
+            available += delta
+        else:
+            # No single shard had enough left; take it from the folded total
+            folded = fold(product.pk, delta)
+            if folded is not None:
+                applied = delta
+                available = folded
+
+    # Concurrent clicks on other shards are not included; the ledger's
+    # quantity_after is as of this click
+    product.quantity = available
+    product.total_value = available * product.cost_price
+    if applied:
+        ledger.add(product.company_id, product.pk, applied, available, reorder_level=product.reorder_level)
+    return product, applied
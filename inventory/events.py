@@ -0,0 +1,304 @@
+# inventory/events.py
+"""
+Live inventory change events for the inventory list (server-sent events).
+
+Events carry the current state of the products that changed (effective
+quantity, cost price, whether archived) and the company KPIs, so sending
+one twice is harmless. That lets the feed follow commit order without a
+commit-ordered id: every read goes back COMMIT_WINDOW before its cursor,
+so a transaction that commits after later ones (and after an earlier read)
+is still picked up. Event ids are the read times in milliseconds.
+
+Changed products are found in the stock movement ledger, which also covers
+hot products' clicks, and by updated_at and archived_at, which cover edits,
+bulk price updates and archiving.
+
+One ChangeFeed per process polls every EVENTS_POLL_INTERVAL seconds with
+the same few queries for every company that has a page open, and fans the
+result out to the asyncio queue of each connected client. It remembers what
+it last published for each recently changed product and publishes only
+states that differ, so the window does not repeat events.
+
+A reconnecting browser sends Last-Event-ID and receives the products that
+changed since then before joining the live feed.
+"""
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+from .counters import pending_deltas
+from .models import Product, StockMovement
+from .utils import get_inventory_stats
+
+POLL_INTERVAL = getattr(settings, 'EVENTS_POLL_INTERVAL', 2)
+# How far each read looks back for transactions that committed late
+COMMIT_WINDOW = timedelta(seconds=getattr(settings, 'EVENTS_COMMIT_WINDOW', 30))
+# A client resuming from further back is told to reload the page
+MAX_REPLAY = timedelta(hours=1)
+# Comment lines sent while idle so proxies do not close the connection
+HEARTBEAT_INTERVAL = 15
+# Most products in one event; a company with more changes is told to reload
+BATCH_LIMIT = 1000
+# Events a slow client may fall behind by before it is disconnected
+QUEUE_SIZE = 100
+
+
+def event_id(moment):
+    return int(moment.timestamp() * 1000)
+
+
+def event_time(value):
+    return datetime.fromtimestamp(value / 1000, tz=dt_timezone.utc)
+
+
+def latest_event_id():
+    """Position of a page rendered now, the starting point of its stream."""
+    return event_id(timezone.now())
+
+
+def fetch_changes(since, company_ids):
+    """
+    Read the products of the given companies that changed after since,
+    going back COMMIT_WINDOW further.
+
+    Returns:
+        (changes, read_at) where changes maps company id to a dict of
+        product id -> (quantity, cost_price, archived), or to None when
+        more than BATCH_LIMIT products changed; read_at is the cursor of
+        the next read
+    """
+    read_at = timezone.now()
+    start = since - COMMIT_WINDOW
+    product_ids = set(
+        StockMovement.objects.filter(company_id__in=company_ids, created_at__gt=start)
+        .values_list('product_id', flat=True).distinct()
+    )
+    product_ids.update(
+        Product.objects.filter(company_id__in=company_ids, updated_at__gt=start).values_list('pk', flat=True)
+    )
+    product_ids.update(
+        Product.all_objects.filter(company_id__in=company_ids, archived_at__gt=start).values_list('pk', flat=True)
+    )
+    if not product_ids:
+        return {}, read_at
+
+    changes = {}
+    rows = Product.all_objects.filter(pk__in=product_ids).values_list(
+        'company_id', 'pk', 'quantity', 'cost_price', 'archived_at'
+    )
+    for company_id, product_id, quantity, cost_price, archived_at in rows:
+        changes.setdefault(company_id, {})[product_id] = [quantity, cost_price, archived_at is not None]
+    for company_id, products in list(changes.items()):
+        if len(products) > BATCH_LIMIT:
+            changes[company_id] = None
+            continue
+        # Effective quantity of hot products
+        for product_id, pending in pending_deltas(company_id, products.keys()).items():
+            products[product_id][0] += pending
+        changes[company_id] = {product_id: tuple(state) for product_id, state in products.items()}
+    return changes, read_at
+
+
+def build_event(company_id, products, read_at):
+    """The event dict for a company's changed products (None: too many, reload)."""
+    if products is None:
+        return {'id': event_id(read_at), 'reload': True}
+    stats = get_inventory_stats(company_id)
+    return {
+        'id': event_id(read_at),
+        'products': [
+            {
+                'product_id': product_id,
+                'quantity': quantity,
+                'cost_price': str(cost_price),
+                'total_value': float(quantity * cost_price),
+                'archived': archived,
+            }
+            for product_id, (quantity, cost_price, archived) in products.items()
+        ],
+        'total_products': stats['total_products'],
+        'total_inventory_value': float(stats['total_inventory_value']),
+        'low_stock_count': stats['low_stock_count'],
+        'out_of_stock_count': stats['out_of_stock_count'],
+    }
+
+
+def replay(company_id, last_event_id):
+    """
+    Collect what a client resuming from last_event_id missed.
+
+    Returns:
+        (event, read_at) where event has the products changed since then,
+        is a reload event when the client is more than MAX_REPLAY behind,
+        or is None when nothing changed
+    """
+    try:
+        since = event_time(last_event_id)
+    except (OverflowError, OSError, ValueError):
+        since = None
+    if since is None or since < timezone.now() - MAX_REPLAY:
+        read_at = timezone.now()
+        return build_event(company_id, None, read_at), read_at
+    changes, read_at = fetch_changes(since, [company_id])
+    if company_id not in changes:
+        return None, read_at
+    return build_event(company_id, changes[company_id], read_at), read_at
+
+
+def format_event(event):
+    """Encode an event dict in the text/event-stream wire format."""
+    return f"id: {event['id']}\nevent: inventory\ndata: {json.dumps(event)}\n\n"
+
+
+class ChangeFeed:
+    """Polls for changes once per interval and fans them out per company."""
+
+    def __init__(self, poll_interval=POLL_INTERVAL):
+        self.poll_interval = poll_interval
+        self.subscribers = {}
+        self.read_at = None
+        # company id -> {product id: state} published for the products
+        # changed within the window of the last read
+        self.published = {}
+        self.task = None
+
+    def running(self, loop):
+        return self.task is not None and not self.task.done() and self.task.get_loop() is loop
+
+    async def subscribe(self, company_id):
+        """
+        Register a client and return its queue, starting the feed if needed.
+
+        A new feed reads from this point on (and COMMIT_WINDOW back), before
+        the caller replays what its client missed. Every change is then
+        either in the replay or published by the feed.
+        """
+        loop = asyncio.get_running_loop()
+        if not self.running(loop):
+            self.read_at = timezone.now()
+            self.published = {}
+            self.task = loop.create_task(self.run())
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.subscribers.setdefault(company_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, company_id, queue):
+        queues = self.subscribers.get(company_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self.subscribers[company_id]
+
+    async def run(self):
+        """Poll until the last client leaves."""
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            if not self.subscribers:
+                break
+            try:
+                events, read_at = await sync_to_async(self.poll)(list(self.subscribers))
+            except Exception as e:
+                print(f"Error polling inventory changes: {e}")
+                continue
+            for company_id, event in events.items():
+                for queue in list(self.subscribers.get(company_id, ())):
+                    self.publish(queue, event)
+            # Moved only once the events are queued (see position)
+            self.read_at = read_at
+
+    def poll(self, company_ids):
+        """
+        Read the changes since the last poll.
+
+        Returns:
+            (events, read_at) with the new events by company id
+        """
+        changes, read_at = fetch_changes(self.read_at, company_ids)
+        events = {}
+        published = {}
+        for company_id, products in changes.items():
+            if products is not None:
+                before = self.published.get(company_id, {})
+                # Re-read within the window but already published
+                fresh = {
+                    product_id: state for product_id, state in products.items()
+                    if before.get(product_id) != state
+                }
+                published[company_id] = products
+                if not fresh:
+                    continue
+                products = fresh
+            events[company_id] = build_event(company_id, products, read_at)
+        # Products last changed before the window are not read again
+        self.published = published
+        return events, read_at
+
+    def position(self):
+        """Event id every published change is at or before, for idle clients."""
+        return event_id(self.read_at)
+
+    @staticmethod
+    def publish(queue, event):
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Disconnect the slow client; it resumes from Last-Event-ID
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(None)
+
+
+change_feed = ChangeFeed()
+
+
+def pending_events(company_id, last_event_id):
+    """
+    Everything after last_event_id as one text/event-stream body.
+
+    Used when the app is served over WSGI, where a worker cannot hold the
+    stream open: the browser reconnects after the retry delay, which turns
+    the stream into cheap polling.
+    """
+    chunks = [f"retry: {POLL_INTERVAL * 1000}\n\n"]
+    if last_event_id is None:
+        # Nothing to replay; just give the browser a position to resume from
+        chunks.append(f"id: {latest_event_id()}\n\n")
+        return ''.join(chunks)
+
+    event, read_at = replay(company_id, last_event_id)
+    # Without an event the id alone moves the browser's resume point
+    chunks.append(format_event(event) if event else f"id: {event_id(read_at)}\n\n")
+    return ''.join(chunks)
+
+
+async def event_stream(company_id, last_event_id):
+    """Yield the changes missed since last_event_id, then live changes."""
+    queue = await change_feed.subscribe(company_id)
+    try:
+        yield f"retry: {POLL_INTERVAL * 1000}\n\n"
+        last_sent = 0
+        if last_event_id is not None:
+            # Subscribed first, so nothing between the replay and the feed is lost
+            event, read_at = await sync_to_async(replay)(company_id, last_event_id)
+            last_sent = event_id(read_at)
+            if event:
+                yield format_event(event)
+
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), HEARTBEAT_INTERVAL)
+            except asyncio.TimeoutError:
+                # Everything up to the feed's position has been sent; a
+                # reconnect resumes from there
+                yield f"id: {max(last_sent, change_feed.position())}\n: keep-alive\n\n"
+                continue
+            if event is None:
+                break
+            # Feed reads older than the replay hold older states
+            if event['id'] > last_sent:
+                last_sent = event['id']
+                yield format_event(event)
+    finally:
+        change_feed.unsubscribe(company_id, queue)
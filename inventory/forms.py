@@ -1,5 +1,7 @@
+from decimal import Decimal
 from django import forms
-from .models import Product
+from .concurrency import encode_base, field_values
+from .models import LOW_STOCK_THRESHOLD, Product, ProductBulkUpdate
 
 class ProductForm(forms.ModelForm):
     # Custom image field - separate from the model's image field
@@ -12,9 +14,14 @@ class ProductForm(forms.ModelForm):
         label="Upload New Image"
     )
     
+    # Version and values of the product when the form was loaded, used to
+    # detect and merge concurrent changes (see inventory/concurrency.py)
+    version = forms.IntegerField(widget=forms.HiddenInput, required=False)
+    base_values = forms.CharField(widget=forms.HiddenInput, required=False)
+    
     class Meta:
         model = Product
-        fields = ['item_name', 'category', 'quantity', 'unit_of_measure', 'cost_price']
+        fields = ['item_name', 'category', 'quantity', 'unit_of_measure', 'cost_price', 'reorder_point']
         widgets = {
             'item_name': forms.TextInput(attrs={
                 'class': 'form-control',
@@ -35,6 +42,10 @@ class ProductForm(forms.ModelForm):
                 'placeholder': 'Enter cost price',
                 'step': '0.01'
             }),
+            'reorder_point': forms.NumberInput(attrs={
+                'class': 'form-control',
+                'placeholder': 'Category default'
+            }),
         }
     
     def __init__(self, *args, **kwargs):
@@ -42,6 +53,9 @@ class ProductForm(forms.ModelForm):
         for field_name, field in self.fields.items():
             if hasattr(field, 'widget') and hasattr(field.widget, 'attrs'):
                 field.widget.attrs.update({'class': 'form-control'})
+        if self.instance.pk:
+            self.initial.setdefault('version', self.instance.version)
+            self.initial.setdefault('base_values', encode_base(field_values(self.instance)))
     
     def clean_image_upload(self):
         """Clean and validate uploaded image."""
@@ -61,4 +75,67 @@ class ProductForm(forms.ModelForm):
                 # Don't validate, just return as-is
                 pass
         
-        return image
\ No newline at end of file
+        return image
+
+
+class ProductFilterForm(forms.Form):
+    """Selects the products a bulk action applies to (see bulk_update.filter_products)."""
+    category = forms.ChoiceField(choices=[('', 'Any category')] + Product.CATEGORY_CHOICES, required=False)
+    unit_of_measure = forms.ChoiceField(choices=[('', 'Any unit')] + Product.UNIT_CHOICES, required=False)
+    search = forms.CharField(max_length=200, required=False)
+    min_quantity = forms.IntegerField(required=False)
+    max_quantity = forms.IntegerField(required=False)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for field in self.fields.values():
+            field.widget.attrs.update({'class': 'form-control'})
+
+    def clean(self):
+        cleaned_data = super().clean()
+        min_quantity = cleaned_data.get('min_quantity')
+        max_quantity = cleaned_data.get('max_quantity')
+        if min_quantity is not None and max_quantity is not None and min_quantity > max_quantity:
+            self.add_error('max_quantity', 'Must not be less than the minimum quantity.')
+        return cleaned_data
+
+
+class BulkUpdateForm(ProductFilterForm):
+    """Which products a bulk update applies to and what it does (see inventory/bulk_update.py)."""
+    field = forms.ChoiceField(choices=ProductBulkUpdate.FIELD_CHOICES)
+    operation = forms.ChoiceField(choices=ProductBulkUpdate.OPERATION_CHOICES)
+    # Multiply takes factors such as 1.075; add may be negative
+    value = forms.DecimalField(max_digits=14, decimal_places=4)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        field = cleaned_data.get('field')
+        operation = cleaned_data.get('operation')
+        value = cleaned_data.get('value')
+
+        if value is None:
+            return cleaned_data
+        if operation in ('set', 'multiply') and value < 0:
+            self.add_error('value', 'Must not be negative.')
+        elif field == 'quantity' and operation != 'multiply' and value != value.to_integral_value():
+            self.add_error('value', 'Quantities are whole numbers.')
+        elif field == 'cost_price' and operation != 'multiply' and value != value.quantize(Decimal('0.01')):
+            self.add_error('value', 'Cost prices have at most 2 decimal places.')
+        return cleaned_data
+
+
+class CategoryReorderPointsForm(forms.Form):
+    """A company's default reorder point per category (see inventory/reorder.py); empty means none."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for category, label in Product.CATEGORY_CHOICES:
+            self.fields[category] = forms.IntegerField(
+                label=label,
+                min_value=0,
+                required=False,
+                widget=forms.NumberInput(attrs={
+                    'class': 'form-control',
+                    'placeholder': f'Default: {LOW_STOCK_THRESHOLD}'
+                }),
+            )
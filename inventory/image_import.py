@@ -0,0 +1,174 @@
+# inventory/image_import.py
+"""
+Bulk product image import from a ZIP archive.
+
+Files are matched to products by name ("Blue Widget.jpg", "blue_widget.png"
+and "BLUE-WIDGET.webp" all match "Blue Widget") or by product id
+("1042.jpg"). Entries are read from the archive one chunk at a time, never
+extracted as a whole. Each chunk is decoded, resized and re-encoded in a
+worker pool (images.prepare_upload), then written in one transaction: the
+products with one bulk_update, their variants with one bulk_create.
+"""
+import base64
+import hashlib
+import os
+import re
+import zipfile
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from accounts.versioning import bump_data_version
+from .images import prepare_upload
+from .models import Product, ProductImageVariant
+
+# Entries decoded in parallel and written per transaction
+IMAGE_IMPORT_CHUNK_SIZE = getattr(settings, 'IMAGE_IMPORT_CHUNK_SIZE', 16)
+# Threads used by the upload page; Pillow releases the GIL while decoding,
+# resizing and encoding (the management command uses processes)
+IMAGE_IMPORT_WORKERS = getattr(settings, 'IMAGE_IMPORT_WORKERS', min(4, os.cpu_count() or 1))
+# Longest edge and encoding of the stored image, as in recompress_images
+IMAGE_IMPORT_MAX_EDGE = 1600
+IMAGE_IMPORT_FORMAT = 'webp'
+IMAGE_IMPORT_QUALITY = 80
+# Larger entries are skipped unread, so a crafted archive cannot exhaust memory
+MAX_ENTRY_SIZE = 25 * 1024 * 1024
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp', '.gif', '.bmp', '.tif', '.tiff'}
+
+
+def match_key(name):
+    """Lowercase name with runs of spaces, dashes and underscores made one space."""
+    return re.sub(r'[\s_\-]+', ' ', name).strip().lower()
+
+
+class ImageImport:
+    """
+    Import the images of one archive into a company's products.
+
+    Iterate over run() to do the work; it yields (done, total) after every
+    chunk. Afterwards updated, unmatched, failed and duplicates hold the
+    summary.
+    """
+
+    def __init__(self, company, archive, chunk_size=IMAGE_IMPORT_CHUNK_SIZE):
+        """
+        Raises:
+            ValueError if the archive is not a ZIP file
+        """
+        try:
+            self.zip = zipfile.ZipFile(archive)
+        except (zipfile.BadZipFile, OSError) as e:
+            raise ValueError(f'The file is not a ZIP archive: {e}')
+        self.company = company
+        self.chunk_size = chunk_size
+        self.entries = [
+            info for info in self.zip.infolist()
+            if not info.is_dir()
+            and not info.filename.startswith('__MACOSX/')
+            and not os.path.basename(info.filename).startswith('.')
+            and os.path.splitext(info.filename)[1].lower() in IMAGE_EXTENSIONS
+        ]
+        self.updated = 0
+        self.error = None
+        self.unmatched = []
+        self.failed = []
+        # Files naming a product that an earlier file already matched
+        self.duplicates = []
+
+    def match(self):
+        """Map each entry to a product id; fills in unmatched and duplicates."""
+        by_name, by_pk = {}, set()
+        for pk, item_name in Product.objects.filter(company=self.company).order_by('-pk').values_list('pk', 'item_name'):
+            # Duplicate names: the oldest product gets the image, as in the CSV import
+            by_name[match_key(item_name)] = pk
+            by_pk.add(pk)
+
+        matched, seen = [], set()
+        for info in self.entries:
+            stem = os.path.splitext(os.path.basename(info.filename))[0]
+            pk = by_name.get(match_key(stem))
+            if pk is None and stem.isdigit() and int(stem) in by_pk:
+                pk = int(stem)
+            if pk is None:
+                self.unmatched.append(info.filename)
+            elif pk in seen:
+                self.duplicates.append(info.filename)
+            else:
+                seen.add(pk)
+                matched.append((info, pk))
+        return matched
+
+    def run(self, executor):
+        """Process the archive in chunks, yielding (done, total) after each."""
+        try:
+            matched = self.match()
+            total = len(matched)
+            yield 0, total
+            for start in range(0, total, self.chunk_size):
+                jobs = []
+                for info, pk in matched[start:start + self.chunk_size]:
+                    data = self.read(info)
+                    if data is None:
+                        self.failed.append(info.filename)
+                    else:
+                        jobs.append(((pk, info.filename), data, IMAGE_IMPORT_MAX_EDGE, IMAGE_IMPORT_FORMAT, IMAGE_IMPORT_QUALITY))
+                self.save(list(executor.map(prepare_upload, jobs)))
+                yield min(start + self.chunk_size, total), total
+        finally:
+            self.zip.close()
+
+    def read(self, info):
+        """The bytes of one entry, or None if it is too large or cannot be read."""
+        if info.file_size > MAX_ENTRY_SIZE:
+            return None
+        try:
+            with self.zip.open(info) as entry:
+                data = entry.read(MAX_ENTRY_SIZE + 1)
+        except Exception as e:
+            print(f"Error reading {info.filename} from archive: {e}")
+            return None
+        return data if len(data) <= MAX_ENTRY_SIZE else None
+
+    def save(self, results):
+        images = {}
+        for (pk, file_name), result in results:
+            if result is None:
+                self.failed.append(file_name)
+            else:
+                images[pk] = (file_name, result)
+        if not images:
+            return
+
+        now = timezone.now()
+        with transaction.atomic():
+            products = list(Product.objects.filter(pk__in=images, company=self.company).only('pk'))
+            variants = []
+            for product in products:
+                file_name, result = images[product.pk]
+                product.image = result['image']
+                product.image_hash = result['image_hash']
+                product.image_content_type = result['content_type']
+                product.image_name = os.path.basename(file_name)[:255]
+                product.version = F('version') + 1
+                product.updated_at = now
+                variants += [
+                    ProductImageVariant(
+                        product=product,
+                        size=variant['size'],
+                        format=variant['format'],
+                        data=base64.b64encode(variant['content']).decode('utf-8'),
+                        content_hash=hashlib.sha256(variant['content']).hexdigest(),
+                        width=variant['width'],
+                        height=variant['height'],
+                    )
+                    for variant in result['variants']
+                ]
+            Product.objects.bulk_update(
+                products, ['image', 'image_hash', 'image_content_type', 'image_name', 'version', 'updated_at']
+            )
+            ProductImageVariant.objects.filter(product__in=products).delete()
+            ProductImageVariant.objects.bulk_create(variants)
+            # bulk_update skips the save signals
+            bump_data_version(self.company.pk)
+        self.updated += len(products)
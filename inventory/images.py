@@ -0,0 +1,184 @@
+# inventory/images.py
+import base64
+import hashlib
+import logging
+from io import BytesIO
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Longest edge in pixels for each stored variant. The list cell is 40px,
+# so the thumbnail covers up to 2x displays.
+VARIANT_SIZES = {
+    'thumb': 80,
+    'detail': 600,
+}
+
+# Encoder settings per output format
+VARIANT_FORMATS = {
+    'webp': {'format': 'WEBP', 'content_type': 'image/webp', 'options': {'quality': 80, 'method': 4}},
+    'jpeg': {'format': 'JPEG', 'content_type': 'image/jpeg', 'options': {'quality': 82, 'optimize': True, 'progressive': True}},
+}
+
+
+def _flatten(image):
+    """Return an RGB copy of the image, compositing any transparency on white."""
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def encode_image(image, fmt, quality=None):
+    """Encode a PIL image in one of VARIANT_FORMATS and return the bytes; quality overrides the format's."""
+    spec = VARIANT_FORMATS[fmt]
+    if fmt == 'jpeg' or image.mode not in ('RGB', 'RGBA'):
+        image = _flatten(image)
+    options = spec['options'] if quality is None else {**spec['options'], 'quality': quality}
+    buffer = BytesIO()
+    image.save(buffer, spec['format'], **options)
+    return buffer.getvalue()
+
+
+def shrink_image(image, max_edge, fmt, quality):
+    """
+    Encode the stored copy of an image: downscaled to fit max_edge, in fmt
+    at quality. Used by both recompression and uploads, so stored images
+    follow one rule. The image is resized in place.
+    """
+    image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+    return encode_image(image, fmt, quality)
+
+
+def build_variants(image_bytes):
+    """
+    Resize an uploaded image into every size/format combination.
+
+    Returns:
+        list of dicts with size, format, content (bytes), width and height.
+        Empty if the bytes are not an image Pillow can read.
+    """
+    try:
+        source = Image.open(BytesIO(image_bytes))
+        source = ImageOps.exif_transpose(source)
+    except Exception as e:
+        logger.warning(f"Error reading image for variants: {e}")
+        return []
+    return resize_variants(source)
+
+
+def resize_variants(source):
+    """Resize an opened PIL image into every size/format combination (see build_variants)."""
+    variants = []
+    for size, max_edge in VARIANT_SIZES.items():
+        resized = source.copy()
+        resized.thumbnail((max_edge, max_edge), Image.LANCZOS)
+        for fmt in VARIANT_FORMATS:
+            variants.append({
+                'size': size,
+                'format': fmt,
+                'content': encode_image(resized, fmt),
+                'width': resized.width,
+                'height': resized.height,
+            })
+    return variants
+
+
+def save_image_variants(product):
+    """Regenerate and store the image variants of a saved product."""
+    from .models import ProductImageVariant
+
+    ProductImageVariant.objects.filter(product=product).delete()
+    image_bytes = product.get_image_bytes()
+    if not image_bytes:
+        return []
+
+    variants = [
+        ProductImageVariant(
+            product=product,
+            size=variant['size'],
+            format=variant['format'],
+            data=base64.b64encode(variant['content']).decode('utf-8'),
+            content_hash=hashlib.sha256(variant['content']).hexdigest(),
+            width=variant['width'],
+            height=variant['height'],
+        )
+        for variant in build_variants(image_bytes)
+    ]
+    return ProductImageVariant.objects.bulk_create(variants)
+
+
+def preferred_format(request):
+    """Pick WebP when the browser advertises support for it, JPEG otherwise."""
+    if 'image/webp' in request.headers.get('Accept', ''):
+        return 'webp'
+    return 'jpeg'
+
+
+def recompress_image(job):
+    """
+    Downscale and re-encode one stored base64 image.
+
+    Runs inside a worker process, so it only takes and returns plain values.
+
+    Args:
+        job: tuple of (pk, base64 data, max_edge, format, quality)
+
+    Returns:
+        (pk, new base64 data, content type, content hash, old size, new size),
+        with the new data set to None when the image cannot be read or would
+        not shrink
+    """
+    pk, data, max_edge, fmt, quality = job
+    if data.startswith('data:'):
+        data = data.split(',', 1)[-1]
+    try:
+        original = base64.b64decode(data)
+        image = ImageOps.exif_transpose(Image.open(BytesIO(original)))
+        content = shrink_image(image, max_edge, fmt, quality)
+    except Exception:
+        return pk, None, None, None, len(data), len(data)
+
+    if len(content) >= len(original):
+        return pk, None, None, None, len(data), len(data)
+    encoded = base64.b64encode(content).decode('utf-8')
+    return pk, encoded, VARIANT_FORMATS[fmt]['content_type'], hashlib.sha256(content).hexdigest(), len(data), len(encoded)
+
+
+def prepare_upload(job):
+    """
+    Decode an uploaded image once and build everything stored for it.
+
+    Runs in a worker pool, so it only takes and returns plain values.
+
+    Args:
+        job: tuple of (key, image bytes, max_edge, format, quality)
+
+    Returns:
+        (key, result) where result is None when the bytes are not an image
+        Pillow can read, else a dict with image (base64), content_type,
+        image_hash and variants (as returned by build_variants). The image
+        is downscaled and re-encoded unless that would not make it smaller.
+    """
+    key, original, max_edge, fmt, quality = job
+    try:
+        source = Image.open(BytesIO(original))
+        content_type = Image.MIME.get(source.format)
+        source = ImageOps.exif_transpose(source)
+        variants = resize_variants(source)
+        content = shrink_image(source.copy(), max_edge, fmt, quality)
+    except Exception:
+        return key, None
+
+    if len(content) >= len(original) and content_type:
+        content = original
+    else:
+        content_type = VARIANT_FORMATS[fmt]['content_type']
+    return key, {
+        'image': base64.b64encode(content).decode('utf-8'),
+        'content_type': content_type,
+        'image_hash': hashlib.sha256(content).hexdigest(),
+        'variants': variants,
+    }
@@ -0,0 +1,276 @@
+# inventory/importer.py
+"""
+Bulk product import from CSV or XLSX files.
+
+Rows are read one at a time (a csv reader over the file, or openpyxl in
+read-only mode), validated with the fields of ProductForm and written in
+batches of IMPORT_BATCH_SIZE rows. Each batch is one transaction:
+
+- Rows whose item name already exists in the company update that product,
+  others create one. Both go through a single
+  bulk_create(update_conflicts=True) on the primary key. Product has no
+  unique business key, so the existing ids are looked up by name first.
+- Quantity changes are written to the stock movement ledger, and the
+  search index is updated with one statement per batch.
+
+Memory use is bounded by the batch size, whatever the size of the file.
+Batches commit independently, so an import that stops halfway can simply
+be run again: the rows already imported are matched by name and updated.
+"""
+import csv
+import io
+import os
+import re
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from accounts.versioning import bump_data_version
+from .alerts import reconcile
+from .autocomplete import autocomplete_cache
+from .counters import fold
+from .forms import ProductForm
+from .ledger import MovementBuffer
+from .models import Product
+from .reorder import category_reorder_points
+from .search import index_products
+
+IMPORT_BATCH_SIZE = getattr(settings, 'PRODUCT_IMPORT_BATCH_SIZE', 1000)
+# Rejected rows kept in the error report, so a wrong file cannot fill the database
+MAX_REPORTED_ERRORS = 10000
+
+FIELDS = ['item_name', 'category', 'quantity', 'unit_of_measure', 'cost_price']
+REQUIRED_COLUMNS = ['item_name', 'quantity', 'cost_price']
+# Used for new products when the column is missing or the cell is empty;
+# existing products keep their value
+DEFAULTS = {'category': 'other', 'unit_of_measure': 'pieces'}
+# Other common headers, after normalize_header
+HEADER_ALIASES = {
+    'name': 'item_name', 'item': 'item_name', 'product': 'item_name', 'product_name': 'item_name',
+    'qty': 'quantity', 'stock': 'quantity',
+    'unit': 'unit_of_measure', 'uom': 'unit_of_measure',
+    'cost': 'cost_price', 'price': 'cost_price',
+}
+# Choice fields accept the code or the label shown in the app, in any case
+CHOICE_CODES = {
+    name: {
+        key.lower(): code
+        for code, label in Product._meta.get_field(name).choices
+        for key in (code, str(label))
+    }
+    for name in ('category', 'unit_of_measure')
+}
+# The same validation the product form applies to each field
+FORM_FIELDS = {name: ProductForm.base_fields[name] for name in FIELDS}
+
+
+def normalize_header(value):
+    key = re.sub(r'[^a-z0-9]+', '_', str(value or '').lower()).strip('_')
+    return HEADER_ALIASES.get(key, key)
+
+
+def _csv_rows(file):
+    text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    try:
+        yield from csv.reader(text)
+    except UnicodeDecodeError:
+        raise ValueError('The CSV file is not UTF-8 encoded; save it as "CSV UTF-8" and try again.')
+    except csv.Error as e:
+        raise ValueError(f'The CSV file could not be read: {e}')
+    finally:
+        # Leave the underlying file open for the caller
+        text.detach()
+
+
+def _xlsx_rows(file):
+    # openpyxl is imported here so the CSV path does not pay for it
+    from openpyxl import load_workbook
+
+    try:
+        workbook = load_workbook(file, read_only=True, data_only=True)
+    except Exception as e:
+        raise ValueError(f'The Excel file could not be read: {e}')
+    try:
+        for row in workbook.active.iter_rows(values_only=True):
+            yield ['' if value is None else value for value in row]
+    finally:
+        workbook.close()
+
+
+def read_rows(file, file_name):
+    """
+    Yield (row number, {field: raw value}) for each non-empty data row.
+
+    Raises:
+        ValueError if the file type is not supported or required columns
+        are missing
+    """
+    extension = os.path.splitext(file_name)[1].lower()
+    if extension == '.csv':
+        rows = _csv_rows(file)
+    elif extension == '.xlsx':
+        rows = _xlsx_rows(file)
+    else:
+        raise ValueError('Upload a .csv or .xlsx file.')
+
+    header = [normalize_header(value) for value in next(rows, [])]
+    missing = [name for name in REQUIRED_COLUMNS if name not in header]
+    if missing:
+        labels = ', '.join(FORM_FIELDS[name].label for name in missing)
+        raise ValueError(f'Missing column(s): {labels}. The first row must name the columns.')
+    columns = [(index, name) for index, name in enumerate(header) if name in FIELDS]
+
+    for number, row in enumerate(rows, start=2):
+        if not any(str(value).strip() for value in row):
+            continue
+        yield number, {name: row[index] if index < len(row) else '' for index, name in columns}
+
+
+def clean_row(raw):
+    """Validate one row. Returns (values, errors); values is only complete when errors is empty."""
+    values, errors = {}, []
+    for name, field in FORM_FIELDS.items():
+        value = str(raw.get(name, '')).strip() or DEFAULTS.get(name, '')
+        if name in CHOICE_CODES:
+            value = CHOICE_CODES[name].get(value.lower(), value)
+        try:
+            values[name] = field.clean(value)
+        except ValidationError as e:
+            errors.append(f"{field.label}: {' '.join(e.messages)}")
+            continue
+        # The add form does not accept negative numbers either
+        if name in ('quantity', 'cost_price') and values[name] < 0:
+            errors.append(f"{field.label}: must not be negative.")
+    return values, errors
+
+
+class ErrorReport:
+    """CSV of the rejected rows in the import format, plus their row number and errors."""
+
+    def __init__(self, stream, limit=MAX_REPORTED_ERRORS):
+        self.writer = csv.writer(stream)
+        self.writer.writerow(FIELDS + ['row', 'errors'])
+        self.limit = limit
+        self.count = 0
+
+    def add(self, number, raw, errors):
+        self.count += 1
+        if self.count <= self.limit:
+            self.writer.writerow([raw.get(name, '') for name in FIELDS] + [number, '; '.join(errors)])
+
+
+def save_batch(company, batch, columns=FIELDS, actor=None):
+    """
+    Create or update the products of one batch of rows.
+
+    Args:
+        batch: list of (values, given) with the cleaned values of a row and
+            the fields that had a value in the file. Existing products only
+            have the given fields changed.
+        columns: the columns of the file, the only ones written at all
+
+    Returns (created, updated).
+    """
+    # A name repeated within the batch keeps its last row, as if imported in order
+    rows = {values['item_name']: (values, given) for values, given in batch}
+    with transaction.atomic(), MovementBuffer(actor) as ledger:
+        # Pending counter deltas of hot products are part of the quantity
+        # being replaced; fold them first, which also keeps their shards
+        # locked until the new quantity is spread over them
+        hot = list(
+            Product.objects.filter(company=company, item_name__in=rows.keys(), is_hot=True).values_list('pk', flat=True)
+        )
+        for pk in hot:
+            fold(pk)
+
+        existing = {}
+        for pk, version, category_point, *values in (
+            Product.objects.filter(company=company, item_name__in=rows.keys())
+            .order_by('-pk').values_list('pk', 'version', 'category_reorder_point', *FIELDS)
+        ):
+            # Duplicate names already in the catalog: the oldest product is updated
+            existing[values[0]] = (pk, version, category_point, dict(zip(FIELDS, values)))
+
+        # Copied onto the products for the generated reorder_level
+        category_points = category_reorder_points(company)
+        products, before, moved = [], [], []
+        for name, (values, given) in rows.items():
+            pk, version, category_point, current = existing.get(name, (None, -1, None, None))
+            if current is not None:
+                values = {**current, **{field: values[field] for field in given}}
+            product = Product(
+                pk=pk, company=company, version=version + 1,
+                category_reorder_point=category_points.get(values['category']), **values
+            )
+            if current is not None and product.category_reorder_point != category_point:
+                # A new category with another default; reconciled below
+                moved.append(pk)
+            products.append(product)
+            before.append(current and current['quantity'])
+        update_fields = [name for name in FIELDS if name in columns] + ['version', 'updated_at']
+        if 'category' in columns:
+            update_fields.append('category_reorder_point')
+        Product.objects.bulk_create(
+            products,
+            update_conflicts=True,
+            unique_fields=['pk'],
+            update_fields=update_fields,
+        )
+        for pk in hot:
+            fold(pk)
+
+        for product, quantity in zip(products, before):
+            if quantity is None:
+                ledger.add(company.pk, product.pk, product.quantity, product.quantity, reason='created')
+            else:
+                ledger.add(company.pk, product.pk, product.quantity - quantity, product.quantity, reason='edited')
+        if moved:
+            # After the quantity changes, so reconcile sees the final state
+            ledger.flush()
+            reconcile(company, moved)
+        index_products(products)
+        bump_data_version(company.pk)
+
+    created = sum(1 for name in rows if name not in existing)
+    return created, len(rows) - created
+
+
+def import_products(company, rows, actor=None, batch_size=IMPORT_BATCH_SIZE, report=None):
+    """
+    Import rows from read_rows into a company's catalog.
+
+    Args:
+        report: ErrorReport receiving the rejected rows
+
+    Returns:
+        dict with row_count, created_count, updated_count and error_count
+    """
+    result = {'row_count': 0, 'created_count': 0, 'updated_count': 0, 'error_count': 0}
+    batch = []
+    columns = FIELDS
+
+    def flush():
+        created, updated = save_batch(company, batch, columns, actor)
+        result['created_count'] += created
+        result['updated_count'] += updated
+        batch.clear()
+
+    try:
+        for number, raw in rows:
+            # Every row has the columns of the header
+            columns = list(raw)
+            result['row_count'] += 1
+            values, errors = clean_row(raw)
+            if errors:
+                result['error_count'] += 1
+                if report is not None:
+                    report.add(number, raw, errors)
+                continue
+            batch.append((values, [name for name in columns if str(raw[name]).strip()]))
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+    finally:
+        # Whatever was committed so far is in the catalog
+        autocomplete_cache.invalidate(company.pk)
+    return result
@@ -0,0 +1,86 @@
+# inventory/ledger.py
+"""
+Buffered writes to the stock movement ledger.
+
+Views collect the movements caused by one request in a MovementBuffer and
+write them with a single bulk_create, in the same transaction as the
+quantity UPDATE they describe. A burst of clicks batched by the inventory
+list therefore costs one UPDATE and one INSERT, however many products and
+clicks it contains.
+
+The buffer also passes the before and after quantities it records to the
+low-stock alert engine (inventory/alerts.py) when it flushes.
+"""
+from .alerts import record_changes
+from .models import StockMovement
+
+# Flush early once this many movements are waiting, to bound memory use
+FLUSH_SIZE = 500
+
+
+def reason_for(delta):
+    return 'increase' if delta > 0 else 'decrease'
+
+
+class MovementBuffer:
+    """
+    Collects StockMovement rows and inserts them in batches.
+
+    Use it as a context manager inside the transaction that changes the
+    quantities; pending rows are written when the block exits cleanly and
+    dropped if it raises.
+    """
+
+    def __init__(self, actor=None, flush_size=FLUSH_SIZE):
+        self.actor = actor if actor is not None and actor.is_authenticated else None
+        self.flush_size = flush_size
+        self.pending = []
+        # (company id, product id, before, after) for the alert engine
+        self.changes = []
+        self.levels = {}
+
+    def add(self, company_id, product_id, delta, quantity_after, reason=None, reorder_level=None):
+        """
+        Queue a movement; zero deltas are ignored.
+
+        reorder_level is the product's, when the caller has it loaded; it
+        saves the alert engine a query.
+        """
+        if reorder_level is not None:
+            self.levels[product_id] = reorder_level
+        if reason == 'created':
+            # New products with no stock have no movement but may need an alert
+            self.changes.append((company_id, product_id, None, quantity_after))
+        if not delta:
+            return
+        if reason != 'created':
+            self.changes.append((company_id, product_id, quantity_after - delta, quantity_after))
+        self.pending.append(StockMovement(
+            company_id=company_id,
+            product_id=product_id,
+            delta=delta,
+            quantity_after=quantity_after,
+            actor=self.actor,
+            reason=reason or reason_for(delta),
+        ))
+        if len(self.pending) >= self.flush_size:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            StockMovement.objects.bulk_create(self.pending, batch_size=self.flush_size)
+            self.pending = []
+        if self.changes:
+            record_changes(self.changes, self.levels)
+            self.changes = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
+        else:
+            self.pending = []
+            self.changes = []
+        return False
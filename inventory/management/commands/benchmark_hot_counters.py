@@ -0,0 +1,84 @@
+import threading
+import time
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.db import connection
+from accounts.models import Company
+from inventory.counters import compact, enable_hot_mode, pending_deltas
+from inventory.models import Product
+from inventory.utils import adjust_stock
+
+class Command(BaseCommand):
+    help = (
+        'Measure stock clicks per second on one product with a growing number of concurrent '
+        'clients, with plain row updates and with sharded counters (hot mode)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clicks', type=int, default=200, help='Clicks per client')
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite':
+            self.stderr.write(
+                'SQLite lets one writer in at a time, so neither mode scales here; '
+                'run this against PostgreSQL to see the difference.'
+            )
+
+        # The clients commit their clicks, so the data cannot be rolled back;
+        # the benchmark company is deleted at the end instead
+        company = Company.objects.create(name='Hot Counter Benchmark')
+        try:
+            for hot in (False, True):
+                self.stdout.write('Sharded counters' if hot else 'Plain row updates')
+                for clients in options['concurrency']:
+                    rate, errors = self.run(company, hot, clients, options['clicks'])
+                    line = f"{clients:>4} clients: {rate:8.0f} clicks/s"
+                    if errors:
+                        line += f" ({errors} failed)"
+                    self.stdout.write(line)
+        finally:
+            company.delete()
+
+    def run(self, company, hot, clients, clicks):
+        start_quantity = clients * clicks
+        product = Product.objects.create(
+            item_name='Benchmark product', category='other', quantity=start_quantity,
+            cost_price=Decimal('1.00'), company=company,
+        )
+        if hot:
+            enable_hot_mode([product.pk])
+
+        errors = []
+        barrier = threading.Barrier(clients + 1)
+
+        def client(index):
+            barrier.wait()
+            try:
+                # Mostly sales, with a restock now and then
+                for i in range(clicks):
+                    adjust_stock(company, product.pk, 1 if i % 4 == index % 4 else -1)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+        for thread in threads:
+            thread.start()
+        barrier.wait()
+        started = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        # The clicks must add up whichever way they were stored
+        expected = start_quantity + sum(
+            1 if i % 4 == index % 4 else -1 for index in range(clients) for i in range(clicks)
+        )
+        compact([product.pk])
+        product.refresh_from_db(fields=['quantity'])
+        if not errors and (product.quantity != expected or pending_deltas(company, [product.pk])):
+            self.stderr.write(f"Quantity is {product.quantity}, expected {expected}")
+        product.delete()
+        return clients * clicks / elapsed, len(errors)
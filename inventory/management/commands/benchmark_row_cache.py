@@ -0,0 +1,90 @@
+import random
+import time
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+from django.utils import timezone
+from accounts.models import Company, UserProfile
+from inventory.models import Product
+from inventory.templatetags.fragment_cache import get_fragment_cache
+
+class _Rollback(Exception):
+    pass
+
+class Command(BaseCommand):
+    help = 'Measure the inventory list template time with and without cached product rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=2000)
+        parser.add_argument('--changed', type=float, default=0.05, help='Share of rows changed before the last render')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        cache = get_fragment_cache()
+        if cache is None:
+            self.stderr.write('The fragment cache is not configured; every row would be rendered.')
+            return
+
+        # Everything is created inside a transaction that is rolled back at the end
+        try:
+            with transaction.atomic():
+                company = Company.objects.create(name='Row Cache Benchmark')
+                user = User.objects.create_user('row-cache-benchmark')
+                profile = UserProfile.objects.create(user=user, role='business_owner', company=company)
+                Product.objects.bulk_create(
+                    Product(
+                        item_name=f'Product {i}',
+                        category=rng.choice([code for code, _ in Product.CATEGORY_CHOICES]),
+                        quantity=rng.randint(0, 500),
+                        cost_price=Decimal(rng.randint(100, 100000)) / 100,
+                        company=company,
+                    )
+                    for i in range(options['products'])
+                )
+                self.run(company, user, profile, cache, rng, options)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def run(self, company, user, profile, cache, rng, options):
+        request = RequestFactory().get('/inventory/')
+        request.user = user
+
+        def render():
+            products = list(Product.objects.filter(company=company).defer('image').order_by('item_name', 'pk'))
+            context = {'products': products, 'profile': profile, 'sort': 'name'}
+            started = time.perf_counter()
+            render_to_string('inventory/inventory_list.html', context, request)
+            return time.perf_counter() - started
+
+        def timed(label, prepare):
+            timings = []
+            for _ in range(options['repeat']):
+                prepare()
+                timings.append(render())
+            timings.sort()
+            median = timings[len(timings) // 2]
+            self.stdout.write(f"{label:>22}: median {median * 1000:.1f} ms")
+            return median
+
+        changed = max(1, int(options['products'] * options['changed']))
+
+        def touch_rows():
+            pks = rng.sample(list(Product.objects.filter(company=company).values_list('pk', flat=True)), changed)
+            Product.objects.filter(pk__in=pks).update(updated_at=timezone.now())
+
+        self.stdout.write(f"{options['products']} rows, {changed} changed between renders")
+        uncached = timed('no cached rows', cache.clear)
+        cached = timed('all rows cached', lambda: None)
+        partly = timed(f'{changed} rows changed', touch_rows)
+        cache.clear()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Template time saved: {(1 - cached / uncached) * 100:.0f}% when nothing changed, "
+            f"{(1 - partly / uncached) * 100:.0f}% with {changed} changed rows"
+        ))
@@ -0,0 +1,91 @@
+import random
+import time
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from accounts.models import Company
+from inventory.models import Product
+from inventory.search import rank_products, rebuild_search_index, search_backend, search_products
+
+WORDS = [
+    'apple', 'banana', 'cable', 'charger', 'denim', 'jacket', 'lamp', 'notebook',
+    'organic', 'pencil', 'rice', 'shampoo', 'sneaker', 'speaker', 'tomato', 'wireless',
+    'yoga', 'mat', 'bottle', 'coffee', 'headphones', 'vitamin', 'shirt', 'blender',
+]
+
+class _Rollback(Exception):
+    pass
+
+class Command(BaseCommand):
+    help = 'Compare full-text product search against the old icontains scan on a generated catalog'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=100000)
+        parser.add_argument('--queries', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        self.stdout.write(f"Search backend: {search_backend()}")
+
+        # Everything is created inside a transaction that is rolled back at the end
+        try:
+            with transaction.atomic():
+                company = Company.objects.create(name='Search Benchmark')
+                self.populate(company, options['products'], rng)
+                queries = [
+                    ' '.join(rng.sample(WORDS, rng.choice([1, 2])))[:rng.choice([3, 5, 40])]
+                    for _ in range(options['queries'])
+                ]
+                self.run(company, queries)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def populate(self, company, count, rng):
+        started = time.perf_counter()
+        categories = [code for code, _ in Product.CATEGORY_CHOICES]
+        batch = []
+        for i in range(count):
+            batch.append(Product(
+                item_name=f"{' '.join(rng.sample(WORDS, 3)).title()} {i}",
+                category=rng.choice(categories),
+                quantity=rng.randint(0, 500),
+                cost_price=Decimal(rng.randint(100, 100000)) / 100,
+                company=company,
+            ))
+            if len(batch) == 5000:
+                Product.objects.bulk_create(batch)
+                batch = []
+        Product.objects.bulk_create(batch)
+        rebuild_search_index()
+        self.stdout.write(f"Created {count} products in {time.perf_counter() - started:.1f}s")
+
+    def run(self, company, queries):
+        products = Product.objects.filter(company=company).defer('image')
+
+        def icontains(query):
+            results = products.filter(Q(item_name__icontains=query) | Q(category__icontains=query))
+            return results.count(), list(results.order_by('item_name', 'pk')[:50])
+
+        def fulltext(query):
+            results = search_products(company, products, query)
+            ranked = rank_products(company, results, query).order_by('search_rank', 'pk')
+            return results.count(), list(ranked[:50])
+
+        # Each query counts the matches and loads the first page, like the list view
+        for label, run_query in [('icontains', icontains), ('full-text', fulltext)]:
+            timings = []
+            matches = 0
+            for query in queries:
+                started = time.perf_counter()
+                count, _ = run_query(query)
+                matches += count
+                timings.append(time.perf_counter() - started)
+            timings.sort()
+            self.stdout.write(
+                f"{label:>10}: median {timings[len(timings) // 2] * 1000:.1f} ms, "
+                f"p95 {timings[int(len(timings) * 0.95)] * 1000:.1f} ms, "
+                f"{matches / len(queries):.0f} matches/query"
+            )
@@ -0,0 +1,26 @@
+import time
+from django.core.management.base import BaseCommand
+from inventory.counters import compact
+
+class Command(BaseCommand):
+    help = (
+        'Fold the counter shards of hot products back into their quantity. '
+        'Run it with --interval as a long-lived worker, or from cron without it.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', type=int, help='Only compact this company id')
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Keep running and compact every INTERVAL seconds (default: run once)',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            folded = compact(company=options['company'])
+            if folded or not options['interval']:
+                self.stdout.write(f"Folded the counters of {folded} product(s)")
+            if not options['interval']:
+                return
+            time.sleep(max(0, options['interval'] - (time.monotonic() - started)))
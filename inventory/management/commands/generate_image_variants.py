@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from inventory.images import save_image_variants
+from inventory.models import Product
+
+class Command(BaseCommand):
+    help = 'Generate thumbnail and detail image variants for products that have an image'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--missing-only', action='store_true',
+                            help='Skip products that already have variants')
+
+    def handle(self, *args, **options):
+        # Archived products too, so they come back with their variants
+        products = Product.all_objects.exclude(image__isnull=True).exclude(image='').only(
+            'pk', 'image', 'image_content_type'
+        ).order_by('pk')
+        if options['missing_only']:
+            products = products.filter(image_variants__isnull=True)
+
+        generated = 0
+        for product in products.iterator(chunk_size=50):
+            if save_image_variants(product):
+                generated += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Generated image variants for {generated} products"))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from inventory.counters import disable_hot_mode, enable_hot_mode
+from inventory.models import Product
+
+class Command(BaseCommand):
+    help = (
+        'Switch products to sharded stock counters (hot mode) or back. Meant for the '
+        'few products that get so many concurrent stock clicks that they queue on their row lock.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--enable', type=int, nargs='+', default=[], metavar='ID', help='Product ids to switch on')
+        parser.add_argument('--disable', type=int, nargs='+', default=[], metavar='ID', help='Product ids to switch off')
+        parser.add_argument('--list', action='store_true', help='List the products in hot mode')
+
+    def handle(self, *args, **options):
+        if options['enable']:
+            switched = enable_hot_mode(options['enable'])
+            self.stdout.write(self.style.SUCCESS(f"Switched {switched} product(s) to hot mode"))
+        if options['disable']:
+            switched = disable_hot_mode(options['disable'])
+            self.stdout.write(self.style.SUCCESS(f"Switched {switched} product(s) back"))
+        if options['list'] or not (options['enable'] or options['disable']):
+            for product in Product.objects.filter(is_hot=True).select_related('company').order_by('company', 'pk'):
+                self.stdout.write(f"{product.pk}\t{product.company.name}\t{product.item_name}")
@@ -0,0 +1,40 @@
+from concurrent.futures import ProcessPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+from accounts.models import Company
+from inventory.image_import import IMAGE_IMPORT_CHUNK_SIZE, ImageImport
+
+class Command(BaseCommand):
+    help = (
+        'Match the images in a ZIP archive to products by name or id and store them, '
+        'decoding and resizing in worker processes'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='ZIP archive')
+        parser.add_argument('--company', type=int, required=True, help='Company id')
+        parser.add_argument('--workers', type=int, default=2, help='Worker processes used for decoding and encoding')
+        parser.add_argument('--chunk-size', type=int, default=IMAGE_IMPORT_CHUNK_SIZE,
+                            help='Images read and written per transaction')
+
+    def handle(self, *args, **options):
+        try:
+            company = Company.objects.get(pk=options['company'])
+            image_import = ImageImport(company, options['path'], chunk_size=options['chunk_size'])
+        except (Company.DoesNotExist, OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            for done, total in image_import.run(pool):
+                self.stdout.write(f"{done}/{total} images processed")
+
+        for label, files in [
+            ('No matching product', image_import.unmatched),
+            ('Product already matched by an earlier file', image_import.duplicates),
+            ('Not a readable image', image_import.failed),
+        ]:
+            for name in files:
+                self.stdout.write(f"{label}: {name}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{image_import.updated} product images updated, {len(image_import.unmatched)} unmatched, "
+            f"{len(image_import.duplicates)} duplicates, {len(image_import.failed)} unreadable"
+        ))
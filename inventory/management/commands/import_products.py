@@ -0,0 +1,50 @@
+import time
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from accounts.models import Company
+from inventory.importer import IMPORT_BATCH_SIZE, ErrorReport, import_products, read_rows
+
+class Command(BaseCommand):
+    help = (
+        'Import products from a CSV or XLSX file into a company. Rows naming an existing '
+        'product update it; rejected rows are written to an error report.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or XLSX file')
+        parser.add_argument('--company', type=int, required=True, help='Company id')
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE, help='Rows saved per transaction')
+        parser.add_argument('--errors', help='Write the rejected rows to this CSV file')
+        parser.add_argument('--user', help='Username recorded on the stock movements')
+
+    def handle(self, *args, **options):
+        try:
+            company = Company.objects.get(pk=options['company'])
+            actor = User.objects.get(username=options['user']) if options['user'] else None
+        except (Company.DoesNotExist, User.DoesNotExist) as e:
+            raise CommandError(str(e))
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        started = time.perf_counter()
+        errors_file = open(options['errors'], 'w', newline='', encoding='utf-8') if options['errors'] else None
+        try:
+            with open(options['path'], 'rb') as file:
+                result = import_products(
+                    company,
+                    read_rows(file, options['path']),
+                    actor,
+                    batch_size=options['batch_size'],
+                    report=ErrorReport(errors_file, limit=float('inf')) if errors_file else None,
+                )
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+        finally:
+            if errors_file:
+                errors_file.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{result['row_count']} rows in {time.perf_counter() - started:.1f}s: "
+            f"{result['created_count']} created, {result['updated_count']} updated, "
+            f"{result['error_count']} rejected"
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from inventory.search import rebuild_search_index, search_backend
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text product search index'
+
+    def handle(self, *args, **options):
+        backend = search_backend()
+        if backend != 'fts5':
+            self.stdout.write(f"Search backend is '{backend}'; its index is maintained by the database, nothing to rebuild.")
+            return
+
+        indexed = rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} products"))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from accounts.models import Company
+from inventory.alerts import reconcile
+
+class Command(BaseCommand):
+    help = (
+        'Check every product against its reorder level and open or resolve low-stock alerts to match. '
+        'Alerts are kept up to date as stock changes; this repairs them after data was changed outside the app.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', type=int, help='Only rebuild this company id')
+
+    def handle(self, *args, **options):
+        companies = Company.objects.all()
+        if options['company']:
+            companies = companies.filter(pk=options['company'])
+        for company in companies:
+            with transaction.atomic():
+                opened, resolved = reconcile(company)
+            if opened or resolved:
+                self.stdout.write(f"{company.name}: opened {opened}, resolved {resolved} alert(s)")
+        self.stdout.write('Done')
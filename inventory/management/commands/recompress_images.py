@@ -0,0 +1,120 @@
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from accounts.models import UserProfile
+from accounts.versioning import bump_data_version
+from inventory.images import VARIANT_FORMATS, recompress_image
+from inventory.models import Product
+
+# Tables that hold base64 images: (model, image field, content type field, hash field)
+TARGETS = {
+    'products': (Product, 'image', 'image_content_type', 'image_hash'),
+    'profiles': (UserProfile, 'profile_picture', 'profile_picture_content_type', None),
+}
+
+class Command(BaseCommand):
+    help = 'Downscale and re-encode stored base64 images in resumable primary-key chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tables', nargs='+', choices=TARGETS.keys(), default=list(TARGETS.keys()))
+        parser.add_argument('--max-edge', type=int, default=1600,
+                            help='Longest edge in pixels after downscaling')
+        parser.add_argument('--format', choices=VARIANT_FORMATS.keys(), default='webp')
+        parser.add_argument('--quality', type=int, default=80)
+        parser.add_argument('--chunk-size', type=int, default=100,
+                            help='Rows read and written per transaction')
+        parser.add_argument('--workers', type=int, default=2,
+                            help='Worker processes used for decoding and encoding')
+        parser.add_argument('--sleep', type=float, default=0.0,
+                            help='Seconds to pause between chunks to limit load on the database')
+        parser.add_argument('--checkpoint', default=str(Path(settings.BASE_DIR) / '.recompress_images.json'),
+                            help='File recording the last processed primary key per table')
+        parser.add_argument('--reset', action='store_true', help='Ignore the checkpoint and start over')
+        parser.add_argument('--dry-run', action='store_true', help='Report savings without writing anything')
+
+    def handle(self, *args, **options):
+        checkpoint_path = Path(options['checkpoint'])
+        checkpoint = {}
+        if checkpoint_path.exists() and not options['reset']:
+            try:
+                checkpoint = json.loads(checkpoint_path.read_text())
+            except ValueError:
+                raise CommandError(f"Checkpoint file {checkpoint_path} is not valid JSON")
+
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            for table in options['tables']:
+                self.recompress_table(table, pool, checkpoint, checkpoint_path, options)
+
+    def recompress_table(self, table, pool, checkpoint, checkpoint_path, options):
+        model, image_field, type_field, hash_field = TARGETS[table]
+        last_pk = checkpoint.get(table, 0)
+        rows_done = rows_changed = bytes_before = bytes_after = 0
+
+        if last_pk:
+            self.stdout.write(f"{table}: resuming after id {last_pk}")
+
+        while True:
+            # The base manager includes archived products, whose images are
+            # restored with them
+            rows = list(
+                model._base_manager.filter(pk__gt=last_pk)
+                .exclude(**{f'{image_field}__isnull': True})
+                .exclude(**{image_field: ''})
+                .order_by('pk')
+                .values_list('pk', image_field)[:options['chunk_size']]
+            )
+            if not rows:
+                break
+
+            jobs = [
+                (pk, data, options['max_edge'], options['format'], options['quality'])
+                for pk, data in rows
+            ]
+            results = list(pool.map(recompress_image, jobs))
+            originals = dict(rows)
+
+            with transaction.atomic():
+                changed_pks = []
+                for pk, encoded, content_type, content_hash, old_size, new_size in results:
+                    bytes_before += old_size
+                    bytes_after += new_size
+                    if encoded is None or options['dry_run']:
+                        continue
+                    fields = {image_field: encoded, type_field: content_type}
+                    if hash_field:
+                        fields[hash_field] = content_hash
+                    # Skip rows whose image was replaced while we were encoding
+                    if model._base_manager.filter(pk=pk, **{image_field: originals[pk]}).update(**fields):
+                        changed_pks.append(pk)
+                rows_changed += len(changed_pks)
+                # Queryset updates skip the save signals; image URLs on cached pages change
+                bump_data_version(*model._base_manager.filter(pk__in=changed_pks).values_list('company_id', flat=True).distinct())
+
+            rows_done += len(rows)
+            last_pk = rows[-1][0]
+            if not options['dry_run']:
+                checkpoint[table] = last_pk
+                checkpoint_path.write_text(json.dumps(checkpoint))
+
+            self.stdout.write(
+                f"{table}: {rows_done} rows scanned, {rows_changed} rewritten, "
+                f"{self.format_bytes(bytes_before - bytes_after)} saved so far"
+            )
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{table}: done. {self.format_bytes(bytes_before)} -> {self.format_bytes(bytes_after)} "
+            f"({self.format_bytes(bytes_before - bytes_after)} saved)"
+        ))
+
+    @staticmethod
+    def format_bytes(size):
+        for unit in ['B', 'KB', 'MB', 'GB']:
+            if abs(size) < 1024 or unit == 'GB':
+                return f"{size:.1f} {unit}"
+            size /= 1024
@@ -0,0 +1,26 @@
+import time
+from django.core.management.base import BaseCommand
+from inventory.notifications import DIGEST_WINDOW, send_digests
+
+class Command(BaseCommand):
+    help = (
+        'Email each company with low-stock notifications queued for LOW_STOCK_DIGEST_WINDOW_MINUTES '
+        'one digest of them. Run it with --interval as a long-lived worker, or from cron without it.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', type=int, help='Only send the digest of this company id')
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Keep running and send the due digests every INTERVAL seconds (default: run once)',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            sent = send_digests(company=options['company'])
+            if sent or not options['interval']:
+                self.stdout.write(f"Sent {sent} digest(s); window is {DIGEST_WINDOW}")
+            if not options['interval']:
+                return
+            time.sleep(max(0, options['interval'] - (time.monotonic() - started)))
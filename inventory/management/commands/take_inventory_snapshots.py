@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from accounts.models import Company
+from inventory.snapshots import SNAPSHOT_INTERVAL, snapshot_due, take_snapshot
+
+class Command(BaseCommand):
+    help = (
+        'Snapshot the inventory of every company whose latest snapshot is older than '
+        'INVENTORY_SNAPSHOT_INTERVAL_HOURS. Run it from cron (e.g. hourly); '
+        'point-in-time reports replay at most one interval of stock movements.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', type=int, help='Only snapshot this company id')
+        parser.add_argument('--force', action='store_true', help='Snapshot even if the latest one is recent')
+
+    def handle(self, *args, **options):
+        companies = Company.objects.order_by('pk')
+        if options['company']:
+            companies = companies.filter(pk=options['company'])
+
+        taken = 0
+        for company in companies:
+            if not options['force'] and not snapshot_due(company):
+                continue
+            snapshot = take_snapshot(company)
+            taken += 1
+            self.stdout.write(f"{company.name}: {len(snapshot.data)} products")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Took {taken} snapshot(s); interval is {SNAPSHOT_INTERVAL}"
+        ))
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-18 04:57
+
+import base64
+import hashlib
+
+from django.db import migrations, models
+
+
+def backfill_image_hash(apps, schema_editor):
+    Product = apps.get_model('inventory', 'Product')
+    products = Product.objects.exclude(image__isnull=True).exclude(image='').only('pk', 'image')
+    for product in products.iterator(chunk_size=100):
+        image_data = product.image
+        if image_data.startswith('data:'):
+            image_data = image_data.split(',', 1)[-1]
+        try:
+            content = base64.b64decode(image_data)
+        except (ValueError, TypeError):
+            continue
+        Product.objects.filter(pk=product.pk).update(image_hash=hashlib.sha256(content).hexdigest())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0003_product_image_content_type_product_image_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='image_hash',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.RunPython(backfill_image_hash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Full-text search index for products: FTS5 on SQLite, tsvector + GIN on PostgreSQL
+
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        try:
+            schema_editor.execute(
+                "CREATE VIRTUAL TABLE inventory_product_fts USING fts5("
+                "item_name, category, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+            )
+        except Exception:
+            # SQLite built without FTS5; search falls back to icontains
+            return
+        schema_editor.execute(
+            "INSERT INTO inventory_product_fts (rowid, item_name, category) "
+            "SELECT id, item_name, category FROM inventory_product"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            "ALTER TABLE inventory_product ADD COLUMN search_vector tsvector "
+            "GENERATED ALWAYS AS (to_tsvector('simple', coalesce(item_name, '') || ' ' || coalesce(category, ''))) STORED"
+        )
+        schema_editor.execute(
+            "CREATE INDEX inventory_product_search_vector_idx ON inventory_product USING GIN (search_vector)"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS inventory_product_fts")
+    elif vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS inventory_product_search_vector_idx")
+        schema_editor.execute("ALTER TABLE inventory_product DROP COLUMN IF EXISTS search_vector")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0005_productimagevariant'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
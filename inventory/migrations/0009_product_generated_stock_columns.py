@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-18 05:17
+
+import django.db.models.expressions
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_merge_20251202_2235'),
+        ('inventory', '0008_product_company_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='stock_status',
+            field=models.GeneratedField(choices=[('out', 'Out of Stock'), ('low', 'Low Stock'), ('in', 'In Stock')], db_persist=True, expression=models.Case(models.When(quantity__lte=0, then=models.Value('out')), models.When(quantity__lte=10, then=models.Value('low')), default=models.Value('in')), output_field=models.CharField(max_length=3)),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='total_value',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(models.F('quantity'), '*', models.F('cost_price')), output_field=models.DecimalField(decimal_places=2, max_digits=20)),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['company', 'total_value'], name='product_company_value_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('stock_status', 'low')), fields=['company', 'quantity'], name='product_low_stock_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('stock_status', 'out')), fields=['company', 'updated_at'], name='product_out_of_stock_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-18 05:19
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_merge_20251202_2235'),
+        ('inventory', '0009_product_generated_stock_columns'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('delta', models.IntegerField()),
+                ('quantity_after', models.IntegerField()),
+                ('reason', models.CharField(choices=[('created', 'Product added'), ('increase', 'Stock increased'), ('decrease', 'Stock decreased'), ('edited', 'Quantity edited')], max_length=20)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_movements', to=settings.AUTH_USER_MODEL)),
+                ('company', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='accounts.company')),
+                ('product', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='stock_movements', to='inventory.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['company', 'created_at'], name='movement_company_created_idx'), models.Index(fields=['product', 'created_at'], name='movement_product_created_idx')],
+            },
+        ),
+    ]
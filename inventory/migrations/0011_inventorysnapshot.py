@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 05:20
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_merge_20251202_2235'),
+        ('inventory', '0010_stockmovement'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventorySnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('taken_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('data', models.JSONField()),
+                ('company', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='accounts.company')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['company', 'taken_at'], name='snapshot_company_taken_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-18 05:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_company_data_version'),
+        ('inventory', '0012_product_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='is_hot',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='StockCounterShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField()),
+                ('allowance', models.IntegerField(default=0)),
+                ('delta', models.IntegerField(default=0)),
+                ('updates', models.PositiveBigIntegerField(default=0)),
+                ('company', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='accounts.company')),
+                ('product', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='counter_shards', to='inventory.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['company', 'product'], name='counter_company_product_idx')],
+                'constraints': [models.UniqueConstraint(fields=('product', 'shard'), name='unique_counter_shard')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-18 05:59
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_company_data_version'),
+        ('inventory', '0014_productimport'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductBulkUpdate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('field', models.CharField(choices=[('cost_price', 'Cost price'), ('quantity', 'Quantity')], max_length=20)),
+                ('operation', models.CharField(choices=[('set', 'Set to'), ('add', 'Add'), ('multiply', 'Multiply by')], max_length=20)),
+                ('value', models.DecimalField(decimal_places=4, max_digits=14)),
+                ('filters', models.JSONField(blank=True, default=dict)),
+                ('product_count', models.PositiveIntegerField(default=0)),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='product_bulk_updates', to=settings.AUTH_USER_MODEL)),
+                ('company', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='accounts.company')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['company', 'created_at'], name='bulkupdate_company_created_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 5.2.7 on 2026-10-18 06:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_company_data_version'),
+        ('inventory', '0015_productbulkupdate'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_company_quantity_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_company_updated_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_company_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_company_name_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_company_value_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_low_stock_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_out_of_stock_idx',
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('archived_at__isnull', True)), fields=['company', 'quantity'], name='product_company_quantity_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('archived_at__isnull', True)), fields=['company', 'updated_at'], name='product_company_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('archived_at__isnull', True)), fields=['company', 'created_at'], name='product_company_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('archived_at__isnull', True)), fields=['company', 'item_name'], name='product_company_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('archived_at__isnull', True)), fields=['company', 'total_value'], name='product_company_value_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('archived_at__isnull', True), ('stock_status', 'low')), fields=['company', 'quantity'], name='product_low_stock_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('archived_at__isnull', True), ('stock_status', 'out')), fields=['company', 'updated_at'], name='product_out_of_stock_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('archived_at__isnull', False)), fields=['company', 'archived_at'], name='product_archived_idx'),
+        ),
+    ]
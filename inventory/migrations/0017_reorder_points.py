@@ -0,0 +1,89 @@
+# Generated by Django 5.2.7 on 2026-10-18 06:06
+
+import django.db.models.deletion
+import django.db.models.functions.comparison
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def open_alerts(apps, schema_editor):
+    """Open an alert for every live product already at or below its reorder level."""
+    Product = apps.get_model('inventory', 'Product')
+    StockAlert = apps.get_model('inventory', 'StockAlert')
+    rows = (
+        Product.objects.filter(archived_at__isnull=True, quantity__lte=models.F('reorder_level'))
+        .values_list('company_id', 'pk', 'quantity', 'reorder_level')
+        .iterator()
+    )
+    StockAlert.objects.bulk_create(
+        (
+            StockAlert(company_id=company_id, product_id=pk, quantity=quantity, reorder_level=reorder_level)
+            for company_id, pk, quantity, reorder_level in rows
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_company_data_version'),
+        ('inventory', '0016_product_archived_at'),
+    ]
+
+    operations = [
+        # A generated column cannot be altered: drop stock_status (and the
+        # partial indexes on it) and add it back generated from reorder_level
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_low_stock_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_out_of_stock_idx',
+        ),
+        migrations.RemoveField(
+            model_name='product',
+            name='stock_status',
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='reorder_point',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='reorder_level',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.comparison.Coalesce(models.F('reorder_point'), models.Value(10)), output_field=models.IntegerField()),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='stock_status',
+            field=models.GeneratedField(choices=[('out', 'Out of Stock'), ('low', 'Low Stock'), ('in', 'In Stock')], db_persist=True, expression=models.Case(models.When(quantity__lte=0, then=models.Value('out')), models.When(quantity__lte=django.db.models.functions.comparison.Coalesce(models.F('reorder_point'), models.Value(10)), then=models.Value('low')), default=models.Value('in')), output_field=models.CharField(max_length=3)),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('archived_at__isnull', True), ('stock_status', 'low')), fields=['company', 'quantity'], name='product_low_stock_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('archived_at__isnull', True), ('stock_status', 'out')), fields=['company', 'updated_at'], name='product_out_of_stock_idx'),
+        ),
+        migrations.CreateModel(
+            name='StockAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField()),
+                ('reorder_level', models.IntegerField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('resolved_at', models.DateTimeField(blank=True, null=True)),
+                ('company', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='accounts.company')),
+                ('product', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='stock_alerts', to='inventory.product')),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('resolved_at__isnull', True)), fields=['company', 'created_at'], name='alert_open_company_idx'), models.Index(fields=['product', 'created_at'], name='alert_product_created_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('resolved_at__isnull', True)), fields=('product',), name='alert_one_open_per_product')],
+            },
+        ),
+        migrations.RunPython(open_alerts, migrations.RunPython.noop),
+    ]
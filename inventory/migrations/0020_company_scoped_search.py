@@ -0,0 +1,64 @@
+# Scope the full-text search index by company: an UNINDEXED company_id column
+# in the FTS5 table on SQLite, a (company_id, search_vector) GIN index on PostgreSQL
+
+from django.db import migrations
+
+FTS_COLUMNS = "item_name, category, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'"
+
+
+def fts5_table_exists(schema_editor):
+    return 'inventory_product_fts' in schema_editor.connection.introspection.table_names()
+
+
+def scope_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        if not fts5_table_exists(schema_editor):
+            # SQLite built without FTS5; search falls back to icontains
+            return
+        schema_editor.execute("DROP TABLE inventory_product_fts")
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE inventory_product_fts USING fts5("
+            f"company_id UNINDEXED, {FTS_COLUMNS})"
+        )
+        schema_editor.execute(
+            "INSERT INTO inventory_product_fts (rowid, company_id, item_name, category) "
+            "SELECT id, company_id, item_name, category FROM inventory_product"
+        )
+    elif vendor == 'postgresql':
+        # btree_gin lets one GIN index cover the company equality and the tsquery
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS btree_gin")
+        schema_editor.execute(
+            "CREATE INDEX inventory_product_company_search_idx "
+            "ON inventory_product USING GIN (company_id, search_vector)"
+        )
+        schema_editor.execute("DROP INDEX IF EXISTS inventory_product_search_vector_idx")
+
+
+def unscope_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        if not fts5_table_exists(schema_editor):
+            return
+        schema_editor.execute("DROP TABLE inventory_product_fts")
+        schema_editor.execute(f"CREATE VIRTUAL TABLE inventory_product_fts USING fts5({FTS_COLUMNS})")
+        schema_editor.execute(
+            "INSERT INTO inventory_product_fts (rowid, item_name, category) "
+            "SELECT id, item_name, category FROM inventory_product"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE INDEX inventory_product_search_vector_idx ON inventory_product USING GIN (search_vector)"
+        )
+        schema_editor.execute("DROP INDEX IF EXISTS inventory_product_company_search_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0019_notification_claims'),
+    ]
+
+    operations = [
+        migrations.RunPython(scope_search_index, unscope_search_index),
+    ]
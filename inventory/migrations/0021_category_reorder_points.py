@@ -0,0 +1,70 @@
+# Generated by Django 5.2.7 on 2026-10-18 06:43
+
+import django.db.models.deletion
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_company_data_version'),
+        ('inventory', '0020_company_scoped_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='category_reorder_point',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        # Generated columns cannot be altered: drop reorder_level and
+        # stock_status (and the partial indexes on the latter) and add them
+        # back generated with the category default
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_low_stock_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_out_of_stock_idx',
+        ),
+        migrations.RemoveField(
+            model_name='product',
+            name='stock_status',
+        ),
+        migrations.RemoveField(
+            model_name='product',
+            name='reorder_level',
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='reorder_level',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.comparison.Coalesce(models.F('reorder_point'), models.F('category_reorder_point'), models.Value(10)), output_field=models.IntegerField()),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='stock_status',
+            field=models.GeneratedField(choices=[('out', 'Out of Stock'), ('low', 'Low Stock'), ('in', 'In Stock')], db_persist=True, expression=models.Case(models.When(quantity__lte=0, then=models.Value('out')), models.When(quantity__lte=django.db.models.functions.comparison.Coalesce(models.F('reorder_point'), models.F('category_reorder_point'), models.Value(10)), then=models.Value('low')), default=models.Value('in')), output_field=models.CharField(max_length=3)),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('archived_at__isnull', True), ('stock_status', 'low')), fields=['company', 'quantity'], name='product_low_stock_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('archived_at__isnull', True), ('stock_status', 'out')), fields=['company', 'updated_at'], name='product_out_of_stock_idx'),
+        ),
+        migrations.CreateModel(
+            name='CategoryReorderPoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(choices=[('electronics', 'Electronics'), ('clothing', 'Clothing'), ('food', 'Food & Beverages'), ('books', 'Books'), ('home', 'Home & Garden'), ('sports', 'Sports & Outdoors'), ('health', 'Health & Beauty'), ('other', 'Other')], max_length=50)),
+                ('reorder_point', models.PositiveIntegerField()),
+                ('company', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='accounts.company')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('company', 'category'), name='reorder_default_one_per_category')],
+            },
+        ),
+    ]
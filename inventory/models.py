@@ -1,7 +1,48 @@
 from django.db import models
+from django.db.models.functions import Coalesce
+from django.contrib.auth.models import User
 from django.urls import reverse
+from django.utils import timezone
 from accounts.models import Company
 import base64
+import hashlib
+
+# Products at or below their reorder level (but above zero) count as low
+# stock. The level is the product's own reorder point, else the company's
+# default for its category (CategoryReorderPoint), else LOW_STOCK_THRESHOLD.
+# Product.reorder_level and Product.stock_status are generated from these,
+# so changing LOW_STOCK_THRESHOLD needs a migration.
+LOW_STOCK_THRESHOLD = 10
+
+REORDER_LEVEL = Coalesce(
+    models.F('reorder_point'), models.F('category_reorder_point'), models.Value(LOW_STOCK_THRESHOLD)
+)
+
+
+def stock_status(quantity, reorder_level=LOW_STOCK_THRESHOLD):
+    """
+    Return 'out', 'low' or 'in' for a stock quantity.
+
+    Mirrors the Product.stock_status column for quantities that have not
+    been written to the database yet.
+    """
+    if quantity <= 0:
+        return 'out'
+    if quantity <= reorder_level:
+        return 'low'
+    return 'in'
+
+
+# Condition of the partial indexes covering live (not archived) products
+LIVE = models.Q(archived_at__isnull=True)
+
+
+class LiveProductManager(models.Manager):
+    """Products that are not archived; the default manager of Product."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(archived_at__isnull=True)
+
 
 class Product(models.Model):
     CATEGORY_CHOICES = [
@@ -30,6 +71,12 @@ class Product(models.Model):
         ('cartons', 'Cartons'),
         ('bags', 'Bags'),
     ]
+
+    STOCK_STATUS_CHOICES = [
+        ('out', 'Out of Stock'),
+        ('low', 'Low Stock'),
+        ('in', 'In Stock'),
+    ]
     
     item_name = models.CharField(max_length=200)
     
@@ -37,6 +84,8 @@ class Product(models.Model):
     image = models.TextField(null=True, blank=True)
     image_content_type = models.CharField(max_length=50, null=True, blank=True)
     image_name = models.CharField(max_length=255, null=True, blank=True)
+    # SHA-256 of the decoded image bytes, used as the ETag of the image endpoint
+    image_hash = models.CharField(max_length=64, null=True, blank=True)
     
     category = models.CharField(max_length=50, choices=CATEGORY_CHOICES, default='other')
     quantity = models.IntegerField(default=0)
@@ -45,17 +94,101 @@ class Product(models.Model):
     company = models.ForeignKey(Company, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
-    
+    # Incremented by every write, so an edit form can tell whether the row
+    # changed since it was loaded (see inventory/concurrency.py)
+    version = models.PositiveIntegerField(default=0)
+    # Opt-in for products that get many concurrent stock clicks: their
+    # adjustments go to StockCounterShard rows (see inventory/counters.py)
+    is_hot = models.BooleanField(default=False)
+    # Set when the product is archived (see inventory/archive.py). Archived
+    # products keep their history but leave every list, count and report
+    # of the current inventory
+    archived_at = models.DateTimeField(null=True, blank=True)
+    # Low stock at or below this quantity; empty uses the category default
+    reorder_point = models.PositiveIntegerField(null=True, blank=True)
+    # Copy of the company's CategoryReorderPoint for the category, which
+    # the generated columns cannot read from its own table; kept in sync
+    # by save() and inventory/reorder.py
+    category_reorder_point = models.PositiveIntegerField(null=True, blank=True, editable=False)
+
+    # Computed and stored by the database so they can be sorted, filtered,
+    # aggregated and indexed like any other column
+    total_value = models.GeneratedField(
+        expression=models.F('quantity') * models.F('cost_price'),
+        output_field=models.DecimalField(max_digits=20, decimal_places=2),
+        db_persist=True,
+    )
+    reorder_level = models.GeneratedField(
+        expression=REORDER_LEVEL,
+        output_field=models.IntegerField(),
+        db_persist=True,
+    )
+    # Generated columns cannot refer to each other, so this repeats REORDER_LEVEL
+    stock_status = models.GeneratedField(
+        expression=models.Case(
+            models.When(quantity__lte=0, then=models.Value('out')),
+            models.When(quantity__lte=REORDER_LEVEL, then=models.Value('low')),
+            default=models.Value('in'),
+        ),
+        output_field=models.CharField(max_length=3),
+        db_persist=True,
+        choices=STOCK_STATUS_CHOICES,
+    )
+
+    # Live products only; all_objects also returns archived ones, for
+    # history (snapshots, reports as of a past date) and restoring them
+    objects = LiveProductManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        # Every list, dashboard and report query is scoped to one company,
+        # so each index leads with company and ends with the filter/sort
+        # column. They only hold live products, the rows those queries read
+        indexes = [
+            models.Index(fields=['company', 'quantity'], name='product_company_quantity_idx', condition=LIVE),
+            models.Index(fields=['company', 'updated_at'], name='product_company_updated_idx', condition=LIVE),
+            models.Index(fields=['company', 'created_at'], name='product_company_created_idx', condition=LIVE),
+            models.Index(fields=['company', 'item_name'], name='product_company_name_idx', condition=LIVE),
+            models.Index(fields=['company', 'total_value'], name='product_company_value_idx', condition=LIVE),
+            # Partial indexes only hold the few rows that need attention, so
+            # counting or listing them never touches the rest of the catalog
+            models.Index(
+                fields=['company', 'quantity'],
+                name='product_low_stock_idx',
+                condition=LIVE & models.Q(stock_status='low'),
+            ),
+            models.Index(
+                fields=['company', 'updated_at'],
+                name='product_out_of_stock_idx',
+                condition=LIVE & models.Q(stock_status='out'),
+            ),
+            models.Index(
+                fields=['company', 'archived_at'],
+                name='product_archived_idx',
+                condition=models.Q(archived_at__isnull=False),
+            ),
+        ]
+
     def __str__(self):
         return f"{self.item_name} ({self.company.name})"
     
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'category' in update_fields:
+            self.category_reorder_point = CategoryReorderPoint.point_for(self.company_id, self.category)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'category_reorder_point'}
+        # Plain saves (admin, scripts) also make open edit forms stale
+        if not self._state.adding:
+            self.version += 1
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'version'}
+        super().save(*args, **kwargs)
+    
     def get_absolute_url(self):
         return reverse('product_detail', kwargs={'pk': self.pk})
     
-    @property
-    def total_value(self):
-        return self.quantity * self.cost_price
-    
     def get_display_quantity(self):
         return f"{self.quantity} {self.unit_of_measure}"
     
@@ -80,6 +213,27 @@ class Product(models.Model):
         }
         return exceptions.get(unit, unit[:-1] if unit.endswith("s") else unit)
     
+    @property
+    def image_url(self):
+        """URL of the cacheable image endpoint, versioned by the image hash."""
+        if self.image_hash:
+            return f"{reverse('inventory:product_image', kwargs={'pk': self.pk})}?v={self.image_hash[:16]}"
+        return None
+    
+    @property
+    def thumbnail_url(self):
+        """Image URL for list cells (small resized variant)."""
+        if self.image_url:
+            return f"{self.image_url}&size=thumb"
+        return None
+    
+    @property
+    def detail_image_url(self):
+        """Image URL for the product detail page (medium resized variant)."""
+        if self.image_url:
+            return f"{self.image_url}&size=detail"
+        return None
+    
     @property
     def image_base64(self):
         """Get image as base64 data URL for HTML display."""
@@ -99,6 +253,19 @@ class Product(models.Model):
                 return None
         return None
     
+    def get_image_bytes(self):
+        """Return the decoded image bytes, or None if there is no usable image."""
+        if not self.image:
+            return None
+        image_data = self.image
+        if image_data.startswith('data:'):
+            image_data = image_data.split(',', 1)[-1]
+        try:
+            return base64.b64decode(image_data)
+        except (ValueError, TypeError) as e:
+            print(f"Error decoding image: {e}")
+            return None
+    
     def set_image_from_file(self, uploaded_file):
         """Set image from uploaded file."""
         if uploaded_file:
@@ -111,10 +278,341 @@ class Product(models.Model):
                 
                 # Store in image field
                 self.image = encoded
+                self.image_hash = hashlib.sha256(file_content).hexdigest()
                 self.image_content_type = uploaded_file.content_type
                 self.image_name = uploaded_file.name
                 return True
             except Exception as e:
                 print(f"Error setting image: {e}")
                 return False
-        return False
\ No newline at end of file
+        return False
+
+
+class FullTextMatch(models.Lookup):
+    """field__match=query compiles to SQLite's "field MATCH query"."""
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} MATCH {rhs}", lhs_params + rhs_params
+
+
+class SearchDocumentField(models.TextField):
+    """The hidden FTS5 column named after its table, used on the left of MATCH."""
+
+
+SearchDocumentField.register_lookup(FullTextMatch)
+
+
+class ProductSearchEntry(models.Model):
+    """
+    Row of the SQLite FTS5 table behind product search (see inventory/search.py).
+
+    The table is created by a migration only on SQLite; this unmanaged model
+    just lets the ORM join it to Product by rowid.
+    """
+    product = models.OneToOneField(
+        Product,
+        primary_key=True,
+        db_column='rowid',
+        db_constraint=False,
+        on_delete=models.DO_NOTHING,
+        related_name='search_entry',
+    )
+    # UNINDEXED column, so a search only returns the company's own matches
+    company = models.ForeignKey(Company, db_constraint=False, on_delete=models.DO_NOTHING, related_name='+')
+    document = SearchDocumentField(db_column='inventory_product_fts')
+    # FTS5's built-in bm25 score for the current MATCH; lower is more relevant
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'inventory_product_fts'
+
+
+class ProductImageVariant(models.Model):
+    """Resized copy of a product image, generated when the image is uploaded."""
+    SIZE_CHOICES = [
+        ('thumb', 'Thumbnail'),
+        ('detail', 'Detail'),
+    ]
+
+    FORMAT_CHOICES = [
+        ('webp', 'WebP'),
+        ('jpeg', 'JPEG'),
+    ]
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='image_variants')
+    size = models.CharField(max_length=10, choices=SIZE_CHOICES)
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES)
+    # Base64 encoded image bytes, same storage as Product.image
+    data = models.TextField()
+    content_hash = models.CharField(max_length=64)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'size', 'format'], name='unique_product_image_variant'),
+        ]
+
+    def __str__(self):
+        return f"{self.product.item_name} - {self.size} ({self.format})"
+
+    @property
+    def content_type(self):
+        return f"image/{self.format}"
+
+
+class StockMovement(models.Model):
+    """
+    One change to a product's quantity.
+
+    The ledger is append-only: rows are written in batches by
+    inventory.ledger.MovementBuffer and never updated afterwards.
+    """
+    REASON_CHOICES = [
+        ('created', 'Product added'),
+        ('increase', 'Stock increased'),
+        ('decrease', 'Stock decreased'),
+        ('edited', 'Quantity edited'),
+    ]
+
+    # The composite indexes below lead with these columns, so the
+    # single-column foreign key indexes would be redundant
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, db_index=False)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, db_index=False, related_name='stock_movements')
+    delta = models.IntegerField()
+    quantity_after = models.IntegerField()
+    actor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='stock_movements')
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    # Set when the change happens, not when the buffer is flushed
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['company', 'created_at'], name='movement_company_created_idx'),
+            models.Index(fields=['product', 'created_at'], name='movement_product_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product.item_name}: {self.delta:+d} ({self.get_reason_display()})"
+
+
+class InventorySnapshot(models.Model):
+    """
+    Quantity and cost price of every product of a company at one moment.
+
+    A whole catalog is stored in one row, so a snapshot costs one INSERT and
+    one read regardless of the number of products.
+    """
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, db_index=False)
+    # Includes every stock movement created strictly before this time
+    taken_at = models.DateTimeField(default=timezone.now)
+    # {"<product id>": [quantity, "<cost price>"]}
+    data = models.JSONField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['company', 'taken_at'], name='snapshot_company_taken_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.company.name} inventory at {self.taken_at:%Y-%m-%d %H:%M}"
+
+
+class StockCounterShard(models.Model):
+    """
+    One of the counter rows of a hot product.
+
+    Stock clicks on a hot product change one of these rows instead of the
+    product row, so concurrent clicks rarely wait for the same lock. The
+    effective quantity is Product.quantity plus the deltas of all shards
+    until the compactor folds them back (inventory/counters.py).
+    """
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, db_index=False)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, db_index=False, related_name='counter_shards')
+    shard = models.PositiveSmallIntegerField()
+    # Part of Product.quantity this shard may hand out; allowance + delta never drops below zero
+    allowance = models.IntegerField(default=0)
+    # Net change since the last compaction
+    delta = models.IntegerField(default=0)
+    # Adjustments made through this shard, never reset; part of the page ETag
+    updates = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'shard'], name='unique_counter_shard'),
+        ]
+        indexes = [
+            models.Index(fields=['company', 'product'], name='counter_company_product_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product.item_name} shard {self.shard}: {self.delta:+d}"
+
+
+class ProductImport(models.Model):
+    """
+    One bulk product import (inventory/importer.py) and its error report.
+
+    The report is a CSV of the rejected rows with their errors, in the
+    import format, so it can be fixed and uploaded again.
+    """
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, db_index=False)
+    actor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='product_imports')
+    file_name = models.CharField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True)
+    row_count = models.PositiveIntegerField(default=0)
+    created_count = models.PositiveIntegerField(default=0)
+    updated_count = models.PositiveIntegerField(default=0)
+    error_count = models.PositiveIntegerField(default=0)
+    error_report = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['company', 'created_at'], name='import_company_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.file_name} ({self.company.name}, {self.created_at:%Y-%m-%d %H:%M})"
+
+
+class ProductBulkUpdate(models.Model):
+    """
+    One set-based bulk update of prices or quantities (inventory/bulk_update.py).
+
+    Quantity changes are also in the stock movement ledger, one entry per
+    product; this row records the operation itself and the filter it
+    applied to.
+    """
+    FIELD_CHOICES = [
+        ('cost_price', 'Cost price'),
+        ('quantity', 'Quantity'),
+    ]
+    OPERATION_CHOICES = [
+        ('set', 'Set to'),
+        ('add', 'Add'),
+        ('multiply', 'Multiply by'),
+    ]
+
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, db_index=False)
+    actor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='product_bulk_updates')
+    created_at = models.DateTimeField(auto_now_add=True)
+    field = models.CharField(max_length=20, choices=FIELD_CHOICES)
+    operation = models.CharField(max_length=20, choices=OPERATION_CHOICES)
+    value = models.DecimalField(max_digits=14, decimal_places=4)
+    # The filter fields of BulkUpdateForm that were set
+    filters = models.JSONField(default=dict, blank=True)
+    product_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['company', 'created_at'], name='bulkupdate_company_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_operation_display()} {self.get_field_display().lower()} {self.value} ({self.company.name}, {self.created_at:%Y-%m-%d %H:%M})"
+
+
+class StockAlert(models.Model):
+    """
+    A product at or below its reorder level (inventory/alerts.py).
+
+    An alert is opened when a change takes the quantity down to the reorder
+    level and resolved when one takes it back above, so the open alerts are
+    the products to reorder, read from a partial index.
+    """
+    # The indexes below lead with these columns
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, db_index=False)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, db_index=False, related_name='stock_alerts')
+    # The quantity and reorder level that opened the alert
+    quantity = models.IntegerField()
+    reorder_level = models.IntegerField()
+    created_at = models.DateTimeField(default=timezone.now)
+    resolved_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['company', 'created_at'],
+                name='alert_open_company_idx',
+                condition=models.Q(resolved_at__isnull=True),
+            ),
+            models.Index(fields=['product', 'created_at'], name='alert_product_created_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['product'],
+                condition=models.Q(resolved_at__isnull=True),
+                name='alert_one_open_per_product',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.product.item_name}: {self.quantity} <= {self.reorder_level}"
+
+
+class CategoryReorderPoint(models.Model):
+    """
+    A company's default reorder point for one category, used by the
+    products of the category that have no reorder point of their own.
+
+    Changed through inventory.reorder.set_category_reorder_point, which
+    copies it onto the products.
+    """
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, db_index=False)
+    category = models.CharField(max_length=50, choices=Product.CATEGORY_CHOICES)
+    reorder_point = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['company', 'category'], name='reorder_default_one_per_category'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_category_display()}: {self.reorder_point}"
+
+    @classmethod
+    def point_for(cls, company_id, category):
+        """The company's default for category, None if it has none."""
+        return cls.objects.filter(company_id=company_id, category=category).values_list(
+            'reorder_point', flat=True
+        ).first()
+
+
+class StockNotification(models.Model):
+    """
+    A low or out of stock crossing waiting for the company's digest email
+    (inventory/notifications.py).
+    """
+    STATUS_CHOICES = [
+        ('low', 'Low stock'),
+        ('out', 'Out of stock'),
+    ]
+
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, db_index=False)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_notifications')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES)
+    # The quantity and reorder level of the crossing
+    quantity = models.IntegerField()
+    reorder_level = models.IntegerField()
+    created_at = models.DateTimeField(default=timezone.now)
+    # Set while a digest worker is sending it
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    # Set when a digest has covered it
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['company', 'created_at'],
+                name='notice_pending_company_idx',
+                condition=models.Q(sent_at__isnull=True),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.product.item_name}: {self.get_status_display()} ({self.quantity})"
@@ -0,0 +1,167 @@
+# inventory/notifications.py
+"""
+Low-stock digest emails.
+
+A busy shift can take dozens of products below their reorder level; the
+business owners get one email about them, not one per product.
+
+- The alert engine (inventory/alerts.py) queues a StockNotification for
+  every change that takes a product into low or out of stock, in the
+  transaction that made the change. Nothing is sent during the request.
+- send_digests, run by the send_stock_digests command, picks the
+  companies whose oldest queued notification is DIGEST_WINDOW old and
+  sends each one email covering all of its queued notifications. Every
+  email of a run goes through one SMTP connection.
+- The notifications of a digest are claimed, and the claim committed,
+  before the email goes out, so no transaction stays open on the SMTP
+  server and two workers never send the same notifications. A failed
+  send releases the claim for the next run; the claim of a worker that
+  died mid-send expires after CLAIM_TIMEOUT.
+
+Products restocked before their digest goes out are left out of it.
+"""
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import get_connection
+from django.db import transaction
+from django.db.models import Q
+from django.template.loader import render_to_string
+from django.utils import timezone
+from accounts.models import Company, UserProfile
+from accounts.utils import send_infobip_email
+from .counters import apply_pending, pending_deltas
+from .models import Product, StockNotification, stock_status
+
+# How long the first crossing of a company waits for others to join it
+DIGEST_WINDOW = timedelta(minutes=getattr(settings, 'LOW_STOCK_DIGEST_WINDOW_MINUTES', 15))
+# How long a worker's claim on notifications holds before another may send them
+CLAIM_TIMEOUT = timedelta(minutes=10)
+
+
+def crossing(before, after, reorder_level):
+    """
+    'low' or 'out' if a change from before to after took the product into
+    that status, else None. before is None for a product just created.
+    """
+    status = stock_status(after, reorder_level)
+    if status == 'in':
+        return None
+    if before is not None and stock_status(before, reorder_level) in (status, 'out'):
+        return None
+    return status
+
+
+def due_companies(now=None):
+    """Companies with a notification queued for at least DIGEST_WINDOW."""
+    now = now or timezone.now()
+    return Company.objects.filter(
+        pk__in=StockNotification.objects.filter(
+            sent_at__isnull=True, created_at__lte=now - DIGEST_WINDOW
+        ).values('company_id')
+    ).order_by('pk')
+
+
+def digest_products(company, product_ids):
+    """The live products among product_ids still low or out of stock, out of stock first."""
+    products = list(Product.objects.filter(company=company, pk__in=product_ids).defer('image'))
+    # Hot products are judged on their effective quantity
+    apply_pending(products, pending_deltas(company, product_ids))
+    return sorted(
+        (product for product in products if product.stock_status != 'in'),
+        key=lambda product: (product.stock_status != 'out', product.item_name.lower()),
+    )
+
+
+def claim_notifications(company, now=None):
+    """
+    Claim a company's unsent notifications for this worker.
+
+    The claim is committed on return, so the email can be sent outside any
+    transaction.
+
+    Returns:
+        (claimed_at, notices) where notices is a list of (pk, product_id)
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        # Locked so that two workers never claim the same notifications
+        notices = list(
+            StockNotification.objects.select_for_update(skip_locked=True)
+            .filter(company=company, sent_at__isnull=True)
+            .filter(Q(claimed_at__isnull=True) | Q(claimed_at__lte=now - CLAIM_TIMEOUT))
+            .values_list('pk', 'product_id')
+        )
+        StockNotification.objects.filter(pk__in=[pk for pk, _ in notices]).update(claimed_at=now)
+    return now, notices
+
+
+def send_digest(company, connection=None):
+    """
+    Send a company's queued notifications to its business owners as one email.
+
+    The notifications are marked sent, unless no email could be sent; their
+    claim is then released and they are tried again on the next run.
+
+    Returns the number of products in the email (0 if none was sent).
+    """
+    claimed_at, notices = claim_notifications(company)
+    if not notices:
+        return 0
+    claimed = StockNotification.objects.filter(pk__in=[pk for pk, _ in notices], claimed_at=claimed_at)
+
+    products = digest_products(company, {product_id for _, product_id in notices})
+    recipients = list(
+        UserProfile.objects.filter(company=company, role='business_owner')
+        .exclude(user__email='')
+        .values_list('user__email', flat=True)
+    )
+
+    if products and recipients:
+        out_count = sum(1 for product in products if product.stock_status == 'out')
+        context = {
+            'company': company,
+            'products': products,
+            'out_count': out_count,
+            'low_count': len(products) - out_count,
+        }
+        subject = f"TrackWise: {len(products)} product{'s' if len(products) != 1 else ''} to reorder"
+        html_content = render_to_string('inventory/stock_digest_email.html', context)
+        text_content = render_to_string('inventory/stock_digest_email.txt', context)
+        sent = [
+            send_infobip_email(email, subject, html_content, text_content, connection=connection)
+            for email in recipients
+        ]
+        if not any(sent):
+            print(f"Error sending the low-stock digest of {company.name}; will retry")
+            claimed.update(claimed_at=None)
+            return 0
+    else:
+        products = []
+
+    claimed.update(sent_at=timezone.now())
+    return len(products)
+
+
+def send_digests(company=None):
+    """
+    Send the digests that are due.
+
+    Args:
+        company: only this company id
+
+    Returns the number of companies sent a digest.
+    """
+    companies = due_companies()
+    if company:
+        companies = companies.filter(pk=company)
+    companies = list(companies)
+    if not companies:
+        return 0
+
+    sent = 0
+    # One SMTP connection for the whole run
+    with get_connection() as connection:
+        for due in companies:
+            if send_digest(due, connection):
+                sent += 1
+    return sent
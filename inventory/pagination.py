@@ -0,0 +1,115 @@
+# inventory/pagination.py
+import base64
+import json
+from django.db.models import FloatField, Q
+
+PAGE_SIZE = 50
+
+# Sort options offered on the inventory list, mapped to the column they order by
+SORT_FIELDS = {
+    'name': 'item_name',
+    'quantity': 'quantity',
+    'cost_price': 'cost_price',
+    'total_value': 'total_value',
+    'updated_at': 'updated_at',
+    # Only available on querysets annotated by search.rank_products
+    'relevance': 'search_rank',
+}
+DEFAULT_SORT = 'name'
+
+
+def normalize_sort(sort):
+    """Return a valid sort key such as 'name' or '-cost_price'."""
+    if sort and sort.lstrip('-') in SORT_FIELDS:
+        return sort
+    return DEFAULT_SORT
+
+
+def sort_products(products, sort=DEFAULT_SORT):
+    """Order a whole queryset the way paginate_products orders each page."""
+    sort = normalize_sort(sort)
+    prefix = '-' if sort.startswith('-') else ''
+    return products.order_by(f"{prefix}{SORT_FIELDS[sort.lstrip('-')]}", f'{prefix}pk')
+
+
+def encode_cursor(sort_value, pk):
+    """Encode the (sort value, id) position of a row as an opaque URL-safe string."""
+    raw = json.dumps([str(sort_value), pk]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, field):
+    """Decode a cursor back into (sort value, id), or None if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        sort_value, pk = json.loads(raw)
+        return field.to_python(sort_value), int(pk)
+    except Exception:
+        return None
+
+
+def paginate_products(products, sort=DEFAULT_SORT, after=None, before=None, page_size=PAGE_SIZE):
+    """
+    Return one page of products using keyset pagination on (sort key, id).
+
+    Unlike OFFSET, each page is a range scan that starts right after the
+    cursor row, so later pages cost the same as the first one. Cursors only
+    hold the sort value and id of a row, so they stay valid when the search
+    term changes.
+
+    Args:
+        products: Product queryset (already scoped to the company and search)
+        sort: one of SORT_FIELDS, optionally prefixed with '-' for descending
+        after: cursor of the last row of the previous page (next page)
+        before: cursor of the first row of the following page (previous page)
+        page_size: number of rows per page
+
+    Returns:
+        dict with products (list), next_cursor and prev_cursor
+    """
+    sort = normalize_sort(sort)
+    descending = sort.startswith('-')
+    column = SORT_FIELDS[sort.lstrip('-')]
+
+    if column == 'search_rank':
+        field = FloatField()
+    else:
+        field = products.model._meta.get_field(column)
+        if field.generated:
+            field = field.output_field
+
+    cursor = decode_cursor(after or before, field) if (after or before) else None
+    # Walking backwards is the same query with the order flipped
+    backwards = bool(cursor) and not after
+    reverse = descending != backwards
+
+    if cursor:
+        value, pk = cursor
+        lookup = 'lt' if reverse else 'gt'
+        products = products.filter(
+            Q(**{f'{column}__{lookup}': value}) |
+            Q(**{column: value, f'pk__{lookup}': pk})
+        )
+
+    prefix = '-' if reverse else ''
+    rows = list(products.order_by(f'{prefix}{column}', f'{prefix}pk')[:page_size + 1])
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if backwards:
+        rows.reverse()
+
+    def cursor_for(product):
+        return encode_cursor(getattr(product, column), product.pk)
+
+    next_cursor = prev_cursor = None
+    if rows:
+        if has_more or backwards:
+            next_cursor = cursor_for(rows[-1])
+        if (cursor and not backwards) or (backwards and has_more):
+            prev_cursor = cursor_for(rows[0])
+
+    return {
+        'products': rows,
+        'next_cursor': next_cursor,
+        'prev_cursor': prev_cursor,
+    }
@@ -0,0 +1,58 @@
+# inventory/reorder.py
+"""
+Per-category default reorder points.
+
+A business owner can set a reorder point for each category. Products of
+the category without a reorder point of their own use it; products of
+categories without one use LOW_STOCK_THRESHOLD.
+
+The generated Product.reorder_level and stock_status columns cannot read
+another table, so each product carries a copy of its category's default
+in category_reorder_point:
+
+- Product.save() and the edit and import paths copy it when a product is
+  created or changes category.
+- set_category_reorder_point rewrites the copies of a whole category with
+  one UPDATE, then reconciles the low-stock alerts of the products whose
+  level moved (see inventory/alerts.py).
+"""
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from accounts.versioning import bump_data_version
+from .alerts import reconcile
+from .models import CategoryReorderPoint, Product
+
+
+def category_reorder_points(company):
+    """The company's category defaults as a dict of category -> reorder point."""
+    return dict(CategoryReorderPoint.objects.filter(company=company).values_list('category', 'reorder_point'))
+
+
+def set_category_reorder_point(company, category, reorder_point):
+    """
+    Set (or, with None, remove) a company's default reorder point for a category.
+
+    Returns the number of products whose reorder level moved.
+    """
+    with transaction.atomic():
+        if reorder_point is None:
+            CategoryReorderPoint.objects.filter(company=company, category=category).delete()
+        else:
+            CategoryReorderPoint.objects.update_or_create(
+                company=company, category=category, defaults={'reorder_point': reorder_point}
+            )
+        products = Product.all_objects.filter(company=company, category=category)
+        if reorder_point is None:
+            unchanged = Q(category_reorder_point__isnull=True)
+        else:
+            unchanged = Q(category_reorder_point=reorder_point)
+        # Products with their own reorder point keep their level
+        moved = list(products.filter(reorder_point__isnull=True).exclude(unchanged).values_list('pk', flat=True))
+        products.exclude(unchanged).update(category_reorder_point=reorder_point)
+        if moved:
+            # The rows show a new stock status
+            Product.all_objects.filter(pk__in=moved).update(updated_at=timezone.now())
+            reconcile(company, moved)
+            bump_data_version(company.pk)
+    return len(moved)
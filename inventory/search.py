@@ -0,0 +1,166 @@
+# inventory/search.py
+"""
+Full-text product search.
+
+SQLite uses an FTS5 table (inventory_product_fts) keyed by product id,
+kept in sync by the signal handlers in inventory/signals.py. PostgreSQL
+uses a generated tsvector column, which the database keeps in sync by
+itself. Other databases fall back to icontains.
+
+Searches are scoped to one company inside the full-text lookup itself: the
+FTS5 table carries the product's company_id as an UNINDEXED column, and
+PostgreSQL has one GIN index over (company_id, search_vector). Matches of
+other companies never reach the outer query.
+"""
+import re
+from django.db import connection
+from django.db.models import BooleanField, F, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'inventory_product_fts'
+
+# Word characters only, so user input can never inject query syntax
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+_fts5_available = None
+
+
+def search_backend():
+    """Return 'fts5', 'postgres' or 'icontains' for the current database."""
+    global _fts5_available
+    if connection.vendor == 'postgresql':
+        return 'postgres'
+    if connection.vendor == 'sqlite':
+        if _fts5_available is None:
+            _fts5_available = FTS_TABLE in connection.introspection.table_names()
+        return 'fts5' if _fts5_available else 'icontains'
+    return 'icontains'
+
+
+def tokenize(query):
+    return TOKEN_RE.findall(query.lower())
+
+
+def search_products(company, products, query):
+    """
+    Filter a Product queryset down to the company's rows matching the search query.
+
+    Every word must match, either whole or as a prefix, so results show
+    up while the user is still typing. The full-text lookup runs once as a
+    subquery, which keeps counts and aggregates over the result cheap.
+    """
+    tokens = tokenize(query)
+    if not tokens:
+        return products
+
+    backend = search_backend()
+    if backend == 'fts5':
+        return products.filter(
+            pk__in=RawSQL(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND company_id = %s',
+                [fts5_query(tokens), company.pk],
+            )
+        )
+
+    if backend == 'postgres':
+        return products.annotate(
+            search_match=RawSQL(
+                "inventory_product.company_id = %s AND inventory_product.search_vector @@ to_tsquery('simple', %s)",
+                [company.pk, tsquery(tokens)],
+                output_field=BooleanField(),
+            )
+        ).filter(search_match=True)
+
+    condition = Q(company=company)
+    for token in tokens:
+        condition &= Q(item_name__icontains=token) | Q(category__icontains=token)
+    return products.filter(condition)
+
+
+def rank_products(company, products, query):
+    """
+    Annotate search results with search_rank, where lower means more relevant.
+
+    Meant for ordering a page of results; on SQLite it joins the FTS5 table,
+    so use the plain search_products queryset for counts and totals.
+    """
+    tokens = tokenize(query)
+    backend = search_backend()
+    if tokens and backend == 'fts5':
+        return products.filter(
+            search_entry__document__match=fts5_query(tokens), search_entry__company=company
+        ).annotate(
+            search_rank=F('search_entry__rank')
+        )
+
+    if tokens and backend == 'postgres':
+        return products.annotate(
+            search_rank=RawSQL(
+                "-ts_rank(inventory_product.search_vector, to_tsquery('simple', %s))",
+                [tsquery(tokens)],
+                output_field=FloatField(),
+            )
+        )
+
+    return products.annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+def fts5_query(tokens):
+    # "word"* matches the word as a prefix; terms are ANDed together
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def tsquery(tokens):
+    return ' & '.join(f'{token}:*' for token in tokens)
+
+
+def index_product(product):
+    """Write a product's searchable text to the FTS5 table."""
+    if search_backend() != 'fts5':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [product.pk])
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, company_id, item_name, category) VALUES (%s, %s, %s, %s)',
+            [product.pk, product.company_id, product.item_name, product.category],
+        )
+
+
+def index_products(products):
+    """Write the searchable text of many products at once, e.g. after a bulk_create."""
+    if search_backend() != 'fts5' or not products:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [[product.pk] for product in products])
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} (rowid, company_id, item_name, category) VALUES (%s, %s, %s, %s)',
+            [[product.pk, product.company_id, product.item_name, product.category] for product in products],
+        )
+
+
+def unindex_product(product_id):
+    """Remove a product from the FTS5 table."""
+    if search_backend() != 'fts5':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [product_id])
+
+
+def rebuild_search_index():
+    """
+    Repopulate the FTS5 table from inventory_product.
+
+    Returns the number of indexed products. PostgreSQL needs no rebuild
+    because its search column is generated by the database.
+    """
+    if search_backend() != 'fts5':
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, company_id, item_name, category) '
+            f'SELECT id, company_id, item_name, category FROM inventory_product'
+        )
+        cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+        cursor.execute(f'SELECT COUNT(*) FROM {FTS_TABLE}')
+        return cursor.fetchone()[0]
@@ -0,0 +1,25 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from accounts.versioning import bump_data_version
+from .models import Product
+from .autocomplete import autocomplete_cache
+from .search import index_product, unindex_product
+
+# Fields stored in the search index; saves touching only other fields skip reindexing
+SEARCH_FIELDS = {'item_name', 'category'}
+
+
+@receiver(post_save, sender=Product)
+def update_search_index(sender, instance, created, update_fields=None, **kwargs):
+    bump_data_version(instance.company_id)
+    if update_fields is not None and not SEARCH_FIELDS & set(update_fields):
+        return
+    index_product(instance)
+    autocomplete_cache.product_saved(instance)
+
+
+@receiver(post_delete, sender=Product)
+def remove_from_search_index(sender, instance, **kwargs):
+    bump_data_version(instance.company_id)
+    unindex_product(instance.pk)
+    autocomplete_cache.product_deleted(instance)
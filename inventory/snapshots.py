@@ -0,0 +1,132 @@
+# inventory/snapshots.py
+"""
+Point-in-time inventory reconstruction.
+
+take_snapshot stores the quantity and cost price of every product of a
+company in one compact row. inventory_as_of starts from whichever known
+state is closest to the requested time (a stored snapshot, or the live
+Product table as a snapshot taken "now") and replays the stock movements in
+between, forwards or backwards. With snapshots taken every
+SNAPSHOT_INTERVAL, a reconstruction replays at most half an interval of
+movements no matter how long the ledger is.
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from .counters import pending_deltas
+from .models import InventorySnapshot, Product, StockMovement
+
+SNAPSHOT_INTERVAL = timedelta(hours=getattr(settings, 'INVENTORY_SNAPSHOT_INTERVAL_HOURS', 24))
+
+
+def take_snapshot(company):
+    """Store the current quantity and cost price of all of a company's products."""
+    with transaction.atomic():
+        taken_at = timezone.now()
+        # Archived products too: a reconstruction may start from this
+        # snapshot for a moment before they were archived
+        rows = Product.all_objects.filter(company=company).values_list('pk', 'quantity', 'cost_price')
+        pending = pending_deltas(company)
+        data = {str(pk): [quantity + pending.get(pk, 0), str(cost_price)] for pk, quantity, cost_price in rows}
+        return InventorySnapshot.objects.create(company=company, taken_at=taken_at, data=data)
+
+
+def snapshot_due(company, now=None):
+    """True when the company's latest snapshot is older than SNAPSHOT_INTERVAL."""
+    now = now or timezone.now()
+    latest = InventorySnapshot.objects.filter(company=company).order_by('-taken_at').values_list(
+        'taken_at', flat=True
+    ).first()
+    return latest is None or now - latest >= SNAPSHOT_INTERVAL
+
+
+def parse_as_of(value):
+    """
+    Parse an as_of request parameter into an aware datetime.
+
+    A bare date means the end of that day (midnight of the next one), which
+    is what "inventory as of March 31" usually means. Returns None for an
+    empty or malformed value.
+    """
+    value = (value or '').strip()
+    if not value:
+        return None
+    try:
+        day = parse_date(value)
+        if day is not None:
+            moment = datetime.combine(day + timedelta(days=1), time.min)
+        else:
+            moment = parse_datetime(value)
+    except ValueError:
+        return None
+    if moment is None:
+        return None
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def _movement_totals(company, start, end):
+    """Net quantity change per product for movements in [start, end)."""
+    return dict(
+        StockMovement.objects.filter(company=company, created_at__gte=start, created_at__lt=end)
+        .values('product_id')
+        .annotate(total=Sum('delta'))
+        .values_list('product_id', 'total')
+    )
+
+
+def inventory_as_of(company, as_of):
+    """
+    Reconstruct a company's inventory at a past moment.
+
+    Cost prices are not in the ledger, so each product keeps the cost price
+    of the state the reconstruction started from.
+
+    Returns:
+        dict mapping product id to (quantity, cost_price) for the products
+        that existed at as_of and still exist now, archived or not; those
+        archived before as_of are left out
+    """
+    now = timezone.now()
+    as_of = min(as_of, now)
+    existing = Product.all_objects.filter(company=company, created_at__lt=as_of).exclude(archived_at__lte=as_of)
+
+    snapshots = InventorySnapshot.objects.filter(company=company)
+    before = snapshots.filter(taken_at__lte=as_of).order_by('-taken_at').values_list('pk', 'taken_at').first()
+    after = snapshots.filter(taken_at__gt=as_of).order_by('taken_at').values_list('pk', 'taken_at').first()
+    # With no later snapshot the live table is the closest state after as_of
+    after_at = after[1] if after else now
+
+    if before and as_of - before[1] <= after_at - as_of:
+        base_pk, base_at = before
+        sign = 1
+        totals = _movement_totals(company, base_at, as_of)
+    else:
+        base_pk, base_at = after if after else (None, now)
+        sign = -1
+        totals = _movement_totals(company, as_of, base_at)
+
+    if base_pk is None:
+        # Live table (Decimal cost price, effective quantity) replayed backwards
+        pending = pending_deltas(company)
+        state = {
+            pk: [quantity + pending.get(pk, 0), cost_price]
+            for pk, quantity, cost_price in existing.values_list('pk', 'quantity', 'cost_price')
+        }
+    else:
+        data = InventorySnapshot.objects.values_list('data', flat=True).get(pk=base_pk)
+        state = {int(pk): [quantity, Decimal(cost_price)] for pk, (quantity, cost_price) in data.items()}
+
+    current = dict(existing.values_list('pk', 'cost_price'))
+    inventory = {}
+    for pk, cost_price in current.items():
+        # Products created after the snapshot start from zero; their
+        # "created" movement carries the opening stock
+        quantity, base_cost = state.get(pk, (0, cost_price))
+        inventory[pk] = (quantity + sign * totals.get(pk, 0), base_cost)
+    return inventory
@@ -0,0 +1,94 @@
+# inventory/streaming.py
+"""
+Streamed rendering of the full inventory list (?all=1).
+
+The page is rendered once without any rows, with a marker where the rows
+belong. Everything before the marker (header, search form and KPI cards)
+is sent right away; the rows follow in chunks read from a server-side
+iterator, and the rest of the page closes the stream. Only one chunk of
+products is ever held in memory, however large the catalog is.
+
+Under ASGI the chunks are handed over as an async iterator (see
+streaming_content); Django would otherwise read a sync iterator to the
+end before sending anything.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.middleware.csrf import get_token
+from django.template.loader import get_template, render_to_string
+from django.utils.safestring import mark_safe
+from .counters import apply_pending
+
+STREAM_CHUNK_SIZE = getattr(settings, 'INVENTORY_STREAM_CHUNK_SIZE', 200)
+
+ROWS_MARKER = mark_safe('<!-- inventory rows -->')
+
+
+def stream_rows(products, rows_template_name, row_context, chunk_size, pending=None):
+    """
+    Render the products in chunks of chunk_size rows.
+
+    pending maps hot product ids to their unfolded counter deltas, shown in
+    the rows (see inventory.counters.apply_pending).
+    """
+    rows_template = get_template(rows_template_name)
+    pending = pending or {}
+    chunk = []
+    for product in products.iterator(chunk_size=chunk_size):
+        chunk.append(product)
+        if len(chunk) == chunk_size:
+            yield rows_template.render({**row_context, 'products': apply_pending(chunk, pending)})
+            chunk = []
+    if chunk:
+        yield rows_template.render({**row_context, 'products': apply_pending(chunk, pending)})
+
+
+def streaming_content(request, chunks):
+    """
+    Content for a StreamingHttpResponse: chunks itself under WSGI, an async
+    iterator over it under ASGI.
+
+    Each chunk is produced by sync_to_async on the thread the sync views
+    run on, so the database connection and open cursors stay on one thread,
+    and the event loop is free while a chunk is rendered.
+    """
+    if not isinstance(request, ASGIRequest):
+        return chunks
+    return _iterate_async(iter(chunks))
+
+
+async def _iterate_async(chunks):
+    done = object()
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+    try:
+        while (chunk := await next_chunk(chunks, done)) is not done:
+            yield chunk
+    finally:
+        # A client that hangs up closes this generator; let the sync one
+        # release its cursor (or worker pool) too
+        if hasattr(chunks, 'close'):
+            await sync_to_async(chunks.close, thread_sensitive=True)()
+
+
+def stream_inventory_page(request, template_name, context, rows_template_name, products, chunk_size=STREAM_CHUNK_SIZE, pending=None):
+    """
+    Return an iterator over the page for a StreamingHttpResponse, async
+    under ASGI (see streaming_content).
+
+    The page shell is rendered before this returns, so template errors and
+    flash messages are handled during the request as usual. The rows
+    template is rendered without the request, so context processors run
+    once per page instead of once per chunk; the CSRF token used by the
+    row forms is passed in explicitly.
+    """
+    page = render_to_string(template_name, {**context, 'stream_rows': ROWS_MARKER}, request)
+    head, tail = page.split(ROWS_MARKER, 1)
+    row_context = {'profile': context.get('profile'), 'csrf_token': get_token(request)}
+
+    def generate():
+        yield head
+        yield from stream_rows(products, rows_template_name, row_context, chunk_size, pending)
+        yield tail
+
+    return streaming_content(request, generate())
@@ -0,0 +1,106 @@
+# inventory/templatetags/fragment_cache.py
+"""
+{% cache_fragment %}: cache a piece of a template, keyed on the given values.
+
+    {% load fragment_cache %}
+    {% cache_fragment 'inventory_row' product.pk product.updated_at profile.role %}
+        ...
+    {% endcache_fragment %}
+
+Works like Django's {% cache %} tag with three differences needed for
+per-row caching of the inventory list:
+
+- The fragment is stored in the bounded FRAGMENT_CACHE_ALIAS cache, so
+  thousands of rows cannot evict other cached data.
+- {% csrf_token %} inside the fragment is cached as a placeholder and
+  replaced with the current request's token on output, so one cached row
+  can be shared by every user who sees it.
+- If the cache backend is missing or failing the block is rendered as if
+  the tag were not there.
+"""
+from django import template
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.utils import make_template_fragment_key
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+
+register = template.Library()
+
+CACHE_ALIAS = getattr(settings, 'FRAGMENT_CACHE_ALIAS', 'fragments')
+# Seconds; by default the TIMEOUT of the cache
+CACHE_TIMEOUT = getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', DEFAULT_TIMEOUT)
+
+CSRF_PLACEHOLDER = '__fragment_cache_csrf_token__'
+CSRF_INPUT = format_html('<input type="hidden" name="csrfmiddlewaretoken" value="{}">', CSRF_PLACEHOLDER)
+
+
+def get_fragment_cache():
+    """The fragment cache, or None when it is not configured."""
+    try:
+        return caches[CACHE_ALIAS]
+    except Exception as e:
+        print(f"Fragment cache unavailable: {e}")
+        return None
+
+
+class FragmentCacheNode(template.Node):
+    def __init__(self, nodelist, fragment_name, vary_on):
+        self.nodelist = nodelist
+        self.fragment_name = fragment_name
+        self.vary_on = vary_on
+
+    def render(self, context):
+        # Look the cache up once per template render, not once per row
+        if self not in context.render_context:
+            context.render_context[self] = get_fragment_cache()
+        cache = context.render_context[self]
+        if cache is None:
+            return self.nodelist.render(context)
+
+        key = make_template_fragment_key(
+            self.fragment_name.resolve(context),
+            [var.resolve(context) for var in self.vary_on],
+        )
+        try:
+            fragment = cache.get(key)
+        except Exception as e:
+            print(f"Error reading fragment cache: {e}")
+            context.render_context[self] = None
+            return self.nodelist.render(context)
+
+        if fragment is None:
+            with context.push(csrf_token=CSRF_PLACEHOLDER):
+                fragment = self.nodelist.render(context)
+            try:
+                cache.set(key, fragment, CACHE_TIMEOUT)
+            except Exception as e:
+                print(f"Error writing fragment cache: {e}")
+                context.render_context[self] = None
+
+        csrf_token = context.get('csrf_token')
+        if csrf_token and csrf_token != 'NOTPROVIDED':
+            fragment = fragment.replace(CSRF_PLACEHOLDER, format_html('{}', csrf_token))
+        else:
+            fragment = fragment.replace(CSRF_INPUT, '')
+        return mark_safe(fragment)
+
+
+@register.tag('cache_fragment')
+def do_cache_fragment(parser, token):
+    """
+    {% cache_fragment name [var1 var2 ...] %} ... {% endcache_fragment %}
+
+    The fragment is rendered once per distinct combination of name and vars.
+    """
+    nodelist = parser.parse(('endcache_fragment',))
+    parser.delete_first_token()
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' tag requires at least one argument.")
+    return FragmentCacheNode(
+        nodelist,
+        parser.compile_filter(bits[1]),
+        [parser.compile_filter(bit) for bit in bits[2:]],
+    )
@@ -1,3 +1,1381 @@
+import asyncio
+import base64
+import hashlib
+import io
+import json
+import re
+import tempfile
+import zipfile
+from datetime import timedelta
+from decimal import Decimal
+from pathlib import Path
+from unittest import skipUnless
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F
+from django.middleware.csrf import _unmask_cipher_token
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from openpyxl import Workbook
+from PIL import Image
+from reportlab.platypus import Table
+
+from accounts.models import Company, UserProfile
+from .alerts import open_alerts, reconcile
+from .archive import archive_products
+from .autocomplete import IndexCache
+from .concurrency import encode_base, field_values
+from .counters import compact, enable_hot_mode, pending_deltas
+from .events import ChangeFeed, event_id, event_stream, event_time, latest_event_id
+from .images import recompress_image, save_image_variants
+from .importer import import_products
+from .models import LOW_STOCK_THRESHOLD, CategoryReorderPoint, InventorySnapshot, Product, ProductImageVariant, StockAlert, StockMovement, StockNotification
+from .notifications import send_digests
+from .pagination import paginate_products
+from .reorder import set_category_reorder_point
+from .search import rank_products, search_backend, search_products
+from .snapshots import inventory_as_of
+from .streaming import ROWS_MARKER
+from .templatetags.fragment_cache import CSRF_PLACEHOLDER
+from .utils import adjust_stock
+from .views import MAX_STOCK_DELTA
+
+
+class InventoryTestCase(TestCase):
+    """A company with a business owner, who is logged in for every test."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name='Acme')
+        cls.owner = User.objects.create_user('owner', email='owner@example.com', password='password')
+        UserProfile.objects.create(user=cls.owner, role='business_owner', company=cls.company)
+
+    @classmethod
+    def create_product(cls, item_name='Widget', quantity=5, cost_price='2.50', **fields):
+        """A product of the test company."""
+        return Product.objects.create(
+            item_name=item_name, quantity=quantity, cost_price=Decimal(cost_price), company=cls.company, **fields
+        )
+
+    def setUp(self):
+        self.client.force_login(self.owner)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Checks SQLite query plans')
+class CompanyIndexQueryPlanTests(InventoryTestCase):
+    """The company-scoped hot queries should be served by the composite indexes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        other = Company.objects.create(name='Other')
+        cls.staff = User.objects.create_user('staff', password='password')
+        UserProfile.objects.create(user=cls.staff, role='staff', company=cls.company)
+        for company in (cls.company, other):
+            Product.objects.bulk_create(
+                Product(item_name=f'Item {i}', quantity=i % 15, cost_price=Decimal('2.50'), company=company)
+                for i in range(30)
+            )
+
+    def query_plans(self, user, url):
+        """Request url as user and return {sql: plan} for every product or ledger SELECT it ran."""
+        self.client.force_login(user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        plans = {}
+        with connection.cursor() as cursor:
+            for query in queries.captured_queries:
+                sql = query['sql']
+                if sql.startswith('SELECT') and ('"inventory_product"' in sql or '"inventory_stockmovement"' in sql):
+                    cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                    plans[sql] = ' '.join(row[-1] for row in cursor.fetchall())
+        return plans
+
+    def assertIndexUsed(self, plans, sql_fragment, index_name):
+        matching = [plan for sql, plan in plans.items() if sql_fragment in sql]
+        self.assertTrue(matching, f'No query containing {sql_fragment!r}')
+        for plan in matching:
+            self.assertIn(index_name, plan)
+
+    def test_staff_dashboard_uses_indexes(self):
+        plans = self.query_plans(self.staff, reverse('dashboard:dashboard'))
+
+        # Today's updates must be a range on the raw column, not a date cast
+        self.assertFalse(any('django_datetime_cast_date' in sql for sql in plans))
+        self.assertIndexUsed(plans, '"updated_at" >= ', 'product_company_updated_idx')
+        self.assertIndexUsed(plans, 'ORDER BY "inventory_product"."created_at" DESC', 'product_company_created_idx')
+        self.assertIndexUsed(plans, 'ORDER BY "inventory_stockmovement"."created_at" DESC', 'movement_company_created_idx')
+
+    def test_owner_dashboard_uses_indexes(self):
+        plans = self.query_plans(self.owner, reverse('dashboard:dashboard'))
+
+        self.assertIndexUsed(plans, 'ORDER BY "inventory_product"."created_at" DESC', 'product_company_created_idx')
+        self.assertIndexUsed(plans, 'ORDER BY "inventory_stockmovement"."created_at" DESC', 'movement_company_created_idx')
+
+    def test_inventory_list_uses_indexes(self):
+        plans = self.query_plans(self.owner, reverse('inventory:inventory_list'))
+        self.assertIndexUsed(plans, 'ORDER BY "inventory_product"."item_name" ASC', 'product_company_name_idx')
+
+        plans = self.query_plans(self.owner, reverse('inventory:inventory_list') + '?sort=-quantity')
+        self.assertIndexUsed(plans, 'ORDER BY "inventory_product"."quantity" DESC', 'product_company_quantity_idx')
+
+    def test_no_full_table_scans(self):
+        plans = self.query_plans(self.staff, reverse('dashboard:dashboard'))
+        plans.update(self.query_plans(self.owner, reverse('inventory:inventory_list')))
+        for sql, plan in plans.items():
+            self.assertNotIn('SCAN inventory_product', plan, sql)
+
+
+class GeneratedStockColumnTests(InventoryTestCase):
+    """total_value and stock_status are computed by the database, and the reports read them."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.out = cls.create_product('Out', quantity=0)
+        cls.low = cls.create_product('Low', quantity=LOW_STOCK_THRESHOLD)
+        cls.stocked = cls.create_product('Stocked', quantity=LOW_STOCK_THRESHOLD + 1, cost_price='1.25')
+        cls.own_point = cls.create_product('Own point', quantity=LOW_STOCK_THRESHOLD + 1, reorder_point=20)
+
+    def test_columns_follow_queryset_updates(self):
+        self.assertEqual(
+            dict(Product.objects.values_list('item_name', 'stock_status')),
+            {'Out': 'out', 'Low': 'low', 'Stocked': 'in', 'Own point': 'low'},
+        )
+        self.assertEqual(Product.objects.get(pk=self.stocked.pk).total_value, Decimal('13.75'))
+
+        # No save(), so nothing but the database computes the new values
+        Product.objects.filter(pk=self.stocked.pk).update(quantity=F('quantity') - LOW_STOCK_THRESHOLD - 1)
+        self.assertEqual(
+            Product.objects.values_list('stock_status', 'total_value').get(pk=self.stocked.pk),
+            ('out', Decimal('0.00')),
+        )
+
+    def test_report_and_pdf_use_the_column_statuses(self):
+        expected = {
+            product.item_name: product.get_stock_status_display()
+            for product in Product.objects.all()
+        }
+        url = reverse('reports:inventory_report')
+
+        response = self.client.get(url)
+
+        inventory_data = response.context['inventory_data']
+        self.assertEqual({item['name']: item['status'] for item in inventory_data['items']}, expected)
+        self.assertEqual((inventory_data['low_stock_items'], inventory_data['out_of_stock_items']), (2, 1))
+
+        with patch('reports.pdf_generator.Table', wraps=Table) as table:
+            response = self.client.get(url, {'export': 'pdf'})
+
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        tables = [call.args[0] for call in table.call_args_list]
+        summary = dict(next(rows for rows in tables if rows[0] == ['METRIC', 'VALUE']))
+        self.assertEqual((summary['Low Stock Items'], summary['Out of Stock Items']), ('2', '1'))
+        items = next(rows for rows in tables if 'STATUS' in rows[0])
+        self.assertEqual({row[1]: row[4] for row in items[1:]}, {name: status.upper() for name, status in expected.items()})
+
+
+class StockAdjustmentTests(InventoryTestCase):
+    """+/- clicks read the locked row, then apply one conditional UPDATE without re-aggregating the catalog."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.product = cls.create_product(quantity=1)
+        cls.create_product('Gadget', quantity=20)
+
+    def click(self, name):
+        return self.client.post(reverse(f'inventory:{name}', kwargs={'pk': self.product.pk})).json()
+
+    def test_click_is_one_conditional_update(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.click('decrease_stock')
+        product_queries = [query['sql'] for query in queries if '"inventory_product"' in query['sql']]
+        updates = [sql for sql in product_queries if sql.startswith('UPDATE "inventory_product"')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"quantity" >= ', updates[0])
+        # The quantity returned is the one read under the lock, not re-read
+        # after the UPDATE, and no KPI aggregate runs
+        self.assertIs(product_queries[-1], updates[0])
+        self.assertFalse([sql for sql in product_queries if 'COUNT(' in sql or 'SUM(' in sql])
+        self.assertEqual(Product.objects.get(pk=self.product.pk).quantity, 0)
+
+    def test_quantity_stops_at_zero(self):
+        self.click('decrease_stock')
+        response = self.click('decrease_stock')
+
+        self.assertEqual(response['new_quantity'], 0)
+        self.assertEqual(response['kpi_deltas']['out_of_stock_count'], 0)
+        self.assertEqual(StockMovement.objects.filter(product=self.product).count(), 1)
+
+    def test_response_shape(self):
+        response = self.click('increase_stock')
+
+        self.assertEqual(response, {
+            'success': True,
+            'new_quantity': 2,
+            'total_value': 5.0,
+            'kpi_deltas': {
+                'total_quantity': 1,
+                'total_inventory_value': 2.5,
+                'low_stock_count': 0,
+                'out_of_stock_count': 0,
+            },
+        })
+
+
+class BulkStockAdjustmentTests(InventoryTestCase):
+    """Batched clicks are applied together, and a batch with any bad delta is rejected whole."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.widget = cls.create_product(quantity=5)
+        cls.gadget = cls.create_product('Gadget', quantity=5)
+
+    def post(self, items):
+        return self.client.post(reverse('inventory:bulk_adjust_stock'), json.dumps(items), content_type='application/json')
+
+    def quantities(self):
+        return list(Product.objects.order_by('pk').values_list('quantity', flat=True))
+
+    def test_clicks_are_summed_per_product(self):
+        response = self.post([
+            {'product_id': self.widget.pk, 'delta': 2},
+            {'product_id': self.widget.pk, 'delta': 1},
+            {'product_id': self.gadget.pk, 'delta': -9},
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.quantities(), [8, 0])
+
+    def test_invalid_deltas_reject_the_batch(self):
+        for delta in [10**30, 2**40, 1.7, True, '3', None]:
+            response = self.post([
+                {'product_id': self.gadget.pk, 'delta': 1},
+                {'product_id': self.widget.pk, 'delta': delta},
+            ])
+            self.assertEqual(response.status_code, 400, delta)
+            self.assertFalse(response.json()['success'])
+        self.assertEqual(self.quantities(), [5, 5])
+
+    def test_invalid_product_ids_reject_the_batch(self):
+        for product_id in [2**63, 10**30, 0, -1, 1.0, True, str(self.widget.pk), None]:
+            response = self.post([
+                {'product_id': self.gadget.pk, 'delta': 1},
+                {'product_id': product_id, 'delta': 1},
+            ])
+            self.assertEqual(response.status_code, 400, product_id)
+        for items in [[None], [[self.widget.pk, 1]], [{'delta': 1}]]:
+            self.assertEqual(self.post(items).status_code, 400, items)
+        self.assertEqual(self.quantities(), [5, 5])
+
+    def test_summed_delta_is_bounded(self):
+        response = self.post([{'product_id': self.widget.pk, 'delta': MAX_STOCK_DELTA}] * 2)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.quantities(), [5, 5])
+
+
+class KeysetPaginationTests(InventoryTestCase):
+    """Pages follow (sort key, id) cursors in both directions, ties included."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # Quantities repeat, so pages have to break ties on the id
+        for i in range(7):
+            cls.create_product(f'Item {i}', quantity=i // 2)
+
+    def names(self, page):
+        return [product.item_name for product in page['products']]
+
+    def test_walk_forwards_and_back(self):
+        products = Product.objects.filter(company=self.company)
+        first = paginate_products(products, sort='-quantity', page_size=3)
+        second = paginate_products(products, sort='-quantity', after=first['next_cursor'], page_size=3)
+        third = paginate_products(products, sort='-quantity', after=second['next_cursor'], page_size=3)
+
+        self.assertEqual(self.names(first), ['Item 6', 'Item 5', 'Item 4'])
+        self.assertEqual(self.names(second), ['Item 3', 'Item 2', 'Item 1'])
+        self.assertEqual(self.names(third), ['Item 0'])
+        self.assertIsNone(first['prev_cursor'])
+        self.assertIsNone(third['next_cursor'])
+
+        back = paginate_products(products, sort='-quantity', before=third['prev_cursor'], page_size=3)
+        self.assertEqual(self.names(back), self.names(second))
+        back = paginate_products(products, sort='-quantity', before=back['prev_cursor'], page_size=3)
+        self.assertEqual(self.names(back), self.names(first))
+        self.assertIsNone(back['prev_cursor'])
+
+    def test_bad_cursor_shows_the_first_page(self):
+        for cursor in ['not-a-cursor', 'WyJ4IiwgInkiXQ', '']:
+            response = self.client.get(reverse('inventory:inventory_list'), {'sort': 'quantity', 'after': cursor})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual([product.item_name for product in response.context['products']][:2], ['Item 0', 'Item 1'])
+
+
+class ProductSearchTests(InventoryTestCase):
+    """Every search word must match as a whole word or prefix within the company; results can be ranked."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # Created first, so ranking has to move the closer match ahead of it
+        cls.create_product('Red Apple Juice Carton Large', category='food')
+        cls.create_product('Red Apple', category='food')
+        cls.create_product('Green Apple', category='food')
+        cls.create_product('Red Pen', category='office')
+
+    def matches(self, query):
+        return sorted(search_products(self.company, Product.objects.all(), query).values_list('item_name', flat=True))
+
+    def test_words_and_prefixes_must_all_match(self):
+        self.assertEqual(self.matches('red app'), ['Red Apple', 'Red Apple Juice Carton Large'])
+        self.assertEqual(self.matches('offi'), ['Red Pen'])
+        # Query syntax in the input is treated as plain words
+        self.assertEqual(self.matches('"red" OR*'), [])
+        self.assertEqual(self.matches('  '), self.matches(''))
+
+    @skipUnless(connection.vendor == 'sqlite', 'Checks the FTS5 index')
+    def test_full_text_index_ranks_results(self):
+        self.assertEqual(search_backend(), 'fts5')
+        ranked = rank_products(
+            self.company, search_products(self.company, Product.objects.all(), 'red apple'), 'red apple'
+        ).order_by('search_rank')
+        self.assertEqual([product.item_name for product in ranked], ['Red Apple', 'Red Apple Juice Carton Large'])
+
+    def test_other_companies_products_are_not_matched(self):
+        other = Company.objects.create(name='Other')
+        Product.objects.create(item_name='Red Apple', quantity=1, cost_price=Decimal('1.00'), company=other)
+
+        self.assertEqual(self.matches('red apple'), ['Red Apple', 'Red Apple Juice Carton Large'])
+        ranked = rank_products(self.company, Product.objects.all(), 'red apple')
+        self.assertEqual(sorted(ranked.values_list('company_id', flat=True)), [self.company.pk] * 2)
+
+    def test_icontains_fallback_finds_the_same_products(self):
+        expected = [self.matches(query) for query in ('red app', 'offi', 'apple')]
+        with patch('inventory.search.search_backend', return_value='icontains'):
+            self.assertEqual([self.matches(query) for query in ('red app', 'offi', 'apple')], expected)
+            ranks = rank_products(self.company, Product.objects.all(), 'apple').values_list('search_rank', flat=True)
+            self.assertEqual(set(ranks), {0.0})
+
+
+class AutocompleteIndexTests(InventoryTestCase):
+    """Typeahead prefix lookups, the LRU of company indexes and their invalidation across processes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.latte = cls.create_product('Café Latte', category='food')
+        cls.create_product('Latte Macchiato', category='food')
+        cls.create_product('Green Tea', category='food')
+
+    def names(self, index_cache, query):
+        matches, _ = index_cache.search(self.company.pk, query)
+        return sorted(name for _, name in matches)
+
+    def test_prefix_matches_any_word(self):
+        index_cache = IndexCache()
+
+        self.assertEqual(self.names(index_cache, 'lat'), ['Café Latte', 'Latte Macchiato'])
+        self.assertEqual(self.names(index_cache, 'CAFE l'), ['Café Latte'])
+        self.assertEqual(self.names(index_cache, 'tea'), ['Green Tea'])
+        # Words match from their start only
+        self.assertEqual(self.names(index_cache, 'atte'), [])
+        self.assertEqual(index_cache.search(self.company.pk, 'Food &')[1], ['food'])
+
+    def test_least_recently_used_company_is_evicted(self):
+        index_cache = IndexCache(max_companies=2)
+        first, second, third = (Company.objects.create(name=name).pk for name in ['A', 'B', 'C'])
+        index_cache.get(first)
+        index_cache.get(second)
+        index_cache.get(first)
+        index_cache.get(third)
+
+        self.assertEqual(list(index_cache.indexes), [first, third])
+
+    def test_lookups_do_not_query_the_database(self):
+        index_cache = IndexCache()
+        index_cache.get(self.company.pk)
+
+        with self.assertNumQueries(0):
+            self.names(index_cache, 'lat')
+
+    def test_changes_in_another_process_rebuild_the_index(self):
+        # Two caches stand for two worker processes sharing the default cache
+        this_process, other_process = IndexCache(), IndexCache()
+        this_process.get(self.company.pk)
+        other_process.get(self.company.pk)
+
+        with patch('inventory.signals.autocomplete_cache', this_process):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.latte.item_name = 'Flat White'
+                self.latte.save()
+            # The process that saved patched its index in place
+            with self.assertNumQueries(0):
+                self.assertEqual(self.names(this_process, 'fl'), ['Flat White'])
+
+            self.assertEqual(self.names(other_process, 'fl'), ['Flat White'])
+            self.assertEqual(self.names(other_process, 'cafe'), [])
+
+    def test_rolled_back_changes_leave_the_index_alone(self):
+        index_cache = IndexCache()
+        index_cache.get(self.company.pk)
+
+        with patch('inventory.signals.autocomplete_cache', index_cache):
+            with self.captureOnCommitCallbacks(execute=False):
+                self.create_product('Espresso')
+        self.assertEqual(self.names(index_cache, 'esp'), [])
+
+
+class InventoryAsOfTests(InventoryTestCase):
+    """Past inventories start from the nearest snapshot, or the live table, and replay the ledger."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.start = timezone.now() - timedelta(days=10)
+        cls.widget = cls.create_product(quantity=14)
+        cls.gadget = cls.create_product('Gadget', quantity=5)
+        Product.objects.filter(pk=cls.widget.pk).update(created_at=cls.day(0))
+        Product.objects.filter(pk=cls.gadget.pk).update(created_at=cls.day(7.5))
+        # Widget: 10, 15 on day 2, 12 on day 4, 20 on day 6, 14 on day 8
+        # Gadget: created with 4 after the second snapshot, 5 on day 9
+        StockMovement.objects.bulk_create(
+            StockMovement(
+                company=cls.company, product=product, delta=delta, quantity_after=after, reason=reason,
+                created_at=cls.day(day),
+            )
+            for product, day, delta, after, reason in [
+                (cls.widget, 0, 10, 10, 'created'),
+                (cls.widget, 2, 5, 15, 'increase'),
+                (cls.widget, 4, -3, 12, 'decrease'),
+                (cls.widget, 6, 8, 20, 'increase'),
+                (cls.gadget, 7.5, 4, 4, 'created'),
+                (cls.widget, 8, -6, 14, 'decrease'),
+                (cls.gadget, 9, 1, 5, 'increase'),
+            ]
+        )
+        for day, quantity in [(3, 15), (7, 20)]:
+            InventorySnapshot.objects.create(
+                company=cls.company, taken_at=cls.day(day), data={str(cls.widget.pk): [quantity, '2.50']}
+            )
+
+    @classmethod
+    def day(cls, number):
+        return cls.start + timedelta(days=number)
+
+    def quantities(self, day):
+        return {pk: quantity for pk, (quantity, _) in inventory_as_of(self.company, self.day(day)).items()}
+
+    def test_before_the_first_snapshot(self):
+        self.assertEqual(self.quantities(1), {self.widget.pk: 10})
+
+    def test_between_snapshots(self):
+        # Forwards from the first snapshot, then backwards from the second
+        self.assertEqual(self.quantities(5), {self.widget.pk: 12})
+        self.assertEqual(self.quantities(6.5), {self.widget.pk: 20})
+        self.assertEqual(self.quantities(5.5), {self.widget.pk: 12})
+
+    def test_after_the_last_snapshot_uses_the_live_table(self):
+        self.assertEqual(self.quantities(8.5), {self.widget.pk: 14, self.gadget.pk: 4})
+        self.assertEqual(self.quantities(9.5), {self.widget.pk: 14, self.gadget.pk: 5})
+
+    def test_product_created_after_the_snapshot(self):
+        self.assertEqual(self.quantities(7.8), {self.widget.pk: 20, self.gadget.pk: 4})
+
+
+class InventoryEventTests(InventoryTestCase):
+    """The event stream replays what a client missed, late commits included, then follows the live feed."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.widget = cls.create_product(quantity=5)
+        cls.gadget = cls.create_product('Gadget', quantity=5)
+
+    def setUp(self):
+        super().setUp()
+        # The products were not just created
+        self.backdate(timezone.now() - timedelta(hours=1))
+
+    def events(self, body):
+        return [json.loads(line[len('data: '):]) for line in body.splitlines() if line.startswith('data: ')]
+
+    def resume(self, last_event_id):
+        response = self.client.get(reverse('inventory:inventory_events'), HTTP_LAST_EVENT_ID=str(last_event_id))
+        return self.events(response.content.decode())
+
+    def backdate(self, moment, products=None):
+        """Make the changes so far (of products, a list of ids) look like they happened at moment."""
+        movements, rows = StockMovement.objects.all(), Product.all_objects.all()
+        if products is not None:
+            movements, rows = movements.filter(product__in=products), rows.filter(pk__in=products)
+        movements.update(created_at=moment)
+        rows.update(updated_at=moment)
+
+    def test_resume_sends_only_later_changes(self):
+        adjust_stock(self.company, self.widget.pk, 1)
+        self.backdate(timezone.now() - timedelta(minutes=10))
+        resume_from = event_id(timezone.now() - timedelta(minutes=5))
+        adjust_stock(self.company, self.gadget.pk, 2)
+        adjust_stock(self.company, self.gadget.pk, 1)
+
+        [event] = self.resume(resume_from)
+        self.assertEqual(event['products'], [
+            {'product_id': self.gadget.pk, 'quantity': 8, 'cost_price': '2.50', 'total_value': 20.0, 'archived': False},
+        ])
+        self.assertEqual(event['total_products'], 2)
+        self.assertGreater(event['id'], resume_from)
+
+    def test_changes_committed_after_the_position_are_replayed(self):
+        resume_from = latest_event_id()
+        # A transaction that made its change before the client's position
+        # but committed after it
+        adjust_stock(self.company, self.widget.pk, 1)
+        self.backdate(event_time(resume_from) - timedelta(seconds=5), [self.widget.pk])
+
+        [event] = self.resume(resume_from)
+        self.assertEqual([product['product_id'] for product in event['products']], [self.widget.pk])
+
+    def test_price_edits_and_archiving_are_sent(self):
+        resume_from = event_id(timezone.now() - timedelta(minutes=1))
+        Product.objects.filter(pk=self.gadget.pk).update(cost_price=Decimal('4.00'), updated_at=timezone.now())
+        archive_products(self.company, Product.objects.filter(pk=self.widget.pk))
+
+        [event] = self.resume(resume_from)
+        products = {product['product_id']: product for product in event['products']}
+        self.assertEqual(products[self.gadget.pk]['cost_price'], '4.00')
+        self.assertEqual(products[self.gadget.pk]['total_value'], 20.0)
+        self.assertTrue(products[self.widget.pk]['archived'])
+        self.assertEqual(event['total_products'], 1)
+
+    def test_unknown_position_asks_for_a_reload(self):
+        [event] = self.resume(1234)
+        self.assertTrue(event['reload'])
+
+    def test_idle_resume_moves_the_position(self):
+        response = self.client.get(reverse('inventory:inventory_events'), HTTP_LAST_EVENT_ID=str(latest_event_id()))
+        body = response.content.decode()
+        self.assertEqual(self.events(body), [])
+        self.assertRegex(body, r'\nid: \d+\n')
+
+    def test_feed_publishes_each_change_once(self):
+        feed = ChangeFeed()
+        feed.read_at = timezone.now()
+        adjust_stock(self.company, self.widget.pk, 1)
+
+        events, feed.read_at = feed.poll([self.company.pk])
+        self.assertEqual([p['product_id'] for p in events[self.company.pk]['products']], [self.widget.pk])
+        # Read again within the window, but nothing new
+        events, feed.read_at = feed.poll([self.company.pk])
+        self.assertEqual(events, {})
+
+        Product.objects.filter(pk=self.gadget.pk).update(cost_price=Decimal('3.00'), updated_at=timezone.now())
+        events, feed.read_at = feed.poll([self.company.pk])
+        self.assertEqual([p['product_id'] for p in events[self.company.pk]['products']], [self.gadget.pk])
+
+    def test_changes_right_after_subscribing_reach_the_feed(self):
+        feed = ChangeFeed(poll_interval=0.01)
+        start = latest_event_id()
+
+        async def first_live_chunk():
+            stream = event_stream(self.company.pk, start)
+            with patch('inventory.events.change_feed', feed):
+                self.assertTrue((await anext(stream)).startswith('retry:'))
+                # The feed has its position as soon as the client is subscribed
+                self.assertGreaterEqual(event_id(feed.read_at), start)
+                await sync_to_async(adjust_stock)(self.company, self.widget.pk, 3)
+                chunk = await asyncio.wait_for(anext(stream), 5)
+                await stream.aclose()
+            await feed.task
+            return chunk
+
+        [event] = self.events(async_to_sync(first_live_chunk)())
+        self.assertGreater(event['id'], start)
+        self.assertEqual([(p['product_id'], p['quantity']) for p in event['products']], [(self.widget.pk, 8)])
+
+
+class ConditionalGetTests(InventoryTestCase):
+    """Refreshing an unchanged page is answered with 304 before any product query."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.product = cls.create_product()
+
+    def get_etag(self, url):
+        # The first response may set the CSRF cookie, which is part of the ETag
+        self.client.get(url)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def test_unchanged_pages_return_304(self):
+        for url in [
+            reverse('dashboard:dashboard'),
+            reverse('inventory:inventory_list'),
+        ]:
+            etag = self.get_etag(url)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304, url)
+            self.assertFalse(any('"inventory_product"' in q['sql'] for q in queries.captured_queries), url)
+
+    def test_changes_invalidate_etag(self):
+        url = reverse('inventory:inventory_list')
+        with self.captureOnCommitCallbacks(execute=True):
+            etag = self.get_etag(url)
+            adjust_stock(self.company, self.product.pk, 1)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        etag = self.get_etag(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.item_name = 'Gadget'
+            self.product.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class RowFragmentCacheTests(InventoryTestCase):
+    """Cached inventory rows are shared between users but never their CSRF tokens."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        other_owner = User.objects.create_user('other_owner', password='password')
+        UserProfile.objects.create(user=other_owner, role='business_owner', company=cls.company)
+        cls.owners = [cls.owner, other_owner]
+        cls.product = cls.create_product()
+
+    def test_rows_are_cached_with_the_viewers_csrf_token(self):
+        for user in self.owners:
+            self.client.force_login(user)
+            self.client.get(reverse('inventory:inventory_list'))
+            html = self.client.get(reverse('inventory:inventory_list')).content.decode()
+            self.assertNotIn(CSRF_PLACEHOLDER, html)
+            token = html.split('name="csrfmiddlewaretoken" value="')[1].split('"')[0]
+            self.assertEqual(_unmask_cipher_token(token), self.client.cookies['csrftoken'].value)
+
+    def test_changed_rows_are_rendered_again(self):
+        self.client.get(reverse('inventory:inventory_list'))
+        adjust_stock(self.company, self.product.pk, 7)
+        html = self.client.get(reverse('inventory:inventory_list')).content.decode()
+        self.assertRegex(html, rf'id="quantity-{self.product.pk}">\s*12\s*<')
+
+
+class StreamedInventoryListTests(InventoryTestCase):
+    """?all=1 streams every product in chunks, in the requested order."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        Product.objects.bulk_create(
+            Product(item_name=f'Item {i:03d}', quantity=i, cost_price=Decimal('2.50'), company=cls.company)
+            for i in range(120)
+        )
+
+    def test_all_products_are_streamed(self):
+        response = self.client.get(reverse('inventory:inventory_list') + '?all=1&sort=-quantity')
+        self.assertTrue(response.streaming)
+        chunks = [chunk.decode() for chunk in response.streaming_content]
+        html = ''.join(chunks)
+        self.assertNotIn(ROWS_MARKER, html)
+        self.assertGreater(len(chunks), 2)
+        # The KPI cards go out before any row
+        self.assertIn('kpi-total-products', chunks[0])
+        self.assertNotIn('id="quantity-', chunks[0])
+        quantities = [int(q) for q in re.findall(r'id="quantity-\d+">\s*(\d+)', html)]
+        self.assertEqual(quantities, list(range(119, -1, -1)))
+
+    async def test_chunks_are_async_under_asgi(self):
+        await self.async_client.aforce_login(self.owner)
+        response = await self.async_client.get(reverse('inventory:inventory_list') + '?all=1&sort=-quantity')
+
+        # Served chunk by chunk, not read to the end before the first byte
+        self.assertTrue(response.is_async)
+        chunks = [chunk.decode() async for chunk in response.streaming_content]
+        self.assertGreater(len(chunks), 2)
+        quantities = [int(q) for q in re.findall(r'id="quantity-\d+">\s*(\d+)', ''.join(chunks))]
+        self.assertEqual(quantities, list(range(119, -1, -1)))
+
+    def test_empty_result_is_not_streamed(self):
+        response = self.client.get(reverse('inventory:inventory_list') + '?all=1&search=nothing')
+        self.assertFalse(response.streaming)
+        self.assertEqual(response.status_code, 200)
+
+
+class OptimisticProductEditTests(InventoryTestCase):
+    """Edits are saved with a version check and merged with concurrent stock clicks."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.product = cls.create_product()
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('inventory:product_detail', kwargs={'pk': self.product.pk})
+
+    def loaded_form(self, **changes):
+        """POST data of the edit form as rendered now, with changes applied."""
+        product = Product.objects.get(pk=self.product.pk)
+        data = {name: '' if value is None else str(value) for name, value in field_values(product).items()}
+        data.update(version=product.version, base_values=encode_base(field_values(product)))
+        data.update(changes)
+        return data
+
+    def test_untouched_fields_keep_concurrent_changes(self):
+        data = self.loaded_form(cost_price='3.00')
+        adjust_stock(self.company, self.product.pk, 4)
+
+        response = self.client.post(self.url, data)
+
+        self.assertEqual(response.status_code, 302)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.cost_price, Decimal('3.00'))
+        self.assertEqual(self.product.quantity, 9)
+        self.assertEqual(self.product.version, 2)
+
+    def test_conflicting_field_shows_merge_view(self):
+        data = self.loaded_form(quantity='50', item_name='Gadget')
+        adjust_stock(self.company, self.product.pk, 1)
+
+        response = self.client.post(self.url, data)
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual([c['field'] for c in response.context['conflicts']], ['quantity'])
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.item_name, self.product.quantity), ('Widget', 6))
+        # The merge form is based on the current row, so it saves as is
+        self.assertEqual(response.context['form'].initial['version'], self.product.version)
+
+
+class HotProductCounterTests(InventoryTestCase):
+    """Stock clicks on hot products go to counter shards and are folded back later."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.product = cls.create_product(quantity=3, cost_price='2.00')
+        enable_hot_mode([cls.product.pk])
+
+    def test_clicks_never_go_below_zero(self):
+        results = [adjust_stock(self.company, self.product.pk, -1)[1] for _ in range(5)]
+
+        self.assertEqual(results, [-1, -1, -1, 0, 0])
+        self.assertEqual(pending_deltas(self.company), {self.product.pk: -3})
+        # The product row is only written when the counters are folded
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 3)
+
+    def test_compaction_folds_the_counters(self):
+        adjust_stock(self.company, self.product.pk, 4)
+        adjust_stock(self.company, self.product.pk, -1)
+
+        self.assertEqual(compact(), 1)
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.quantity, self.product.total_value), (6, Decimal('12.00')))
+        self.assertEqual(pending_deltas(self.company), {})
+        self.assertEqual(sum(self.product.counter_shards.values_list('allowance', flat=True)), 6)
+
+    def test_pages_show_the_effective_quantity(self):
+        for _ in range(3):
+            adjust_stock(self.company, self.product.pk, -1)
+
+        response = self.client.get(reverse('inventory:inventory_list'))
+
+        self.assertEqual(response.context['products'][0].quantity, 0)
+        self.assertEqual(response.context['out_of_stock_count'], 1)
+        self.assertEqual(response.context['total_inventory_value'], Decimal('0.00'))
+
+
+class ProductImportTests(InventoryTestCase):
+    """Products are created or updated in batches from an uploaded file."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.product = cls.create_product(category='books')
+
+    def upload(self, name, content):
+        return self.client.post(reverse('inventory:product_import'), {'file': SimpleUploadedFile(name, content)})
+
+    def test_csv_rows_create_update_and_report_errors(self):
+        response = self.upload(
+            'products.csv',
+            b'Name,Qty,Price,Category\nGadget,3,1.00,Electronics\nWidget,8,2.50,\nBroken,-1,1.00,\n',
+        )
+
+        result = response.context['product_import']
+        self.assertEqual((result.created_count, result.updated_count, result.error_count), (1, 1, 1))
+        self.assertEqual(Product.objects.get(item_name='Gadget').category, 'electronics')
+        self.product.refresh_from_db()
+        # An empty cell keeps the existing value
+        self.assertEqual((self.product.quantity, self.product.category), (8, 'books'))
+        self.assertEqual(
+            list(StockMovement.objects.order_by('pk').values_list('delta', 'reason')),
+            [(3, 'created'), (3, 'edited')],
+        )
+
+        report = self.client.get(reverse('inventory:product_import_errors', kwargs={'pk': result.pk}))
+        self.assertIn('Broken', report.content.decode())
+        self.assertIn('must not be negative', report.content.decode())
+
+    def test_xlsx_rows_are_imported(self):
+        workbook = Workbook()
+        workbook.active.append(['item_name', 'quantity', 'cost_price', 'unit_of_measure'])
+        for i in range(5):
+            workbook.active.append([f'Bulk {i}', i, 1.5, 'Kilograms'])
+        content = io.BytesIO()
+        workbook.save(content)
+
+        response = self.upload('products.xlsx', content.getvalue())
+
+        self.assertEqual(response.context['product_import'].created_count, 5)
+        self.assertEqual(
+            Product.objects.filter(item_name__startswith='Bulk', unit_of_measure='kilograms').count(), 5
+        )
+
+    def test_each_batch_writes_the_ledger_with_one_insert(self):
+        def rows(count, start=0):
+            return [
+                (number, {'item_name': f'Bulk {i}', 'quantity': str(i + 1), 'cost_price': '1.00'})
+                for number, i in enumerate(range(start, start + count), start=2)
+            ]
+
+        with CaptureQueriesContext(connection) as small:
+            import_products(self.company, rows(2), batch_size=2)
+        # Twenty times the rows in one batch cost the same queries
+        with self.assertNumQueries(len(small)):
+            import_products(self.company, rows(40, start=2), batch_size=40)
+
+        with CaptureQueriesContext(connection) as queries:
+            result = import_products(self.company, rows(30, start=42), batch_size=10)
+        self.assertEqual(result['created_count'], 30)
+        ledger_inserts = [query for query in queries if query['sql'].startswith('INSERT INTO "inventory_stockmovement"')]
+        self.assertEqual(len(ledger_inserts), 3)
+        self.assertEqual(StockMovement.objects.filter(reason='created').count(), 72)
+
+
+def jpeg_file(name='photo.jpg', size=(1000, 800)):
+    """An uploaded JPEG photo."""
+    photo = io.BytesIO()
+    Image.new('RGB', size, 'red').save(photo, 'JPEG')
+    return SimpleUploadedFile(name, photo.getvalue(), content_type='image/jpeg')
+
+
+class ProductImageTests(InventoryTestCase):
+    """The image endpoint is revalidated by ETag and cached for good when versioned."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.product = cls.create_product()
+        cls.product.set_image_from_file(jpeg_file())
+        cls.product.save()
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('inventory:product_image', kwargs={'pk': self.product.pk})
+
+    def test_etag_is_the_image_hash(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['ETag'], f'"{self.product.image_hash}"')
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+        self.assertEqual(response.content, self.product.get_image_bytes())
+
+    def test_matching_etag_is_not_modified_without_reading_the_image(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=f'"other", "{self.product.image_hash}"')
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], f'"{self.product.image_hash}"')
+        self.assertFalse(any('"image"' in query['sql'] for query in queries))
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH='"other"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_versioned_url_is_immutable(self):
+        response = self.client.get(self.product.image_url)
+
+        self.assertEqual(response['Cache-Control'], 'private, max-age=31536000, immutable')
+        # A stale version is revalidated
+        response = self.client.get(self.url, {'v': '0' * 16})
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+
+    def test_other_company_image_is_not_found(self):
+        other = Company.objects.create(name='Other')
+        product = Product.objects.create(item_name='Widget', quantity=1, cost_price=1, company=other)
+        product.set_image_from_file(jpeg_file())
+        product.save()
+
+        response = self.client.get(reverse('inventory:product_image', kwargs={'pk': product.pk}))
+
+        self.assertEqual(response.status_code, 404)
+
+
+class ProductImageVariantTests(InventoryTestCase):
+    """Resized variants are stored per size and format and served by the browser's Accept header."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.product = cls.create_product()
+        cls.product.set_image_from_file(jpeg_file())
+        cls.product.save()
+        save_image_variants(cls.product)
+
+    def test_every_size_and_format_is_stored(self):
+        variants = ProductImageVariant.objects.filter(product=self.product)
+
+        self.assertEqual(
+            sorted(variants.values_list('size', 'format', 'width', 'height')),
+            [('detail', 'jpeg', 600, 480), ('detail', 'webp', 600, 480),
+             ('thumb', 'jpeg', 80, 64), ('thumb', 'webp', 80, 64)],
+        )
+        for variant in variants:
+            content = base64.b64decode(variant.data)
+            self.assertEqual(variant.content_hash, hashlib.sha256(content).hexdigest())
+            self.assertEqual(Image.open(io.BytesIO(content)).format, variant.format.upper())
+
+    def test_regenerating_replaces_the_variants(self):
+        self.product.set_image_from_file(jpeg_file(size=(50, 50)))
+        self.product.save()
+
+        save_image_variants(self.product)
+
+        self.assertEqual(
+            set(ProductImageVariant.objects.filter(product=self.product).values_list('width', flat=True)), {50}
+        )
+
+    def test_webp_is_served_when_accepted(self):
+        url = reverse('inventory:product_image', kwargs={'pk': self.product.pk})
+        webp = ProductImageVariant.objects.get(product=self.product, size='thumb', format='webp')
+
+        response = self.client.get(url, {'size': 'thumb'}, HTTP_ACCEPT='image/avif,image/webp,*/*')
+
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertEqual(response['ETag'], f'"{webp.content_hash}"')
+        self.assertIn('Accept', response['Vary'])
+        self.assertEqual(response.content, base64.b64decode(webp.data))
+
+    def test_jpeg_is_served_otherwise(self):
+        url = reverse('inventory:product_image', kwargs={'pk': self.product.pk})
+
+        response = self.client.get(url, {'size': 'detail'}, HTTP_ACCEPT='image/png,image/*')
+
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(Image.open(io.BytesIO(response.content)).size, (600, 480))
+        self.assertIn('Accept', response['Vary'])
+
+    def test_unknown_size_serves_the_original(self):
+        url = reverse('inventory:product_image', kwargs={'pk': self.product.pk})
+
+        response = self.client.get(url, {'size': 'huge'}, HTTP_ACCEPT='image/webp')
+
+        self.assertEqual(response.content, self.product.get_image_bytes())
+        self.assertNotIn('Accept', response.get('Vary', ''))
+
+
+class InlinePool:
+    """Runs a ProcessPoolExecutor's map in the calling process, inside the test transaction."""
+
+    def __init__(self, max_workers=None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def map(self, fn, *iterables):
+        return map(fn, *iterables)
+
+
+@patch('inventory.management.commands.recompress_images.ProcessPoolExecutor', InlinePool)
+class RecompressImagesTests(InventoryTestCase):
+    """recompress_images rewrites stored images in checkpointed chunks."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.products = []
+        for name in ('First', 'Second'):
+            product = cls.create_product(name)
+            product.set_image_from_file(jpeg_file())
+            product.save()
+            cls.products.append(product)
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.checkpoint = Path(directory.name) / 'checkpoint.json'
+
+    def recompress(self, **options):
+        output = io.StringIO()
+        call_command(
+            'recompress_images', tables=['products'], max_edge=100, chunk_size=1,
+            checkpoint=str(self.checkpoint), stdout=output, **options
+        )
+        return output.getvalue()
+
+    def test_images_are_rewritten_and_checkpointed(self):
+        self.recompress()
+
+        for product in self.products:
+            original = product.image
+            product.refresh_from_db()
+            self.assertNotEqual(product.image, original)
+            self.assertEqual(product.image_content_type, 'image/webp')
+            self.assertEqual(product.image_hash, hashlib.sha256(product.get_image_bytes()).hexdigest())
+            self.assertEqual(Image.open(io.BytesIO(product.get_image_bytes())).size, (100, 80))
+        self.assertEqual(json.loads(self.checkpoint.read_text()), {'products': self.products[-1].pk})
+
+    def test_run_resumes_after_the_checkpoint(self):
+        first, second = self.products
+        self.checkpoint.write_text(json.dumps({'products': first.pk}))
+
+        output = self.recompress()
+
+        self.assertIn(f'resuming after id {first.pk}', output)
+        self.assertEqual(Product.objects.get(pk=first.pk).image, first.image)
+        self.assertNotEqual(Product.objects.get(pk=second.pk).image, second.image)
+
+        # --reset starts over
+        self.recompress(reset=True)
+        self.assertNotEqual(Product.objects.get(pk=first.pk).image, first.image)
+
+    def test_image_replaced_during_the_run_is_kept(self):
+        first, second = self.products
+        replacement = base64.b64encode(b'new upload').decode()
+
+        def replaced_while_encoding(job):
+            if job[0] == first.pk:
+                Product.objects.filter(pk=first.pk).update(image=replacement)
+            return recompress_image(job)
+
+        with patch('inventory.management.commands.recompress_images.recompress_image', replaced_while_encoding):
+            self.recompress()
+
+        self.assertEqual(Product.objects.get(pk=first.pk).image, replacement)
+        self.assertEqual(Product.objects.get(pk=first.pk).image_hash, first.image_hash)
+        self.assertNotEqual(Product.objects.get(pk=second.pk).image, second.image)
+
+
+class ProductImageImportTests(InventoryTestCase):
+    """Images in a ZIP archive are matched to products by name or id."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.widget = cls.create_product('Blue Widget', quantity=1, cost_price='1.00')
+        cls.gadget = cls.create_product('Gadget', quantity=1, cost_price='1.00')
+
+    def archive(self):
+        photo = io.BytesIO()
+        Image.new('RGB', (1000, 800), 'red').save(photo, 'JPEG')
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w') as zip_file:
+            zip_file.writestr('photos/blue_widget.jpg', photo.getvalue())
+            zip_file.writestr(f'{self.gadget.pk}.jpg', photo.getvalue())
+            zip_file.writestr('Unknown.jpg', photo.getvalue())
+        return SimpleUploadedFile('photos.zip', archive.getvalue())
+
+    def test_archive_images_are_matched_and_stored(self):
+        response = self.client.post(reverse('inventory:product_image_import'), {'archive': self.archive()})
+        body = b''.join(response.streaming_content).decode()
+
+        self.assertIn('showImportProgress(2, 2)', body)
+        self.assertIn('Unknown.jpg', body)
+        for product in (self.widget, self.gadget):
+            product.refresh_from_db()
+            self.assertIsNotNone(product.image_hash)
+            self.assertEqual(product.version, 1)
+            self.assertEqual(ProductImageVariant.objects.filter(product=product).count(), 4)
+
+    async def test_progress_is_async_under_asgi(self):
+        await self.async_client.aforce_login(self.owner)
+        response = await self.async_client.post(reverse('inventory:product_image_import'), {'archive': self.archive()})
+
+        self.assertTrue(response.is_async)
+        body = ''.join([chunk.decode() async for chunk in response.streaming_content])
+        self.assertIn('showImportProgress(2, 2)', body)
+        self.assertEqual(await ProductImageVariant.objects.filter(product=self.widget).acount(), 4)
+
+
+class ProductBulkUpdateTests(InventoryTestCase):
+    """Bulk price and quantity changes are previewed, then applied in one UPDATE."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for name, category, quantity in [('Apple', 'food', 10), ('Bread', 'food', 3), ('Novel', 'books', 7)]:
+            cls.create_product(name, quantity=quantity, cost_price='2.00', category=category)
+        # Another company's products are never touched
+        other = Company.objects.create(name='Other')
+        Product.objects.create(item_name='Pear', category='food', quantity=4, cost_price=Decimal('2.00'), company=other)
+
+    def post(self, **data):
+        options = {'category': 'food', 'field': 'cost_price', 'operation': 'multiply', 'value': '1.075'}
+        return self.client.post(reverse('inventory:product_bulk_update'), {**options, **data})
+
+    def test_preview_then_apply_price_change(self):
+        preview = self.post(action='preview')
+        self.assertEqual(preview.context['preview']['count'], 2)
+        self.assertEqual(Product.objects.get(item_name='Apple').cost_price, Decimal('2.00'))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post(action='apply', previewed=preview.context['previewed'])
+        self.assertEqual(response.context['bulk_update'].product_count, 2)
+        self.assertEqual(sum(query['sql'].startswith('UPDATE "inventory_product"') for query in queries), 1)
+        prices = dict(Product.objects.values_list('item_name', 'cost_price'))
+        self.assertEqual(prices, {'Apple': Decimal('2.15'), 'Bread': Decimal('2.15'), 'Novel': Decimal('2.00'), 'Pear': Decimal('2.00')})
+
+    def test_changed_options_are_previewed_again(self):
+        preview = self.post(action='preview')
+
+        response = self.post(action='apply', previewed=preview.context['previewed'], value='3')
+        self.assertIsNone(response.context.get('bulk_update'))
+        self.assertEqual(response.context['preview']['count'], 2)
+        self.assertEqual(Product.objects.get(item_name='Apple').cost_price, Decimal('2.00'))
+
+    def test_quantity_change_is_clamped_and_logged(self):
+        data = {'field': 'quantity', 'operation': 'add', 'value': '-5'}
+        preview = self.post(action='preview', **data)
+        self.post(action='apply', previewed=preview.context['previewed'], **data)
+
+        quantities = dict(Product.objects.filter(company=self.company).values_list('item_name', 'quantity'))
+        self.assertEqual(quantities, {'Apple': 5, 'Bread': 0, 'Novel': 7})
+        self.assertEqual(
+            sorted(StockMovement.objects.values_list('delta', 'quantity_after', 'reason')),
+            [(-5, 5, 'edited'), (-3, 0, 'edited')],
+        )
+
+
+class ProductArchiveTests(InventoryTestCase):
+    """Archived products leave the live catalog but stay in its history."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.apple = cls.create_product('Apple', quantity=10, cost_price='2.00', category='food')
+        cls.bread = cls.create_product('Bread', quantity=3, cost_price='2.00', category='food')
+        cls.novel = cls.create_product('Novel', quantity=7, cost_price='2.00', category='books')
+
+    def test_delete_archives_and_restore_brings_back(self):
+        before = timezone.now()
+        self.client.post(reverse('inventory:product_delete', kwargs={'pk': self.apple.pk}))
+
+        self.assertFalse(Product.objects.filter(pk=self.apple.pk).exists())
+        self.assertIsNotNone(Product.all_objects.get(pk=self.apple.pk).archived_at)
+        response = self.client.get(reverse('inventory:inventory_list'))
+        self.assertEqual(response.context['total_products'], 2)
+        with self.assertRaises(Product.DoesNotExist):
+            adjust_stock(self.company, self.apple.pk, 1)
+        # Past inventories still include it
+        self.assertEqual(inventory_as_of(self.company, before)[self.apple.pk][0], 10)
+        self.assertNotIn(self.apple.pk, inventory_as_of(self.company, timezone.now()))
+
+        response = self.client.post(reverse('inventory:product_archived_list'), {'product_ids': [self.apple.pk]})
+        self.assertEqual(response.context['restored_count'], 1)
+        self.assertTrue(Product.objects.filter(pk=self.apple.pk).exists())
+
+    def test_filter_archive_is_one_update(self):
+        enable_hot_mode([self.bread.pk])
+        data = {'category': 'food'}
+        preview = self.client.post(reverse('inventory:product_archive'), {**data, 'action': 'preview'})
+        self.assertEqual(preview.context['preview']['count'], 2)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                reverse('inventory:product_archive'),
+                {**data, 'action': 'apply', 'previewed': preview.context['previewed']},
+            )
+        self.assertEqual(response.context['archived_count'], 2)
+        self.assertEqual(
+            sum('SET "archived_at"' in query['sql'] for query in queries if query['sql'].startswith('UPDATE')), 1
+        )
+        self.assertEqual(list(Product.objects.values_list('item_name', flat=True)), ['Novel'])
+        # No stock clicks can be left pending on an archived product
+        self.assertFalse(Product.all_objects.get(pk=self.bread.pk).is_hot)
+
+
+class StockAlertTests(InventoryTestCase):
+    """Low-stock alerts open and resolve as quantities cross each product's reorder level."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.product = cls.create_product(quantity=12, reorder_point=10, category='books')
+
+    def open_alert_rows(self):
+        return list(StockAlert.objects.filter(resolved_at__isnull=True).values_list('product_id', 'quantity'))
+
+    def test_default_and_own_reorder_point(self):
+        rice = self.create_product('Rice', quantity=15, category='food')
+        self.assertEqual((rice.reorder_level, rice.stock_status), (10, 'in'))
+        gadget = self.create_product('Gadget', quantity=15, reorder_point=20)
+        self.assertEqual((gadget.reorder_level, gadget.stock_status), (20, 'low'))
+
+    def test_only_crossings_write_alerts(self):
+        adjust_stock(self.company, self.product.pk, -1)
+        self.assertEqual(self.open_alert_rows(), [])
+
+        adjust_stock(self.company, self.product.pk, -1)
+        self.assertEqual(self.open_alert_rows(), [(self.product.pk, 10)])
+
+        # Moving further down keeps the one alert, without writing to it
+        with CaptureQueriesContext(connection) as queries:
+            adjust_stock(self.company, self.product.pk, -1)
+        self.assertFalse(any('inventory_stockalert' in query['sql'] for query in queries))
+        self.assertEqual(self.open_alert_rows(), [(self.product.pk, 10)])
+
+        adjust_stock(self.company, self.product.pk, 5)
+        self.assertEqual(self.open_alert_rows(), [])
+
+    def test_new_reorder_point_is_reconciled(self):
+        Product.objects.filter(pk=self.product.pk).update(reorder_point=15)
+        self.assertEqual(reconcile(self.company, [self.product.pk]), (1, 0))
+        self.assertEqual([alert.product for alert in open_alerts(self.company)], [self.product])
+
+        response = self.client.get(reverse('inventory:stock_alerts'))
+        self.assertEqual(response.context['alert_count'], 1)
+
+    def test_category_default_applies_to_products_without_own_point(self):
+        rice = self.create_product('Rice', quantity=15, category='food')
+        url = reverse('inventory:category_reorder_points')
+
+        response = self.client.post(url, {'food': '20', 'books': '30'})
+
+        self.assertEqual(response.context['moved'], 1)
+        rice.refresh_from_db()
+        self.assertEqual((rice.reorder_level, rice.stock_status), (20, 'low'))
+        self.assertEqual(self.open_alert_rows(), [(rice.pk, 15)])
+        # Its own reorder point wins over the category default
+        self.assertEqual(Product.objects.get(pk=self.product.pk).reorder_level, 10)
+
+        # Removing the default goes back to LOW_STOCK_THRESHOLD
+        self.client.post(url, {'books': '30'})
+        rice.refresh_from_db()
+        self.assertEqual(rice.reorder_level, 10)
+        self.assertEqual(self.open_alert_rows(), [])
+
+    def test_category_change_picks_up_its_default(self):
+        set_category_reorder_point(self.company, 'food', 20)
+        rice = self.create_product('Rice', quantity=15, category='food')
+        self.assertEqual(rice.reorder_level, 20)
+        gadget = self.create_product('Gadget', quantity=15, category='electronics')
+
+        # Edit form
+        data = {name: '' if value is None else str(value) for name, value in field_values(gadget).items()}
+        data.update(version=gadget.version, base_values=encode_base(field_values(gadget)), category='food')
+        self.client.post(reverse('inventory:product_detail', kwargs={'pk': gadget.pk}), data)
+        gadget.refresh_from_db()
+        self.assertEqual((gadget.reorder_level, gadget.stock_status), (20, 'low'))
+
+        # Import
+        self.client.post(reverse('inventory:product_import'), {
+            'file': SimpleUploadedFile('products.csv', b'Name,Qty,Price,Category\nRice,15,2.50,Books\nGadget,15,2.50,Electronics\n'),
+        })
+        rice.refresh_from_db()
+        gadget.refresh_from_db()
+        self.assertEqual((rice.reorder_level, gadget.reorder_level), (10, 10))
+        self.assertEqual(self.open_alert_rows(), [])
+
+        self.client.post(reverse('inventory:product_import'), {
+            'file': SimpleUploadedFile('products.csv', b'Name,Qty,Price,Category\nRice,15,2.50,Food\n'),
+        })
+        self.assertEqual(self.open_alert_rows(), [(rice.pk, 15)])
+
+    def test_only_owners_set_category_defaults(self):
+        staff = User.objects.create_user('staff', password='password')
+        UserProfile.objects.create(user=staff, role='staff', company=self.company)
+        self.client.force_login(staff)
+
+        response = self.client.post(reverse('inventory:category_reorder_points'), {'books': '30'})
+
+        self.assertRedirects(response, reverse('inventory:stock_alerts'))
+        self.assertFalse(CategoryReorderPoint.objects.exists())
+
+
+class StockDigestTests(InventoryTestCase):
+    """Low and out of stock crossings are queued and emailed to the owners as one digest."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.products = [cls.create_product(f'Widget {i}', quantity=12, reorder_point=10, category='books') for i in range(3)]
+
+    def test_crossings_are_sent_as_one_digest_after_the_window(self):
+        first, second, third = self.products
+        adjust_stock(self.company, first.pk, -5)
+        adjust_stock(self.company, first.pk, -7)
+        adjust_stock(self.company, second.pk, -3)
+        adjust_stock(self.company, third.pk, -3)
+        adjust_stock(self.company, third.pk, 10)
+        self.assertEqual(
+            sorted(StockNotification.objects.values_list('product_id', 'status')),
+            [(first.pk, 'low'), (first.pk, 'out'), (second.pk, 'low'), (third.pk, 'low')],
+        )
+        # Nothing is sent before the window has passed
+        self.assertEqual(send_digests(), 0)
+        self.assertEqual(mail.outbox, [])
+
+        StockNotification.objects.update(created_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(send_digests(), 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['owner@example.com'])
+        self.assertEqual(mail.outbox[0].subject, 'TrackWise: 2 products to reorder')
+        # The restocked product is left out
+        self.assertIn('Widget 0: out of stock', mail.outbox[0].body)
+        self.assertIn('Widget 1: 9 pieces left', mail.outbox[0].body)
+        self.assertNotIn('Widget 2', mail.outbox[0].body)
+
+        self.assertFalse(StockNotification.objects.filter(sent_at__isnull=True).exists())
+        self.assertEqual(send_digests(), 0)
+
+    def test_email_is_sent_after_the_claim_is_committed(self):
+        adjust_stock(self.company, self.products[0].pk, -5)
+        StockNotification.objects.update(created_at=timezone.now() - timedelta(hours=1))
+        depth = len(connection.atomic_blocks)
+        depths = []
+
+        def send(*args, **kwargs):
+            depths.append(len(connection.atomic_blocks))
+            return False
+
+        with patch('inventory.notifications.send_infobip_email', side_effect=send):
+            self.assertEqual(send_digests(), 0)
+        # No transaction of the digest was open during the send
+        self.assertEqual(depths, [depth])
+        # The failed send released the claim; the next run sends it
+        self.assertTrue(StockNotification.objects.filter(claimed_at__isnull=True, sent_at__isnull=True).exists())
+        self.assertEqual(send_digests(), 1)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_claimed_notifications_wait_for_the_claim_to_expire(self):
+        adjust_stock(self.company, self.products[0].pk, -5)
+        StockNotification.objects.update(created_at=timezone.now() - timedelta(hours=1), claimed_at=timezone.now())
+        self.assertEqual(send_digests(), 0)
+        self.assertEqual(mail.outbox, [])
 
-# Create your tests here.
+        StockNotification.objects.update(claimed_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(send_digests(), 1)
+        self.assertFalse(StockNotification.objects.filter(sent_at__isnull=True).exists())
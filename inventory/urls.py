@@ -6,7 +6,19 @@ app_name = 'inventory'
 urlpatterns = [
     path('', views.inventory_list, name='inventory_list'),
     path('add/', views.product_add, name='product_add'),
+    path('import/', views.product_import, name='product_import'),
+    path('import/<int:pk>/errors/', views.product_import_errors, name='product_import_errors'),
+    path('import/images/', views.product_image_import, name='product_image_import'),
+    path('bulk-update/', views.product_bulk_update, name='product_bulk_update'),
+    path('archive/', views.product_archive, name='product_archive'),
+    path('archived/', views.product_archived_list, name='product_archived_list'),
+    path('alerts/', views.stock_alerts, name='stock_alerts'),
+    path('alerts/defaults/', views.category_reorder_points, name='category_reorder_points'),
+    path('autocomplete/', views.product_autocomplete, name='product_autocomplete'),
+    path('adjust/', views.bulk_adjust_stock, name='bulk_adjust_stock'),
+    path('events/', views.inventory_events, name='inventory_events'),
     path('<int:pk>/', views.product_detail, name='product_detail'),
+    path('<int:pk>/image/', views.product_image, name='product_image'),
     path('<int:pk>/delete/', views.product_delete, name='product_delete'),
     path('<int:pk>/increase/', views.increase_stock, name='increase_stock'),
     path('<int:pk>/decrease/', views.decrease_stock, name='decrease_stock'),
@@ -0,0 +1,174 @@
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, IntegerField, Q, Sum, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+from accounts.versioning import bump_data_version
+from .counters import adjust_hot_stock, pending_deltas
+from .ledger import MovementBuffer
+from .models import Product, LOW_STOCK_THRESHOLD, stock_status
+
+
+def get_inventory_stats(company, products=None):
+    """
+    Compute the inventory KPIs for a company in a single aggregate query
+    (plus one each for the pending counters of hot products).
+
+    Args:
+        company: Company whose products are counted
+        products: Optional pre-filtered Product queryset (e.g. a search result)
+
+    Returns:
+        dict with total_products, total_quantity, total_inventory_value,
+        low_stock_count and out_of_stock_count
+    """
+    if products is None:
+        products = Product.objects.all()
+
+    value_field = DecimalField(max_digits=20, decimal_places=2)
+    stats = products.filter(company=company).order_by().aggregate(
+        total_products=Count('pk'),
+        total_quantity=Coalesce(Sum('quantity'), 0),
+        total_inventory_value=Coalesce(
+            Sum('total_value'),
+            Value(Decimal('0.00')),
+            output_field=value_field,
+        ),
+        low_stock_count=Count('pk', filter=Q(stock_status='low')),
+        out_of_stock_count=Count('pk', filter=Q(stock_status='out')),
+    )
+
+    # Hot products' counter deltas are not in Product.quantity yet
+    pending = pending_deltas(company)
+    if pending:
+        rows = products.filter(company=company, pk__in=pending.keys()).values_list(
+            'pk', 'quantity', 'cost_price', 'reorder_level'
+        )
+        for pk, quantity, cost_price, reorder_level in rows:
+            before = stock_status(quantity, reorder_level)
+            after = stock_status(quantity + pending[pk], reorder_level)
+            stats['total_quantity'] += pending[pk]
+            stats['total_inventory_value'] += pending[pk] * cost_price
+            stats['low_stock_count'] += (after == 'low') - (before == 'low')
+            stats['out_of_stock_count'] += (after == 'out') - (before == 'out')
+    return stats
+
+
+def adjust_stock(company, product_id, delta, actor=None):
+    """
+    Atomically add delta to a product's quantity without letting it go below zero.
+
+    The row is locked and read first, then changed with a single conditional
+    UPDATE (quantity = quantity + delta WHERE quantity + delta >= 0), so
+    concurrent clicks queue on the row and never overwrite each other, and
+    the returned quantity is the one this click produced. Products in hot
+    mode go through their counter shards instead (see inventory.counters).
+    The change is recorded in the stock movement ledger in the same
+    transaction.
+
+    Returns:
+        (product, applied_delta) where product only has quantity, cost_price,
+        total_value and reorder_level loaded and applied_delta is 0 when the
+        update would have gone negative.
+
+    Raises:
+        Product.DoesNotExist if the product is not in the company
+    """
+    with transaction.atomic(), MovementBuffer(actor) as ledger:
+        fields = ('quantity', 'cost_price', 'total_value', 'is_hot', 'company', 'reorder_level')
+        # Hot products are not locked: their clicks must not queue on the row
+        product = (
+            Product.objects.select_for_update().only(*fields)
+            .filter(pk=product_id, company=company, is_hot=False).first()
+        )
+        if product is None:
+            product = Product.objects.only(*fields).get(pk=product_id, company=company)
+            if not product.is_hot:
+                # Hot mode ended between the two reads
+                product = Product.objects.select_for_update().only(*fields).get(pk=product_id)
+        if product.is_hot:
+            # Sharded counters; the company version is left alone so hot
+            # clicks do not all queue on the company row instead
+            return adjust_hot_stock(product, delta, ledger)
+        updated = Product.objects.filter(pk=product_id, quantity__gte=-delta).update(
+            quantity=F('quantity') + delta, version=F('version') + 1, updated_at=timezone.now()
+        )
+        if not updated:
+            return product, 0
+        product.quantity += delta
+        product.total_value = product.quantity * product.cost_price
+        ledger.add(company.pk, product.pk, delta, product.quantity, reorder_level=product.reorder_level)
+        bump_data_version(company.pk)
+    return product, delta
+
+
+def stock_kpi_deltas(before, after, cost_price, reorder_level=LOW_STOCK_THRESHOLD):
+    """
+    Work out how the company KPIs move when one product goes from
+    before to after units, without re-aggregating the catalog.
+    """
+    before_status = stock_status(before, reorder_level)
+    after_status = stock_status(after, reorder_level)
+    return {
+        'total_quantity': after - before,
+        'total_inventory_value': float((after - before) * cost_price),
+        'low_stock_count': (after_status == 'low') - (before_status == 'low'),
+        'out_of_stock_count': (after_status == 'out') - (before_status == 'out'),
+    }
+
+
+def adjust_stock_bulk(company, deltas, actor=None):
+    """
+    Apply several stock adjustments in one transaction.
+
+    All rows are changed by a single UPDATE whose per-row delta comes from a
+    CASE expression. Quantities are clamped at zero, matching what the same
+    clicks would have done one at a time through adjust_stock. The applied
+    changes are written to the stock movement ledger with one bulk INSERT.
+    Products in hot mode are adjusted one by one through their counter
+    shards.
+
+    Args:
+        company: Company that owns the products
+        deltas: dict mapping product id to the net quantity change
+        actor: User recorded on the ledger entries
+
+    Returns:
+        dict mapping product id to (new_quantity, total_value) for every
+        product of the company that was adjusted
+    """
+    if not deltas:
+        return {}
+
+    delta_case = Case(
+        *[When(pk=pk, then=Value(delta)) for pk, delta in deltas.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    with transaction.atomic(), MovementBuffer(actor) as ledger:
+        # Lock the rows so the ledger records exactly the change this UPDATE made
+        before = dict(
+            Product.objects.select_for_update().filter(
+                pk__in=deltas.keys(), company=company, is_hot=False
+            ).values_list('pk', 'quantity')
+        )
+        Product.objects.filter(pk__in=before.keys()).update(
+            quantity=Greatest(F('quantity') + delta_case, Value(0)),
+            version=F('version') + 1,
+            updated_at=timezone.now(),
+        )
+        rows = Product.objects.filter(pk__in=before.keys()).values_list('pk', 'quantity', 'total_value', 'reorder_level')
+        updated = {}
+        for pk, quantity, total_value, reorder_level in rows:
+            updated[pk] = (quantity, total_value)
+            ledger.add(company.pk, pk, quantity - before[pk], quantity, reorder_level=reorder_level)
+        if before:
+            bump_data_version(company.pk)
+
+        hot = Product.objects.filter(
+            pk__in=deltas.keys(), company=company, is_hot=True
+        ).only('quantity', 'cost_price', 'company', 'reorder_level')
+        for product in hot:
+            product, _ = adjust_hot_stock(product, deltas[product.pk], ledger, clamp=True)
+            updated[product.pk] = (product.quantity, product.total_value)
+        return updated
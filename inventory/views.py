@@ -1,14 +1,73 @@
 from django.shortcuts import render, get_object_or_404, redirect
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse
-from django.db.models import Q
-from .models import Product
-from .forms import ProductForm
+from django.db import transaction
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, HttpResponse, HttpResponseNotModified, Http404, StreamingHttpResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from urllib.parse import urlencode
+from .models import Product, ProductImageVariant, ProductImport
+from .forms import BulkUpdateForm, CategoryReorderPointsForm, ProductFilterForm, ProductForm
+from .autocomplete import autocomplete_cache, CATEGORY_LABELS
+from . import reorder
+from .alerts import open_alerts
+from .archive import archive_products, archived_products, unarchive_products
+from .bulk_update import PREVIEW_SIZE, apply_bulk_update, filter_products, preview_bulk_update
+from .concurrency import decode_base, encode_base, field_values, save_product_edit
+from .events import event_stream, latest_event_id, pending_events
+from .ledger import MovementBuffer
+from .image_import import IMAGE_IMPORT_WORKERS, ImageImport
+from .importer import IMPORT_BATCH_SIZE, ErrorReport, import_products, read_rows
+from .images import VARIANT_SIZES, preferred_format, save_image_variants
+from .pagination import paginate_products, normalize_sort, sort_products
+from .search import search_products, rank_products
+from .counters import apply_pending, pending_deltas
+from .streaming import stream_inventory_page, streaming_content
+from .utils import get_inventory_stats, adjust_stock, adjust_stock_bulk, stock_kpi_deltas, LOW_STOCK_THRESHOLD
 from accounts.models import UserProfile
+from accounts.versioning import company_etag, company_last_modified
+from asgiref.sync import sync_to_async
+from concurrent.futures import ThreadPoolExecutor
 import base64
+import io
+import json
+import os
+
+# Upper bound on the number of products a single batched adjustment may touch
+MAX_BULK_ADJUSTMENTS = 500
+# Largest change to one product's quantity a batched adjustment may ask for,
+# per item and summed; keeps quantities well inside the 32 bit column
+MAX_STOCK_DELTA = 1_000_000
+# Largest primary key of the 64 bit id column
+MAX_PRODUCT_ID = 2**63 - 1
+
+# Open low-stock alerts listed on the alerts page
+ALERTS_PAGE_SIZE = 200
+
+# Where the streamed image import page shows its progress
+IMPORT_PROGRESS_MARKER = mark_safe('<!-- import progress -->')
+
+SORT_CHOICES = [
+    ('relevance', 'Best Match'),
+    ('name', 'Name (A-Z)'),
+    ('-name', 'Name (Z-A)'),
+    ('quantity', 'Quantity: Low to High'),
+    ('-quantity', 'Quantity: High to Low'),
+    ('cost_price', 'Cost: Low to High'),
+    ('-cost_price', 'Cost: High to Low'),
+    ('total_value', 'Total Value: Low to High'),
+    ('-total_value', 'Total Value: High to Low'),
+    ('-updated_at', 'Recently Updated'),
+    ('updated_at', 'Least Recently Updated'),
+]
 
 @login_required
+@condition(etag_func=company_etag, last_modified_func=company_last_modified)
+@cache_control(private=True, no_cache=True)
 def inventory_list(request):
     try:
         profile = request.user.userprofile
@@ -16,40 +75,145 @@ def inventory_list(request):
         messages.error(request, 'User profile not found.')
         return redirect('dashboard:dashboard')
     
-    products = Product.objects.filter(company=profile.company)
+    # Image blobs are served by product_image, never loaded for the list
+    products = Product.objects.filter(company=profile.company).defer('image')
     
     search_query = request.GET.get('search', '')
     if search_query:
-        products = products.filter(
-            Q(item_name__icontains=search_query) |
-            Q(category__icontains=search_query)
-        )
+        products = search_products(profile.company, products, search_query)
     
+    # Old cost_filter links still map onto the cost price sort
     cost_filter = request.GET.get('cost_filter', '')
-    if cost_filter == 'low':
-        products = products.order_by('cost_price')
-    elif cost_filter == 'high':
-        products = products.order_by('-cost_price')
+    sort = request.GET.get('sort') or {'low': 'cost_price', 'high': '-cost_price'}.get(cost_filter)
+    if search_query and not sort:
+        sort = 'relevance'
+    elif not search_query and sort and sort.lstrip('-') == 'relevance':
+        sort = None
+    sort = normalize_sort(sort)
     
-    total_inventory_value = sum(product.total_value for product in products)
+    stats = get_inventory_stats(profile.company, products)
+    if sort.lstrip('-') == 'relevance':
+        products = rank_products(profile.company, products, search_query)
     
-    low_stock_count = products.filter(quantity__lte=10, quantity__gt=0).count()
-    out_of_stock_count = products.filter(quantity=0).count()
+    # ?all=1 lists the whole catalog on one streamed page instead of paging
+    show_all = request.GET.get('all') == '1'
+    page = {'products': [], 'next_cursor': None, 'prev_cursor': None}
+    if not show_all:
+        page = paginate_products(
+            products,
+            sort=sort,
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+        )
+    
+    # Page links keep the search term and sort, and swap in the new cursor
+    base_params = {'sort': sort}
+    if search_query:
+        base_params['search'] = search_query
+    next_url = prev_url = None
+    if page['next_cursor']:
+        next_url = '?' + urlencode({**base_params, 'after': page['next_cursor']})
+    if page['prev_cursor']:
+        prev_url = '?' + urlencode({**base_params, 'before': page['prev_cursor']})
     
+    # Hot products show their effective quantity (see inventory.counters)
+    pending = pending_deltas(profile.company)
     context = {
-        'products': products,
+        'products': apply_pending(page['products'], pending),
         'search_query': search_query,
-        'cost_filter': cost_filter,
+        'sort': sort,
+        'sort_choices': SORT_CHOICES,
+        'next_url': next_url,
+        'prev_url': prev_url,
+        'show_all': show_all,
+        'show_all_url': '?' + urlencode({**base_params, 'all': '1'}),
         'profile': profile,
-        'total_inventory_value': total_inventory_value,
-        'low_stock_count': low_stock_count,
-        'out_of_stock_count': out_of_stock_count,
+        'total_products': stats['total_products'],
+        'total_inventory_value': stats['total_inventory_value'],
+        'low_stock_count': stats['low_stock_count'],
+        'out_of_stock_count': stats['out_of_stock_count'],
+        'low_stock_threshold': LOW_STOCK_THRESHOLD,
+        'last_event_id': latest_event_id(),
     }
     
     if profile.role == 'business_owner':
-        return render(request, 'inventory/inventory_list.html', context)
+        template, rows_template = 'inventory/inventory_list.html', 'inventory/product_rows.html'
+    else:
+        template, rows_template = 'inventory/inventory_list_staff.html', 'inventory/product_rows_staff.html'
+    
+    if show_all and stats['total_products']:
+        return StreamingHttpResponse(
+            stream_inventory_page(request, template, context, rows_template, sort_products(products, sort), pending=pending)
+        )
+    return render(request, template, context)
+
+@login_required
+async def inventory_events(request):
+    """
+    Server-sent events with quantity and KPI changes for the user's company.
+
+    Served as a long-lived stream under ASGI. Under WSGI it answers with
+    the changes so far and lets the browser reconnect after the retry delay.
+    """
+    user = await request.auser()
+    try:
+        profile = await UserProfile.objects.aget(user=user)
+    except UserProfile.DoesNotExist:
+        raise Http404
+
+    # Browsers send Last-Event-ID on reconnect; the first connection passes
+    # the id the page was rendered at
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+
+    if isinstance(request, ASGIRequest):
+        response = StreamingHttpResponse(
+            event_stream(profile.company_id, last_event_id), content_type='text/event-stream'
+        )
     else:
-        return render(request, 'inventory/inventory_list_staff.html', context)
+        body = await sync_to_async(pending_events)(profile.company_id, last_event_id)
+        response = HttpResponse(body, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx-style proxies from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+@login_required
+@cache_control(private=True, no_cache=True)
+def product_autocomplete(request):
+    """
+    Typeahead suggestions for the search box, served from the in-memory
+    prefix index. There is no ETag: computing one would cost each keystroke
+    more queries than the index lookup it saves.
+    """
+    try:
+        profile = request.user.userprofile
+    except UserProfile.DoesNotExist:
+        return JsonResponse({'results': []})
+    
+    query = request.GET.get('q', '')
+    if not query.strip():
+        return JsonResponse({'results': []})
+    
+    matches, categories = autocomplete_cache.search(profile.company_id, query)
+    
+    results = [
+        {'kind': 'category', 'value': code, 'label': CATEGORY_LABELS.get(code, code)}
+        for code in categories
+    ]
+    results += [
+        {
+            'kind': 'product',
+            'value': item_name,
+            'label': item_name,
+            'url': reverse('inventory:product_detail', kwargs={'pk': product_id}),
+        }
+        for product_id, item_name in matches
+    ]
+    return JsonResponse({'results': results})
 
 @login_required
 def product_detail(request, pk):
@@ -60,27 +224,55 @@ def product_detail(request, pk):
         return redirect('dashboard:dashboard')
     
     product = get_object_or_404(Product, pk=pk, company=profile.company)
+    # The form edits the effective quantity of a hot product; saving folds
+    # its counters first (see save_product_edit)
+    apply_pending([product], pending_deltas(profile.company, [product.pk]))
     
     if request.method == 'POST':
         if profile.role != 'business_owner':
             messages.error(request, 'Access denied. Only business owners can edit products.')
             return redirect('inventory:inventory_list')
         
+        # Forms rendered before versioning compare against the row as it is now
+        loaded_base = field_values(product)
         form = ProductForm(request.POST, request.FILES, instance=product)
         if form.is_valid():
-            # Get the product instance
+            # The form has written the posted values onto the instance
             updated_product = form.save(commit=False)
+            version = form.cleaned_data.get('version')
+            base = decode_base(form.cleaned_data.get('base_values'))
+            if version is None or base is None:
+                version, base = updated_product.version, loaded_base
             
             # Handle image upload if new image provided
             uploaded_image = request.FILES.get('image_upload')
             if uploaded_image:
                 updated_product.set_image_from_file(uploaded_image)
             
-            # Save the product
-            updated_product.save()
+            # Conditional single-row UPDATE; any quantity change goes to the ledger
+            with transaction.atomic(), MovementBuffer(request.user) as ledger:
+                conflicts = save_product_edit(
+                    updated_product, version, base, image_changed=bool(uploaded_image), ledger=ledger
+                )
             
-            messages.success(request, f'Product "{product.item_name}" updated successfully!')
-            return redirect('inventory:inventory_list')
+            if not conflicts:
+                if uploaded_image:
+                    save_image_variants(updated_product)
+                messages.success(request, f'Product "{updated_product.item_name}" updated successfully!')
+                return redirect('inventory:inventory_list')
+            
+            # Show the merge view: the form starts from the merged values and
+            # the current version, and each conflicting field lists both sides
+            product = updated_product
+            form = ProductForm(instance=product, initial={'version': product.version, 'base_values': encode_base(base)})
+            context = {
+                'form': form,
+                'product': product,
+                'profile': profile,
+                'conflicts': conflicts,
+                'image_dropped': bool(uploaded_image),
+            }
+            return render(request, 'inventory/product_detail.html', context, status=409)
         else:
             # Show form errors
             for field, errors in form.errors.items():
@@ -100,6 +292,62 @@ def product_detail(request, pk):
     else:
         return render(request, 'inventory/product_detail_staff.html', context)
 
+@login_required
+def product_image(request, pk):
+    """
+    Serve a product image as raw bytes so browsers can cache it.
+
+    ?size=thumb or ?size=detail returns a resized variant, in WebP when the
+    browser accepts it and JPEG otherwise; without it the original upload is
+    returned. The ETag is a stored content hash, so a revalidation is
+    answered with a 304 without reading any image data. Requests carrying
+    the matching ?v= version are marked immutable.
+    """
+    try:
+        profile = request.user.userprofile
+    except UserProfile.DoesNotExist:
+        raise Http404
+    
+    meta = Product.objects.filter(pk=pk, company=profile.company).values(
+        'image_hash', 'image_content_type'
+    ).first()
+    if not meta or not meta['image_hash']:
+        raise Http404
+    
+    # Fall back to the original when no variant was generated for this image
+    variant = None
+    size = request.GET.get('size')
+    if size in VARIANT_SIZES:
+        variant = ProductImageVariant.objects.filter(
+            product_id=pk, size=size, format=preferred_format(request)
+        ).values('pk', 'content_hash', 'format').first()
+    
+    content_hash = variant['content_hash'] if variant else meta['image_hash']
+    etag = f'"{content_hash}"'
+    if request.GET.get('v') == meta['image_hash'][:16]:
+        cache_control = 'private, max-age=31536000, immutable'
+    else:
+        cache_control = 'private, no-cache'
+    
+    if_none_match = request.headers.get('If-None-Match', '')
+    if etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*':
+        response = HttpResponseNotModified()
+    elif variant:
+        data = ProductImageVariant.objects.values_list('data', flat=True).get(pk=variant['pk'])
+        response = HttpResponse(base64.b64decode(data), content_type=f"image/{variant['format']}")
+    else:
+        product = Product.objects.only('image', 'image_content_type').get(pk=pk)
+        image_bytes = product.get_image_bytes()
+        if image_bytes is None:
+            raise Http404
+        response = HttpResponse(image_bytes, content_type=meta['image_content_type'] or 'image/jpeg')
+    
+    response['ETag'] = etag
+    response['Cache-Control'] = cache_control
+    if size in VARIANT_SIZES:
+        response['Vary'] = 'Accept'
+    return response
+
 @login_required
 def product_add(request):
     try:
@@ -120,8 +368,12 @@ def product_add(request):
             if uploaded_image:
                 product.set_image_from_file(uploaded_image)
             
-            # Save the product
-            product.save()
+            # Save the product and log its opening stock in the ledger
+            with transaction.atomic(), MovementBuffer(request.user) as ledger:
+                product.save()
+                ledger.add(product.company_id, product.pk, product.quantity, product.quantity, reason='created')
+            if uploaded_image:
+                save_image_variants(product)
             
             messages.success(request, f'Product "{product.item_name}" added successfully!')
             return redirect('inventory:inventory_list')
@@ -139,61 +391,344 @@ def product_add(request):
     }
     return render(request, 'inventory/product_add.html', context)
 
-# The rest of the views remain unchanged...
 @login_required
-def increase_stock(request, pk):
+def product_import(request):
+    """Import products from an uploaded CSV or XLSX file (see inventory/importer.py)."""
+    try:
+        profile = request.user.userprofile
+    except UserProfile.DoesNotExist:
+        messages.error(request, 'User profile not found.')
+        return redirect('dashboard:dashboard')
+    
+    if profile.role != 'business_owner':
+        messages.error(request, 'Access denied. Only business owners can import products.')
+        return redirect('inventory:inventory_list')
+    
+    context = {'profile': profile, 'batch_size': IMPORT_BATCH_SIZE}
+    upload = request.FILES.get('file')
     if request.method == 'POST':
+        if upload is None:
+            context['error'] = 'Choose a file to import.'
+            return render(request, 'inventory/product_import.html', context)
+        
+        errors = io.StringIO()
+        report = ErrorReport(errors)
         try:
-            profile = request.user.userprofile
-            product = Product.objects.get(pk=pk, company=profile.company)
-            product.quantity += 1
-            product.save()
-            company_products = Product.objects.filter(company=profile.company)
-            total_products = company_products.count()
-            total_inventory_value = float(sum(p.total_value for p in company_products))
-            low_stock_count = company_products.filter(quantity__lte=10, quantity__gt=0).count()
-            out_of_stock_count = company_products.filter(quantity=0).count()
-
-            return JsonResponse({
-                'success': True,
-                'new_quantity': product.quantity,
-                'total_value': float(product.total_value),
-                'total_products': total_products,
-                'total_inventory_value': total_inventory_value,
-                'low_stock_count': low_stock_count,
-                'out_of_stock_count': out_of_stock_count,
-            })
-        except (Product.DoesNotExist, UserProfile.DoesNotExist):
-            return JsonResponse({'success': False, 'error': 'Product not found'})
-    return JsonResponse({'success': False, 'error': 'Invalid request'})
+            result = import_products(profile.company, read_rows(upload, upload.name), request.user, report=report)
+        except ValueError as e:
+            context['error'] = str(e)
+            return render(request, 'inventory/product_import.html', context)
+        
+        context['product_import'] = ProductImport.objects.create(
+            company=profile.company,
+            actor=request.user,
+            file_name=upload.name[:255],
+            error_report=errors.getvalue() if result['error_count'] else '',
+            **result,
+        )
+        context['reported_errors'] = min(result['error_count'], report.limit)
+    return render(request, 'inventory/product_import.html', context)
+
+def _previewed_options(data):
+    """
+    The cleaned options of a bulk action form, as sent back by its preview.
+    Confirming with different options shows the preview again instead.
+    """
+    return urlencode(sorted((name, str(value)) for name, value in data.items()))
 
 @login_required
-def decrease_stock(request, pk):
+def product_bulk_update(request):
+    """
+    Change the cost price or quantity of all products matching a filter in
+    one UPDATE (see inventory/bulk_update.py). The first submit previews the
+    change; it is applied when the owner confirms the same options.
+    """
+    try:
+        profile = request.user.userprofile
+    except UserProfile.DoesNotExist:
+        messages.error(request, 'User profile not found.')
+        return redirect('dashboard:dashboard')
+    
+    if profile.role != 'business_owner':
+        messages.error(request, 'Access denied. Only business owners can bulk update products.')
+        return redirect('inventory:inventory_list')
+    
+    form = BulkUpdateForm(request.POST or None)
+    context = {'profile': profile, 'form': form}
+    if request.method == 'POST' and form.is_valid():
+        data = form.cleaned_data
+        options = _previewed_options(data)
+        try:
+            if request.POST.get('action') == 'apply' and request.POST.get('previewed') == options:
+                context['bulk_update'] = apply_bulk_update(
+                    profile.company, data, data['field'], data['operation'], data['value'], request.user
+                )
+            else:
+                context['preview'] = preview_bulk_update(
+                    profile.company, data, data['field'], data['operation'], data['value']
+                )
+                context['previewed'] = options
+        except ValueError as e:
+            context['error'] = str(e)
+    return render(request, 'inventory/product_bulk_update.html', context)
+
+@login_required
+def product_archive(request):
+    """
+    Archive all products matching a filter in one UPDATE (see
+    inventory/archive.py), after previewing which ones match.
+    """
+    try:
+        profile = request.user.userprofile
+    except UserProfile.DoesNotExist:
+        messages.error(request, 'User profile not found.')
+        return redirect('dashboard:dashboard')
+    
+    if profile.role != 'business_owner':
+        messages.error(request, 'Access denied. Only business owners can archive products.')
+        return redirect('inventory:inventory_list')
+    
+    form = ProductFilterForm(request.POST or None)
+    context = {'profile': profile, 'form': form}
+    if request.method == 'POST' and form.is_valid():
+        options = _previewed_options(form.cleaned_data)
+        products = filter_products(profile.company, form.cleaned_data)
+        if request.POST.get('action') == 'apply' and request.POST.get('previewed') == options:
+            context['archived_count'] = archive_products(profile.company, products)
+        else:
+            count = products.count()
+            context['preview'] = {
+                'count': count,
+                'sample': list(products.defer('image').order_by('item_name', 'pk')[:PREVIEW_SIZE]),
+                'more': max(count - PREVIEW_SIZE, 0),
+            }
+            context['previewed'] = options
+    return render(request, 'inventory/product_archive.html', context)
+
+@login_required
+def product_archived_list(request):
+    """Archived products, with a form restoring the selected ones in one UPDATE."""
+    try:
+        profile = request.user.userprofile
+    except UserProfile.DoesNotExist:
+        messages.error(request, 'User profile not found.')
+        return redirect('dashboard:dashboard')
+    
+    if profile.role != 'business_owner':
+        messages.error(request, 'Access denied. Only business owners can view archived products.')
+        return redirect('inventory:inventory_list')
+    
+    restored_count = None
+    if request.method == 'POST':
+        product_ids = [int(pk) for pk in request.POST.getlist('product_ids') if pk.isdigit()]
+        restored_count = unarchive_products(profile.company, product_ids)
+    
+    # Archiving sets updated_at, so this lists the most recently archived first
+    page = paginate_products(
+        archived_products(profile.company).defer('image'),
+        sort='-updated_at',
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+    context = {
+        'profile': profile,
+        'products': page['products'],
+        'next_url': '?' + urlencode({'after': page['next_cursor']}) if page['next_cursor'] else None,
+        'prev_url': '?' + urlencode({'before': page['prev_cursor']}) if page['prev_cursor'] else None,
+        'restored_count': restored_count,
+    }
+    return render(request, 'inventory/product_archived_list.html', context)
+
+@login_required
+def stock_alerts(request):
+    """Products at or below their reorder level, from the open low-stock alerts (see inventory/alerts.py)."""
+    try:
+        profile = request.user.userprofile
+    except UserProfile.DoesNotExist:
+        messages.error(request, 'User profile not found.')
+        return redirect('dashboard:dashboard')
+    
+    alerts = open_alerts(profile.company)
+    shown = list(alerts[:ALERTS_PAGE_SIZE])
+    # Hot products show their effective quantity
+    apply_pending([alert.product for alert in shown], pending_deltas(profile.company, [alert.product_id for alert in shown]))
+    context = {
+        'profile': profile,
+        'alerts': shown,
+        'alert_count': alerts.count() if len(shown) == ALERTS_PAGE_SIZE else len(shown),
+    }
+    return render(request, 'inventory/stock_alerts.html', context)
+
+@login_required
+def category_reorder_points(request):
+    """Set the company's default reorder point of each category (see inventory/reorder.py)."""
+    try:
+        profile = request.user.userprofile
+    except UserProfile.DoesNotExist:
+        messages.error(request, 'User profile not found.')
+        return redirect('dashboard:dashboard')
+    
+    if profile.role != 'business_owner':
+        messages.error(request, 'Access denied. Only business owners can set reorder defaults.')
+        return redirect('inventory:stock_alerts')
+    
+    points = reorder.category_reorder_points(profile.company)
+    moved = None
+    form = CategoryReorderPointsForm(request.POST or None, initial=points)
+    if request.method == 'POST' and form.is_valid():
+        moved = 0
+        for category, reorder_point in form.cleaned_data.items():
+            if reorder_point != points.get(category):
+                moved += reorder.set_category_reorder_point(profile.company, category, reorder_point)
+    
+    context = {
+        'profile': profile,
+        'form': form,
+        'moved': moved,
+    }
+    return render(request, 'inventory/category_reorder_points.html', context)
+
+@login_required
+def product_import_errors(request, pk):
+    """Download the rejected rows of an import as CSV."""
+    try:
+        profile = request.user.userprofile
+    except UserProfile.DoesNotExist:
+        raise Http404
+    product_import = get_object_or_404(ProductImport, pk=pk, company=profile.company)
+    name = os.path.splitext(product_import.file_name)[0].replace('"', '')
+    response = HttpResponse(product_import.error_report, content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{name}_errors.csv"'
+    return response
+
+@login_required
+def product_image_import(request):
+    """
+    Match the images in an uploaded ZIP archive to products and store them
+    (see inventory/image_import.py). The page is streamed so it can show
+    the progress while the images are processed.
+    """
+    try:
+        profile = request.user.userprofile
+    except UserProfile.DoesNotExist:
+        messages.error(request, 'User profile not found.')
+        return redirect('dashboard:dashboard')
+    
+    if profile.role != 'business_owner':
+        messages.error(request, 'Access denied. Only business owners can import images.')
+        return redirect('inventory:inventory_list')
+    
+    context = {'profile': profile}
     if request.method == 'POST':
+        archive = request.FILES.get('archive')
         try:
-            profile = request.user.userprofile
-            product = Product.objects.get(pk=pk, company=profile.company)
-            if product.quantity > 0:
-                product.quantity -= 1
-                product.save()
-            company_products = Product.objects.filter(company=profile.company)
-            total_products = company_products.count()
-            total_inventory_value = float(sum(p.total_value for p in company_products))
-            low_stock_count = company_products.filter(quantity__lte=10, quantity__gt=0).count()
-            out_of_stock_count = company_products.filter(quantity=0).count()
-
-            return JsonResponse({
-                'success': True,
-                'new_quantity': product.quantity,
-                'total_value': float(product.total_value),
-                'total_products': total_products,
-                'total_inventory_value': total_inventory_value,
-                'low_stock_count': low_stock_count,
-                'out_of_stock_count': out_of_stock_count,
-            })
-        except (Product.DoesNotExist, UserProfile.DoesNotExist):
-            return JsonResponse({'success': False, 'error': 'Product not found'})
-    return JsonResponse({'success': False, 'error': 'Invalid request'})
+            if archive is None:
+                raise ValueError('Choose a ZIP file to import.')
+            image_import = ImageImport(profile.company, archive)
+        except ValueError as e:
+            context['error'] = str(e)
+            return render(request, 'inventory/product_image_import.html', context)
+        return StreamingHttpResponse(streaming_content(request, _image_import_stream(request, context, image_import)))
+    return render(request, 'inventory/product_image_import.html', context)
+
+def _image_import_stream(request, context, image_import):
+    """Yield the import page with progress updates, then the summary."""
+    page = render_to_string(
+        'inventory/product_image_import.html', {**context, 'progress': IMPORT_PROGRESS_MARKER}, request
+    )
+    head, tail = page.split(IMPORT_PROGRESS_MARKER, 1)
+    yield head
+    try:
+        with ThreadPoolExecutor(max_workers=IMAGE_IMPORT_WORKERS) as executor:
+            for done, total in image_import.run(executor):
+                yield f'<script>showImportProgress({done}, {total});</script>\n'
+    except Exception as e:
+        print(f"Error importing images: {e}")
+        image_import.error = 'The import stopped early. The images saved so far are kept.'
+    yield render_to_string('inventory/product_image_import_summary.html', {'image_import': image_import})
+    yield tail
+
+def _stock_adjustment_response(request, pk, delta):
+    """Apply a +/- stock click and return the row and KPI changes as JSON."""
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Invalid request'})
+    try:
+        profile = request.user.userprofile
+        product, applied = adjust_stock(profile.company, pk, delta, actor=request.user)
+    except (Product.DoesNotExist, UserProfile.DoesNotExist):
+        return JsonResponse({'success': False, 'error': 'Product not found'})
+
+    # The KPI cards are moved by kpi_deltas; re-aggregating the whole
+    # catalog on every click is what batching the clicks set out to avoid
+    before = product.quantity - applied
+    return JsonResponse({
+        'success': True,
+        'new_quantity': product.quantity,
+        'total_value': float(product.total_value),
+        'kpi_deltas': stock_kpi_deltas(before, product.quantity, product.cost_price, product.reorder_level),
+    })
+
+@login_required
+def increase_stock(request, pk):
+    return _stock_adjustment_response(request, pk, 1)
+
+@login_required
+def decrease_stock(request, pk):
+    return _stock_adjustment_response(request, pk, -1)
+
+@login_required
+def bulk_adjust_stock(request):
+    """
+    Apply a batch of stock clicks sent as a JSON array of
+    {"product_id": ..., "delta": ...} items and return the new
+    quantities together with the refreshed company KPIs.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Invalid request'})
+    try:
+        profile = request.user.userprofile
+    except UserProfile.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'User profile not found'})
+
+    try:
+        items = json.loads(request.body)
+        if not isinstance(items, list) or len(items) > MAX_BULK_ADJUSTMENTS:
+            raise ValueError
+        # Several clicks on the same product collapse into one net delta
+        deltas = {}
+        for item in items:
+            product_id = item['product_id']
+            delta = item['delta']
+            # Whole numbers only: no floats, strings or booleans
+            if type(product_id) is not int or not 0 < product_id <= MAX_PRODUCT_ID:
+                raise ValueError
+            if type(delta) is not int or abs(delta) > MAX_STOCK_DELTA:
+                raise ValueError
+            deltas[product_id] = deltas.get(product_id, 0) + delta
+            if abs(deltas[product_id]) > MAX_STOCK_DELTA:
+                raise ValueError
+    except (ValueError, TypeError, KeyError):
+        # One bad item rejects the whole batch; nothing has been applied
+        return JsonResponse({'success': False, 'error': 'Invalid adjustment data'}, status=400)
+
+    updated = adjust_stock_bulk(profile.company, deltas, actor=request.user)
+    stats = get_inventory_stats(profile.company)
+
+    return JsonResponse({
+        'success': True,
+        'products': [
+            {
+                'product_id': pk,
+                'new_quantity': quantity,
+                'total_value': float(total_value),
+            }
+            for pk, (quantity, total_value) in updated.items()
+        ],
+        'total_products': stats['total_products'],
+        'total_inventory_value': float(stats['total_inventory_value']),
+        'low_stock_count': stats['low_stock_count'],
+        'out_of_stock_count': stats['out_of_stock_count'],
+    })
 
 @login_required
 def product_delete(request, pk):
@@ -202,13 +737,13 @@ def product_delete(request, pk):
         product = Product.objects.get(pk=pk, company=profile.company)
         
         if profile.role != 'business_owner':
-            messages.error(request, 'Access denied. Only business owners can delete products.')
+            messages.error(request, 'Access denied. Only business owners can archive products.')
             return redirect('inventory:inventory_list')
         
         if request.method == 'POST':
-            product_name = product.item_name
-            product.delete()
-            messages.success(request, f'Product "{product_name}" deleted successfully!')
+            # Archived rather than deleted, so its history stays in the reports
+            archive_products(profile.company, Product.objects.filter(pk=product.pk))
+            messages.success(request, f'Product "{product.item_name}" archived successfully!')
             return redirect('inventory:inventory_list')
     except (Product.DoesNotExist, UserProfile.DoesNotExist):
         messages.error(request, 'Product not found.')
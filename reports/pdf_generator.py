@@ -76,6 +76,8 @@ def create_inventory_pdf(inventory_data, company_name):
     story.append(Paragraph("INVENTORY REPORT", title_style))
     story.append(Paragraph(company_name, company_style))
     story.append(Paragraph(f"Generated on: {datetime.now().strftime('%B %d, %Y at %I:%M %p')}", normal_style))
+    if inventory_data.get('as_of'):
+        story.append(Paragraph(f"Inventory as of: {inventory_data['as_of'].strftime('%B %d, %Y at %I:%M %p')}", normal_style))
     story.append(Spacer(1, 20))
     
     # SUMMARY SECTION
@@ -116,15 +118,9 @@ def create_inventory_pdf(inventory_data, company_name):
         ]
         
         for idx, item in enumerate(inventory_data['items'], 1):
-            # Determine status
             quantity = item.get('current_stock', 0)
-            
-            if quantity == 0:
-                status = "OUT OF STOCK"
-            elif quantity <= 5:
-                status = "LOW STOCK"
-            else:
-                status = "IN STOCK"
+            # Status comes from the report data so the PDF uses the same threshold
+            status = item.get('status', '').upper()
             
             items_data.append([
                 str(idx),
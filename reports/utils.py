@@ -392,6 +392,7 @@ def generate_staff_activity_pdf_html(data):
 
 def generate_inventory_pdf_html(data):
     """Generate HTML for inventory PDF - NO MIN_STOCK HERE!"""
+    as_of_line = f"<p>Inventory as of: {data['as_of'].strftime('%Y-%m-%d %H:%M')}</p>" if data.get('as_of') else ''
     html = f"""
     <!DOCTYPE html>
     <html>
@@ -412,6 +413,7 @@ def generate_inventory_pdf_html(data):
         <div class="header">
             <h1>Inventory Report</h1>
             <p>Generated on: {datetime.now().strftime("%Y-%m-%d %H:%M")}</p>
+            {as_of_line}
         </div>
         
         <div class="summary">
@@ -147,8 +147,10 @@ def inventory_report(request):
     """Inventory Report with Export Functionality - SECURED BY COMPANY"""
     try:
         from inventory.models import Product
+        from inventory.utils import get_inventory_stats, stock_status
+        from inventory.counters import apply_pending, pending_deltas
+        from inventory.snapshots import inventory_as_of, parse_as_of
         from accounts.models import UserProfile
-        from django.db.models import Sum, Count
         
         # Get the current user's company
         try:
@@ -162,53 +164,62 @@ def inventory_report(request):
             })
         
         # ONLY fetch products from the current user's company
-        products = Product.objects.filter(company=user_company).order_by('item_name')
+        products = Product.objects.filter(company=user_company).defer('image').order_by('item_name')
         
-        # Calculate statistics
-        total_products = products.count()
-        total_quantity = products.aggregate(total=Sum('quantity'))['total'] or 0
-        
-        # Calculate total value safely
-        total_value = 0
-        for product in products:
-            if hasattr(product, 'total_value') and product.total_value:
-                total_value += float(product.total_value)
+        # ?as_of=YYYY-MM-DD (or a full timestamp) reports a past inventory,
+        # rebuilt from the nearest snapshot and the stock movement ledger
+        as_of_param = request.GET.get('as_of', '')
+        as_of = parse_as_of(as_of_param)
+        if as_of_param and as_of is None:
+            messages.error(request, 'Invalid "as of" date, showing the current inventory.')
         
-        # Stock status counts
-        low_stock_threshold = 10
-        low_stock_items = products.filter(quantity__lte=low_stock_threshold, quantity__gt=0).count()
-        out_of_stock_items = products.filter(quantity=0).count()
+        if as_of:
+            past_inventory = inventory_as_of(user_company, as_of)
+            # Products archived since then are part of the past inventory
+            products = Product.all_objects.filter(pk__in=list(past_inventory)).defer('image').order_by('item_name')
+            status_labels = dict(Product.STOCK_STATUS_CHOICES)
+        else:
+            # Hot products are reported with their effective quantity
+            products = apply_pending(products, pending_deltas(user_company))
         
         # Prepare individual items data
         items_list = []
         for product in products:
-            # Determine stock status
-            if product.quantity == 0:
-                status = 'Out of Stock'
-            elif product.quantity <= low_stock_threshold:
-                status = 'Low Stock'
+            if as_of:
+                quantity, cost_price = past_inventory[product.pk]
+                status = status_labels[stock_status(quantity, product.reorder_level)]
             else:
-                status = 'In Stock'
-            
-            # Calculate item value safely
-            item_value = 0
-            if hasattr(product, 'total_value') and product.total_value:
-                item_value = float(product.total_value)
-            else:
-                item_value = float(product.quantity * product.cost_price)
+                quantity, cost_price = product.quantity, product.cost_price
+                status = product.get_stock_status_display()
+            item_value = float(quantity * cost_price)
             
             items_list.append({
                 'id': product.id,
                 'name': product.item_name,
                 'category': product.get_category_display(),
-                'current_stock': product.quantity,
-                'min_stock': low_stock_threshold,
+                'current_stock': quantity,
+                'min_stock': product.reorder_level,
                 'status': status,
-                'price': float(product.cost_price),
+                'price': float(cost_price),
                 'unit': product.get_unit_of_measure_display(),
                 'total_value': round(item_value, 2)
             })
         
+        if as_of:
+            total_products = len(items_list)
+            total_quantity = sum(item['current_stock'] for item in items_list)
+            total_value = sum(item['total_value'] for item in items_list)
+            low_stock_items = sum(1 for item in items_list if item['status'] == status_labels['low'])
+            out_of_stock_items = sum(1 for item in items_list if item['status'] == status_labels['out'])
+        else:
+            # Calculate statistics in a single aggregate query
+            stats = get_inventory_stats(user_company)
+            total_products = stats['total_products']
+            total_quantity = stats['total_quantity']
+            total_value = float(stats['total_inventory_value'])
+            low_stock_items = stats['low_stock_count']
+            out_of_stock_items = stats['out_of_stock_count']
+        
         inventory_data = {
             'total_items': total_products,
             'low_stock_items': low_stock_items,
@@ -216,17 +227,22 @@ def inventory_report(request):
             'total_value': round(total_value, 2),
             'items': items_list,
             'company_name': user_company.name,
+            'as_of': timezone.localtime(as_of) if as_of else None,
         }
         
         # Handle export requests - SECURE EXPORTS TOO
         export_format = request.GET.get('export')
         if export_format:
+            filename_prefix = f'inventory_report_{user_company.name}'
+            if as_of:
+                as_of_day = timezone.localtime(as_of - timedelta(microseconds=1))
+                filename_prefix += f'_as_of_{as_of_day:%Y%m%d}'
             if export_format == 'excel':
-                return generate_excel_report(inventory_data, 'inventory', f'inventory_report_{user_company.name}')
+                return generate_excel_report(inventory_data, 'inventory', filename_prefix)
             elif export_format == 'pdf':
-                return generate_pdf_report(inventory_data, 'inventory', f'inventory_report_{user_company.name}')
+                return generate_pdf_report(inventory_data, 'inventory', filename_prefix)
             elif export_format == 'csv':
-                return generate_csv_report(inventory_data, 'inventory', f'inventory_report_{user_company.name}')
+                return generate_csv_report(inventory_data, 'inventory', filename_prefix)
         
         context = {
             'inventory_data': inventory_data,
@@ -234,6 +250,8 @@ def inventory_report(request):
             'total_quantity': total_quantity,
             'total_value': round(total_value, 2),
             'company_name': user_company.name,
+            'as_of': inventory_data['as_of'],
+            'as_of_param': as_of_param if as_of else '',
         }
         
         return render(request, 'reports/inventory_report.html', context)
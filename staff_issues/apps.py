@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class StaffIssuesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'staff_issues'
+
+    def ready(self):
+        from . import signals  # noqa: F401
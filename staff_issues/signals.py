@@ -0,0 +1,10 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from accounts.versioning import bump_data_version
+from .models import IssueReport
+
+
+@receiver(post_save, sender=IssueReport)
+@receiver(post_delete, sender=IssueReport)
+def issue_report_changed(sender, instance, **kwargs):
+    bump_data_version(instance.company_id)
@@ -3,4 +3,7 @@ from django.apps import AppConfig
 class StaffManagementConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'staff_management'
-    verbose_name = 'Staff Management'
\ No newline at end of file
+    verbose_name = 'Staff Management'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,19 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from accounts.models import UserProfile
+from accounts.versioning import bump_data_version
+from .models import StaffProfile
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def user_profile_changed(sender, instance, **kwargs):
+    # The owner dashboard shows the staff count
+    bump_data_version(instance.company_id)
+
+
+@receiver(post_save, sender=StaffProfile)
+@receiver(post_delete, sender=StaffProfile)
+def staff_profile_changed(sender, instance, **kwargs):
+    company_id = UserProfile.objects.filter(pk=instance.user_profile_id).values_list('company_id', flat=True).first()
+    bump_data_version(company_id)
@@ -3,6 +3,13 @@ ASGI config for trackwise project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve it with an ASGI server so the live inventory event stream
+(/inventory/events/) can stay open without tying up a worker, e.g.:
+
+    gunicorn trackwise.asgi:application -k uvicorn.workers.UvicornWorker
+
+Under WSGI the stream degrades to the browser reconnecting every few seconds.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
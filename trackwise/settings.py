@@ -169,6 +169,23 @@ else:
 # Custom user model
 AUTH_USER_MODEL = 'auth.User'
 
+# Caches. Rendered inventory rows go to their own bounded in-process cache
+# so they cannot push anything else out (inventory/templatetags/fragment_cache.py).
+# The default cache carries the autocomplete index versions
+# (inventory/autocomplete.py); with several worker processes it must be a
+# shared backend such as Redis or Memcached.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'fragments': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'template-fragments',
+        'TIMEOUT': 60 * 60,
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+}
+
 # Session settings
 SESSION_COOKIE_AGE = 1209600  # 2 weeks in seconds
 SESSION_SAVE_EVERY_REQUEST = True